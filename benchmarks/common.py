@@ -0,0 +1,171 @@
+# benchmarks/common.py
+"""Shared helpers for the benchmark and load tools: percentiles and an in-process server."""
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Same import layout as the tests
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """Summary of latency samples (seconds) in milliseconds."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pick(fraction: float) -> float:
+        index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+        return round(ordered[index] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": pick(0.50),
+        "p90_ms": pick(0.90),
+        "p99_ms": pick(0.99),
+        "max_ms": round(ordered[-1] * 1000, 3)
+    }
+
+def run_metadata(args: Dict[str, Any]) -> Dict[str, Any]:
+    """Environment details stored next to the results so runs can be compared fairly."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+        "args": args
+    }
+
+def write_json(path: Optional[str], data: Dict[str, Any]):
+    text = json.dumps(data, indent=2, ensure_ascii=False)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def prepare_config(overrides: Dict[str, Any]):
+    """Write ai_models_config.json in the current directory: defaults plus overrides."""
+    from server.config import load_ai_config
+
+    config = load_ai_config()
+    # Only the built-in mock provider: the benchmarks must not touch the network
+    for provider in config.get("providers", {}).values():
+        provider["enabled"] = False
+    config["default_provider"] = "mock"
+    config["providers"]["mock"]["enabled"] = True
+    # Benchmarks measure processing, not admission control
+    config["scheduler"]["rate"] = 0
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(config.get(key), dict):
+            config[key].update(value)
+        else:
+            config[key] = value
+    with open("ai_models_config.json", "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2, ensure_ascii=False)
+    return config
+
+def build_app(latency: float = 0.05, pool_size: int = 4):
+    """FastAPI app with the real endpoints and controller, backed by the mock provider.
+
+    Expects ai_models_config.json in the current directory (see prepare_config).
+    """
+    from fastapi import FastAPI
+    from server.api.endpoints import register_endpoints
+    from server.config import load_ai_config
+    from server.core.controller import AIController
+    from server.services.interpreter_pool import InterpreterPool
+
+    config = load_ai_config()
+    config["providers"]["mock"]["latency"] = latency
+    config["pool"]["size"] = pool_size
+    # The mock provider replaces Open Interpreter instances, so no module is needed
+    pool = InterpreterPool.from_config(None, config)
+    controller = AIController(interpreter_pool=pool)
+
+    app = FastAPI()
+    register_endpoints(app, controller)
+
+    @app.on_event("startup")
+    async def startup():
+        await controller.startup()
+
+    @app.on_event("shutdown")
+    async def shutdown():
+        await controller.shutdown()
+
+    return app
+
+@contextlib.contextmanager
+def temporary_workdir() -> Iterator[str]:
+    """Config, logs and history files go to a scratch directory, never the checkout."""
+    workdir = tempfile.mkdtemp(prefix="ai-control-bench-")
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        yield workdir
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+@contextlib.contextmanager
+def running_server(
+    latency: float = 0.05,
+    pool_size: int = 4,
+    config: Optional[Dict[str, Any]] = None,
+    log_level: str = "WARNING"
+) -> Iterator[str]:
+    """Start the app in a background thread on a free port and yield its base URL."""
+    import uvicorn
+
+    with temporary_workdir():
+        logging.basicConfig(level=log_level)
+        logging.getLogger().setLevel(log_level)
+        prepare_config(config or {})
+        app = build_app(latency, pool_size)
+
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level=log_level.lower()))
+        thread = threading.Thread(target=server.run, name="bench-server", daemon=True)
+        thread.start()
+        deadline = time.time() + 15
+        while not server.started:
+            if time.time() > deadline or not thread.is_alive():
+                raise RuntimeError("Benchmark server failed to start")
+            time.sleep(0.02)
+        try:
+            yield f"http://127.0.0.1:{port}"
+        finally:
+            server.should_exit = True
+            thread.join(timeout=15)
+
+def run(coro):
+    """asyncio.run wrapper kept in one place for the CLI modules."""
+    return asyncio.run(coro)
@@ -0,0 +1,96 @@
+# benchmarks/e2e.py
+"""End-to-end throughput and latency for /process and /ws under concurrent clients."""
+import asyncio
+import json
+import time
+from typing import Dict, Any, List
+
+import httpx
+import websockets
+
+from benchmarks.common import percentiles
+
+COMMANDS = [
+    "list my documents",
+    "show me the running processes",
+    "open the downloads folder",
+    "what is my ip address",
+    "print the current directory"
+]
+
+def command_for(client: int, index: int, unique: bool) -> str:
+    base = COMMANDS[(client + index) % len(COMMANDS)]
+    # Unique suffixes defeat the response cache and request coalescing
+    return f"{base} #{client}-{index}" if unique else base
+
+async def bench_process(base_url: str, clients: int, requests_per_client: int, unique: bool = True) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker(client: int, http: httpx.AsyncClient):
+        nonlocal errors
+        for index in range(requests_per_client):
+            started = time.perf_counter()
+            try:
+                response = await http.post("/process", json={
+                    "command": command_for(client, index, unique),
+                    "client_id": f"bench-{client}"
+                })
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+            except Exception:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client, http) for client in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "clients": clients,
+        "requests": clients * requests_per_client,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0,
+        "latency": percentiles(latencies)
+    }
+
+async def bench_ws(base_url: str, clients: int, requests_per_client: int, unique: bool = True) -> Dict[str, Any]:
+    ws_url = base_url.replace("http://", "ws://") + "/ws"
+    latencies: List[float] = []
+    connect_times: List[float] = []
+    errors = 0
+
+    async def worker(client: int):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            async with websockets.connect(ws_url, max_size=None) as ws:
+                json.loads(await ws.recv())  # connection_established
+                connect_times.append(time.perf_counter() - started)
+                for index in range(requests_per_client):
+                    command = command_for(client, index, unique)
+                    sent = time.perf_counter()
+                    await ws.send(json.dumps({"type": "command", "command": command}))
+                    while True:
+                        message = json.loads(await ws.recv())
+                        if message.get("type") == "command_result" and message.get("command") == command:
+                            break
+                    latencies.append(time.perf_counter() - sent)
+        except Exception:
+            errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(client) for client in range(clients)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "clients": clients,
+        "requests": clients * requests_per_client,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0,
+        "connect": percentiles(connect_times),
+        "latency": percentiles(latencies)
+    }
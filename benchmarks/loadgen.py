@@ -0,0 +1,296 @@
+# benchmarks/loadgen.py
+"""WebSocket load generator and soak harness for /ws.
+
+Opens many clients that speak the normal /ws protocol (command, ping,
+get_status), ramps them up gradually, and keeps them busy for a fixed time
+while a probe sender triggers broadcasts through POST /process.
+
+    # Server with a mock LLM in a child process, 500 clients for 60 s
+    python -m benchmarks.loadgen --spawn --clients 500 --ramp-up 20 --duration 60
+
+    # Against a running server, sampling its memory by PID
+    python -m benchmarks.loadgen --url http://127.0.0.1:8000 --server-pid 1234 --mix ping=8,command=1,get_status=1
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, Any, List, Optional
+
+import httpx
+import psutil
+import websockets
+
+from benchmarks.common import ROOT, free_port, percentiles, run_metadata, write_json
+
+PROBE_PREFIX = "loadgen broadcast probe"
+
+def parse_mix(text: str) -> Dict[str, int]:
+    """'ping=8,command=1,get_status=1' -> weights per message type."""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ("command", "ping", "get_status"):
+            raise argparse.ArgumentTypeError(f"Unknown message type in mix: {name}")
+        mix[name] = int(weight or 1)
+    return mix
+
+class LoadStats:
+    """Everything the clients measure, aggregated at the end of the run."""
+
+    def __init__(self):
+        self.connect_times: List[float] = []
+        self.round_trips: Dict[str, List[float]] = defaultdict(list)
+        self.fanout: List[float] = []
+        self.probes_sent: Dict[str, float] = {}
+        self.rss_samples: List[Dict[str, float]] = []
+        self.connected = 0
+        self.peak_connected = 0
+        self.connect_failures = 0
+        self.dropped = 0
+        self.errors: Dict[str, int] = defaultdict(int)
+
+class LoadClient:
+    def __init__(self, number: int, ws_url: str, mix: Dict[str, int], think_time: float, stats: LoadStats, rng: random.Random):
+        self.number = number
+        self.ws_url = ws_url
+        self.stats = stats
+        self.think_time = think_time
+        self.rng = rng
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.pending: Dict[str, asyncio.Future] = {}
+        self.counter = itertools.count()
+
+    async def run(self, stop_at: float):
+        started = time.perf_counter()
+        try:
+            ws = await websockets.connect(self.ws_url, max_size=None, open_timeout=30)
+        except Exception as e:
+            self.stats.connect_failures += 1
+            self.stats.errors[type(e).__name__] += 1
+            return
+
+        async with ws:
+            try:
+                first = json.loads(await ws.recv())
+                if first.get("type") == "connection_established":
+                    self.stats.connect_times.append(time.perf_counter() - started)
+                self.stats.connected += 1
+                self.stats.peak_connected = max(self.stats.peak_connected, self.stats.connected)
+                reader = asyncio.ensure_future(self._read(ws))
+                try:
+                    await self._drive(ws, stop_at)
+                finally:
+                    reader.cancel()
+            except websockets.ConnectionClosed:
+                # The server closed us before the run ended
+                self.stats.dropped += 1
+            except Exception as e:
+                self.stats.errors[type(e).__name__] += 1
+            finally:
+                self.stats.connected -= 1
+
+    async def _drive(self, ws, stop_at: float):
+        loop = asyncio.get_running_loop()
+        while time.perf_counter() < stop_at:
+            kind = self.rng.choices(self.kinds, self.weights)[0]
+            key, message = self._message(kind)
+            future = loop.create_future()
+            self.pending[key] = future
+            sent = time.perf_counter()
+            await ws.send(json.dumps(message))
+            try:
+                await asyncio.wait_for(future, timeout=max(1.0, stop_at - time.perf_counter() + 30))
+                self.stats.round_trips[kind].append(time.perf_counter() - sent)
+            except asyncio.TimeoutError:
+                self.stats.errors[f"{kind}_timeout"] += 1
+            finally:
+                self.pending.pop(key, None)
+            if self.think_time:
+                await asyncio.sleep(self.rng.uniform(0, 2 * self.think_time))
+
+    def _message(self, kind: str):
+        if kind == "command":
+            command = f"loadgen {self.number}-{next(self.counter)} list files"
+            return f"command:{command}", {"type": "command", "command": command}
+        if kind == "ping":
+            return "pong", {"type": "ping"}
+        return "status_response", {"type": "get_status"}
+
+    async def _read(self, ws):
+        async for raw in ws:
+            received = time.perf_counter()
+            message = json.loads(raw)
+            kind = message.get("type")
+            if kind == "command_result":
+                key = f"command:{message.get('command')}"
+            elif kind == "command_processed":
+                command = message.get("command", "")
+                sent = self.stats.probes_sent.get(command)
+                if sent is not None:
+                    self.stats.fanout.append(received - sent)
+                continue
+            else:
+                key = kind
+            future = self.pending.get(key)
+            if future is not None and not future.done():
+                future.set_result(message)
+
+async def send_probes(base_url: str, interval: float, stop_at: float, stats: LoadStats):
+    """POST /process periodically; every connected client should receive the broadcast."""
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as http:
+        for number in itertools.count():
+            if time.perf_counter() >= stop_at:
+                return
+            command = f"{PROBE_PREFIX} {number}"
+            stats.probes_sent[command] = time.perf_counter()
+            try:
+                await http.post("/process", json={"command": command, "client_id": "loadgen-probe"})
+            except Exception as e:
+                stats.errors[f"probe_{type(e).__name__}"] += 1
+            await asyncio.sleep(interval)
+
+async def sample_rss(pid: Optional[int], interval: float, stop_at: float, stats: LoadStats, started: float):
+    if pid is None:
+        return
+    try:
+        process = psutil.Process(pid)
+    except psutil.Error:
+        return
+    while time.perf_counter() < stop_at:
+        try:
+            rss = process.memory_info().rss
+        except psutil.Error:
+            return
+        stats.rss_samples.append({
+            "t_s": round(time.perf_counter() - started, 2),
+            "rss_mb": round(rss / 1024 / 1024, 2),
+            "clients": stats.connected
+        })
+        await asyncio.sleep(interval)
+
+async def run_load(args, base_url: str, server_pid: Optional[int]) -> Dict[str, Any]:
+    stats = LoadStats()
+    ws_url = base_url.replace("http://", "ws://").replace("https://", "wss://") + "/ws"
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    stop_at = started + args.ramp_up + args.duration
+
+    async def start_client(number: int):
+        # Spread connection attempts evenly over the ramp-up window
+        await asyncio.sleep(args.ramp_up * number / max(1, args.clients))
+        client = LoadClient(number, ws_url, args.mix, args.think_time, stats, random.Random(rng.random()))
+        await client.run(stop_at)
+
+    background = [asyncio.ensure_future(sample_rss(server_pid, args.rss_interval, stop_at, stats, started))]
+    if args.probe_interval > 0:
+        background.append(asyncio.ensure_future(send_probes(base_url, args.probe_interval, stop_at, stats)))
+
+    await asyncio.gather(*(start_client(number) for number in range(args.clients)))
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+
+    elapsed = time.perf_counter() - started
+    total_messages = sum(len(samples) for samples in stats.round_trips.values())
+    return {
+        "clients": args.clients,
+        "peak_connected": stats.peak_connected,
+        "connect_failures": stats.connect_failures,
+        "dropped_connections": stats.dropped,
+        "elapsed_s": round(elapsed, 2),
+        "messages": total_messages,
+        "messages_per_s": round(total_messages / elapsed, 2) if elapsed else 0,
+        "connect": percentiles(stats.connect_times),
+        "round_trip": {kind: percentiles(samples) for kind, samples in stats.round_trips.items()},
+        "broadcast_fanout": {
+            "probes": len(stats.probes_sent),
+            **percentiles(stats.fanout)
+        },
+        "server_rss": stats.rss_samples,
+        "errors": dict(stats.errors)
+    }
+
+def spawn_server(args) -> (subprocess.Popen, str):
+    port = free_port()
+    command = [
+        sys.executable, "-m", "benchmarks.serve",
+        "--port", str(port), "--latency", str(args.latency), "--pool-size", str(args.pool_size),
+        "--config", json.dumps({"health": {"interval": 3600}, "cache": {"enabled": False}})
+    ]
+    process = subprocess.Popen(command, cwd=ROOT)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Spawned server exited during startup")
+        try:
+            if httpx.get(base_url + "/health", timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Spawned server did not become healthy")
+
+def raise_fd_limit(clients: int):
+    """Each client needs a socket; lift the soft limit when the platform allows it."""
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        wanted = min(hard, max(soft, clients * 2 + 256))
+        if wanted > soft:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="WebSocket load generator / soak harness")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Base URL of a running server, e.g. http://127.0.0.1:8000")
+    target.add_argument("--spawn", action="store_true", help="Start a mock-LLM server in a child process")
+    parser.add_argument("--server-pid", type=int, help="PID of the server for RSS sampling (with --url)")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--ramp-up", type=float, default=10.0, help="Seconds to open all connections")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of steady load after ramp-up")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("ping=6,get_status=2,command=2"))
+    parser.add_argument("--think-time", type=float, default=1.0, help="Mean pause between messages per client")
+    parser.add_argument("--probe-interval", type=float, default=2.0, help="Seconds between broadcast probes (0 = off)")
+    parser.add_argument("--rss-interval", type=float, default=1.0)
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock LLM latency (with --spawn)")
+    parser.add_argument("--pool-size", type=int, default=4, help="Mock interpreter pool size (with --spawn)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the JSON report to this file (default: stdout)")
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    raise_fd_limit(args.clients)
+    process = None
+    try:
+        if args.spawn:
+            process, base_url = spawn_server(args)
+            server_pid = process.pid
+        else:
+            base_url, server_pid = args.url.rstrip("/"), args.server_pid
+        report = asyncio.run(run_load(args, base_url, server_pid))
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    meta_args = dict(vars(args))
+    write_json(args.output, {"meta": run_metadata(meta_args), "load": report})
+    return 0 if report["peak_connected"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+# benchmarks/micro.py
+"""Microbenchmarks for the hot functions of the command pipeline."""
+import timeit
+from typing import Dict, Any, Callable, List
+
+import benchmarks.common  # noqa: F401  (sets up the import path)
+
+from server.services.interpreter import (
+    process_basic_command,
+    validate_command_safety,
+    extract_commands_from_response,
+    extract_code_blocks
+)
+
+BASIC_COMMANDS = [
+    "open chrome",
+    "please open the task manager",
+    "take a screenshot of my desktop",
+    "افتح المتصفح",
+    "list all files in this folder and sort them by size",
+    "something the mappings do not know about"
+]
+
+SAFETY_COMMANDS = [
+    "dir",
+    "start chrome && start notepad",
+    "format c:",
+    "type C:\\Windows\\System32\\drivers\\etc\\hosts",
+    "echo " + "x" * 500
+]
+
+RESPONSE_TEXT = (
+    "Sure, here is what I will run:\n```cmd\ndir /b\n```\n"
+    "Then:\n```python\nimport os\nprint(os.listdir('.'))\n```\nDone."
+)
+
+RESPONSE_MESSAGES = [
+    {"role": "assistant", "type": "message", "content": RESPONSE_TEXT},
+    {"role": "assistant", "type": "code", "format": "python", "content": "print('hi')"}
+]
+
+def _cycle(func: Callable, inputs: List) -> Callable[[], None]:
+    """Call func on each input in turn so one lucky input cannot dominate."""
+    def run():
+        for item in inputs:
+            func(item)
+    return run
+
+CASES = {
+    "process_basic_command": (_cycle(process_basic_command, BASIC_COMMANDS), len(BASIC_COMMANDS)),
+    "validate_command_safety": (_cycle(validate_command_safety, SAFETY_COMMANDS), len(SAFETY_COMMANDS)),
+    "extract_commands_from_response": (
+        _cycle(extract_commands_from_response, [RESPONSE_TEXT, RESPONSE_MESSAGES]), 2
+    ),
+    "extract_code_blocks": (_cycle(extract_code_blocks, [RESPONSE_TEXT]), 1)
+}
+
+def bench(func: Callable[[], None], calls_per_run: int, repeat: int = 5, min_time: float = 0.2) -> Dict[str, Any]:
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    # Scale the loop count so each repeat lasts about min_time
+    number = max(1, int(number * max(1.0, min_time / max(elapsed, 1e-9))))
+    runs = timer.repeat(repeat=repeat, number=number)
+    per_call = [run / (number * calls_per_run) for run in runs]
+    best = min(per_call)
+    per_call.sort()
+    return {
+        "calls": number * calls_per_run * repeat,
+        "best_us": round(best * 1e6, 3),
+        "median_us": round(per_call[len(per_call) // 2] * 1e6, 3),
+        "ops_per_sec": round(1 / best, 1)
+    }
+
+def run_micro(repeat: int = 5, min_time: float = 0.2, only: List[str] = None) -> Dict[str, Any]:
+    results = {}
+    for name, (func, calls) in CASES.items():
+        if only and name not in only:
+            continue
+        results[name] = bench(func, calls, repeat=repeat, min_time=min_time)
+    return results
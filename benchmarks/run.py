@@ -0,0 +1,92 @@
+# benchmarks/run.py
+"""Run the benchmark suite and write comparable JSON results.
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --skip-e2e --compare bench.json
+    python -m benchmarks.run --clients 1 8 32 --requests 20 --latency 0.05
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Any, List, Tuple
+
+from benchmarks.common import run, run_metadata, running_server, write_json
+from benchmarks.micro import run_micro, CASES
+from benchmarks.e2e import bench_process, bench_ws
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="AI Control Server benchmark suite")
+    parser.add_argument("--output", help="Write results JSON to this file (default: stdout)")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--skip-e2e", action="store_true")
+    parser.add_argument("--micro", nargs="*", choices=sorted(CASES), help="Only these microbenchmarks")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeats per microbenchmark")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32], help="Concurrent client counts")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per client")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock LLM latency in seconds")
+    parser.add_argument("--pool-size", type=int, default=4, help="Mock interpreter pool size")
+    parser.add_argument("--max-concurrent", type=int, default=4, help="execution.max_concurrent")
+    parser.add_argument("--cache", action="store_true", help="Enable the response cache and repeat commands")
+    return parser.parse_args(argv)
+
+def run_e2e(args) -> Dict[str, Any]:
+    config = {
+        "cache": {"enabled": args.cache},
+        "execution": {"max_concurrent": args.max_concurrent},
+        "health": {"interval": 3600}
+    }
+    results: Dict[str, Any] = {"process": {}, "ws": {}}
+    with running_server(latency=args.latency, pool_size=args.pool_size, config=config) as base_url:
+        for clients in args.clients:
+            unique = not args.cache
+            results["process"][str(clients)] = run(bench_process(base_url, clients, args.requests, unique))
+            results["ws"][str(clients)] = run(bench_ws(base_url, clients, args.requests, unique))
+    return results
+
+def _flatten(data: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+# For these metrics a larger number is better; for the rest (times) smaller is better
+_HIGHER_IS_BETTER = ("ops_per_sec", "throughput_rps")
+
+def compare(previous: Dict[str, Any], current: Dict[str, Any]) -> List[Tuple[str, float, float, float]]:
+    """Relative change per metric, signed so that positive always means better."""
+    old = _flatten({key: previous.get(key, {}) for key in ("micro", "e2e")})
+    new = _flatten({key: current.get(key, {}) for key in ("micro", "e2e")})
+    rows = []
+    for name in sorted(set(old) & set(new)):
+        if not name.endswith(("_us", "_ms", "ops_per_sec", "throughput_rps")) or not old[name]:
+            continue
+        change = (new[name] - old[name]) / old[name] * 100
+        if not name.endswith(_HIGHER_IS_BETTER):
+            change = -change
+        rows.append((name, old[name], new[name], round(change, 1)))
+    return rows
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results: Dict[str, Any] = {"meta": run_metadata(vars(args))}
+    if not args.skip_micro:
+        results["micro"] = run_micro(repeat=args.repeat, only=args.micro)
+    if not args.skip_e2e:
+        results["e2e"] = run_e2e(args)
+    write_json(args.output, results)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+        print(f"\n{'metric':<55} {'before':>12} {'after':>12} {'better %':>9}", file=sys.stderr)
+        for name, before, after, change in compare(previous, results):
+            print(f"{name:<55} {before:>12} {after:>12} {change:>+9.1f}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+# benchmarks/serve.py
+"""Run the server with mock interpreters in its own process (used by the load generator).
+
+    python -m benchmarks.serve --port 8765 --latency 0.05 --pool-size 4
+"""
+import argparse
+import json
+import logging
+import sys
+
+from benchmarks.common import build_app, prepare_config, temporary_workdir
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="AI Control Server with a mock LLM")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--config", default="{}", help="JSON overrides for ai_models_config.json")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    with temporary_workdir():
+        logging.basicConfig(level=args.log_level)
+        prepare_config(json.loads(args.config))
+        app = build_app(args.latency, args.pool_size)
+        uvicorn.run(app, host=args.host, port=args.port, log_level=args.log_level.lower())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
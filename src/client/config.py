@@ -13,7 +13,8 @@ DEFAULT_CONFIG = {
     'reconnect_delay': 3,
     'screenshot_quality': 80,
     'safety_mode': True,
-    'log_commands': True
+    'log_commands': True,
+    'stream_results': True
 }
 
 def load_config():
@@ -6,6 +6,11 @@ import io
 import logging
 from datetime import datetime
 
+try:
+    from ...common.safety_rules import CLIENT_DANGEROUS_COMMANDS, check_command
+except ImportError:
+    from common.safety_rules import CLIENT_DANGEROUS_COMMANDS, check_command
+
 logger = logging.getLogger(__name__)
 
 # Safe dynamic imports
@@ -30,15 +35,16 @@ except ImportError:
 class SafeExecutor:
     """Filters and sanitizes commands before execution."""
 
-    DANGEROUS_COMMANDS = [
-        'format', 'del *', 'rmdir /s', 'rm -rf', 'shutdown /s',
-        'restart', 'reboot', 'diskpart', 'fdisk', 'mkfs'
-    ]
+    DANGEROUS_COMMANDS = CLIENT_DANGEROUS_COMMANDS
 
     @staticmethod
     def is_safe_command(command):
-        command_lower = command.lower()
-        return not any(dangerous in command_lower for dangerous in SafeExecutor.DANGEROUS_COMMANDS)
+        return SafeExecutor.find_violation(command) is None
+
+    @staticmethod
+    def find_violation(command):
+        """Returns the shared safety rule the command breaks, or None."""
+        return check_command(command, "client")
 
     @staticmethod
     def sanitize_command(command):
@@ -88,8 +94,9 @@ class ActionExecutor:
 
     def _execute_system_command(self, command):
         if self.config.get('safety_mode', True):
-            if not SafeExecutor.is_safe_command(command):
-                return f"Command blocked for safety: {command}"
+            violation = SafeExecutor.find_violation(command)
+            if violation:
+                return f"Command blocked for safety: {violation.message}"
             command = SafeExecutor.sanitize_command(command)
 
         try:
@@ -12,19 +12,18 @@ if sys.platform == "win32":
     sys.stdout = codecs.getwriter('utf-8')(sys.stdout.detach())
     sys.stderr = codecs.getwriter('utf-8')(sys.stderr.detach())
 
-# Setup logging with Windows-safe format
+# Setup logging: records go through a queue to a background writer thread
 try:
-    os.makedirs('logs', exist_ok=True)
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('logs/client.log', mode='w', encoding='utf-8'),
-            logging.StreamHandler()
-        ]
-    )
-except:
-    # Fallback logging if file creation fails
+    try:
+        from ..common.logging_pipeline import setup_logging_pipeline
+    except ImportError:
+        from common.logging_pipeline import setup_logging_pipeline
+    setup_logging_pipeline('logs/client.log', {
+        # Every server frame is logged; keep one in ten of those lines
+        "sample": [{"logger": __name__, "contains": "Received message of type", "every": 10}]
+    })
+except Exception:
+    # Fallback logging if the pipeline cannot be set up
     logging.basicConfig(level=logging.INFO)
 
 logger = logging.getLogger(__name__)
@@ -117,10 +116,7 @@ class AIClient:
                     break
 
                 self._send_command(user_input, mode='interactive')
-                response = self.connection.receive_message()
-                if response:
-                    self._handle_server_message(response)
-                else:
+                if not self._wait_for_command_result():
                     print("No response from server. Is it running?")
 
         except KeyboardInterrupt:
@@ -133,12 +129,19 @@ class AIClient:
         """Sends a single command and exits."""
         print(f"Sending single command: {command}")
         self._send_command(command, mode='single')
-        response = self.connection.receive_message()
-        if response:
-            self._handle_server_message(response)
-        else:
+        if not self._wait_for_command_result():
             print("No response from server.")
 
+    def _wait_for_command_result(self):
+        """Handles streamed partial frames until the final result arrives."""
+        while True:
+            response = self.connection.receive_message()
+            if not response:
+                return False
+            self._handle_server_message(response)
+            if response.get('type') in ['command_result', 'error']:
+                return True
+
     def _send_command(self, command, mode):
         """Constructs and sends a command message to the server."""
         message = {
@@ -148,6 +151,7 @@ class AIClient:
                 'mode': mode,
                 'system_info': self.executor.get_system_info()
             },
+            'stream': self.config.get('stream_results', True),
             'timestamp': datetime.now().isoformat()
         }
 
@@ -160,20 +164,21 @@ class AIClient:
         msg_type = message.get('type')
         logger.info(f"Received message of type: {msg_type}")
 
-        if msg_type == 'command_result':
+        if msg_type == 'command_partial':
+            # Run each action as soon as its code block is complete
+            action = message.get('action')
+            if action:
+                self._execute_server_action(message.get('index', 0) + 1, action)
+
+        elif msg_type == 'command_result':
             result_data = message.get('result', {})
             actions = result_data.get('actions', [])
+            # Actions already delivered through command_partial frames were executed
+            streamed = result_data.get('streamed_actions', 0)
             if actions:
                 print(f"Received {len(actions)} action(s) from server.")
-                for i, action in enumerate(actions, 1):
-                    action_type = action.get('type', 'unknown')
-                    action_code = action.get('code', 'N/A')
-                    print(f"  - Action {i}: {action_type} - {action_code[:50]}")
-                    try:
-                        exec_result = self.executor.execute_action(action)
-                        print(f"    Result: {exec_result}")
-                    except Exception as e:
-                        print(f"    Error: {e}")
+                for i, action in enumerate(actions[streamed:], streamed + 1):
+                    self._execute_server_action(i, action)
             else:
                 print("Server returned no actions.")
 
@@ -191,6 +196,17 @@ class AIClient:
         else:
             print(f"Received unknown message type: {msg_type}")
 
+    def _execute_server_action(self, number, action):
+        """Executes one action received from the server and prints the outcome."""
+        action_type = action.get('type', 'unknown')
+        action_code = action.get('code', 'N/A')
+        print(f"  - Action {number}: {action_type} - {action_code[:50]}")
+        try:
+            exec_result = self.executor.execute_action(action)
+            print(f"    Result: {exec_result}")
+        except Exception as e:
+            print(f"    Error: {e}")
+
 def main():
     """Main entry point for the client application."""
     
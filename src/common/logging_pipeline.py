@@ -0,0 +1,203 @@
+# src/common/logging_pipeline.py
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from typing import Dict, Any, Optional, List, Tuple
+
+# الإعدادات الافتراضية لخط التسجيل
+DEFAULT_LOGGING_CONFIG = {
+    "level": "INFO",
+    "format": "text",
+    "console": True,
+    "max_bytes": 10 * 1024 * 1024,
+    "backup_count": 5,
+    "rotate_when": "midnight",
+    "queue_size": 10000,
+    "sample": []
+}
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+# مسجلات بملفات مستقلة (مثل سجل التتبع) لكل منها طابور وخيط كتابة
+_file_logs: Dict[str, Tuple[str, logging.handlers.QueueListener]] = {}
+
+class JsonFormatter(logging.Formatter):
+    """سطر JSON واحد لكل سجل"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName
+        }
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+class SizeAndTimeRotatingFileHandler(logging.handlers.TimedRotatingFileHandler):
+    """تدوير الملف عند تجاوز الحجم أو عند حلول موعد التدوير، أيهما أسبق"""
+
+    def __init__(self, filename: str, max_bytes: int = 0, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.max_bytes = max_bytes
+
+    def shouldRollover(self, record: logging.LogRecord) -> int:
+        if super().shouldRollover(record):
+            return 1
+        if self.max_bytes > 0 and self.stream is not None:
+            message = f"{self.format(record)}\n"
+            self.stream.seek(0, 2)
+            if self.stream.tell() + len(message.encode(self.encoding or "utf-8")) >= self.max_bytes:
+                return 1
+        return 0
+
+    def rotation_filename(self, default_name: str) -> str:
+        # تدويران في نفس الفترة الزمنية (بسبب الحجم) يجب ألا يكتب أحدهما فوق الآخر
+        name, counter = default_name, 1
+        while os.path.exists(name):
+            name = f"{default_name}.{counter}"
+            counter += 1
+        return name
+
+class SamplingFilter(logging.Filter):
+    """تمرير رسالة واحدة من كل N رسائل متكررة لمسجل معين"""
+
+    def __init__(self, rules: Optional[List[Dict[str, Any]]] = None):
+        super().__init__()
+        self.rules = [dict(rule) for rule in rules or []]
+        self._counters = [0] * len(self.rules)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _logger_matches(name: str, rule_logger: str) -> bool:
+        # يكفي الجزء الأخير من الاسم حتى يعمل مع src.server.x و server.x و __main__
+        return not rule_logger or name == rule_logger or name.endswith("." + rule_logger)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            # التحذيرات والأخطاء لا تُعيّن أبداً
+            return True
+        for index, rule in enumerate(self.rules):
+            if not self._logger_matches(record.name, rule.get("logger", "")):
+                continue
+            if rule.get("contains") and rule["contains"] not in str(record.msg):
+                continue
+            every = max(1, int(rule.get("every", 1)))
+            with self._lock:
+                count = self._counters[index]
+                self._counters[index] += 1
+            return count % every == 0
+        return True
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """لا يحجب حلقة الأحداث إذا امتلأ الطابور، بل يُسقط السجل ويعدّه"""
+
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+def build_formatter(fmt: str) -> logging.Formatter:
+    return JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT)
+
+def setup_logging_pipeline(log_file: Optional[str], config: Optional[Dict[str, Any]] = None) -> logging.Logger:
+    """توجيه جميع السجلات عبر طابور إلى خيط كتابة واحد مع تدوير الملفات"""
+    global _listener
+    settings = dict(DEFAULT_LOGGING_CONFIG)
+    settings.update(config or {})
+    stop_logging_pipeline()
+
+    formatter = build_formatter(settings["format"])
+    handlers: List[logging.Handler] = []
+    if log_file:
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+            file_handler = SizeAndTimeRotatingFileHandler(
+                log_file,
+                max_bytes=settings["max_bytes"],
+                when=settings["rotate_when"],
+                backupCount=settings["backup_count"],
+                encoding="utf-8"
+            )
+            file_handler.setFormatter(formatter)
+            handlers.append(file_handler)
+        except OSError as e:
+            print(f"WARNING: Cannot open log file {log_file}: {e}")
+    if settings["console"]:
+        console = logging.StreamHandler()
+        # الطرفية تبقى نصية حتى مع تفعيل JSON للملف
+        console.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(console)
+
+    records: "queue.Queue" = queue.Queue(maxsize=settings["queue_size"])
+    queue_handler = DroppingQueueHandler(records)
+    # التعيين قبل الطابور حتى لا تكلّف الرسائل المُسقطة أي تنسيق أو كتابة
+    queue_handler.addFilter(SamplingFilter(settings["sample"]))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(settings["level"])
+
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging_pipeline)
+    return logging.getLogger(__name__)
+
+def attach_file_log(name: str, log_file: str, config: Optional[Dict[str, Any]] = None) -> logging.Logger:
+    """مسجل يكتب رسائله كما هي في ملف مستقل عبر طابور، دون المرور بالسجل الرئيسي"""
+    settings = dict(DEFAULT_LOGGING_CONFIG)
+    settings.update(config or {})
+    target = logging.getLogger(name)
+    existing = _file_logs.get(name)
+    if existing is not None and existing[0] == log_file:
+        return target
+    if existing is not None:
+        _stop_listener(existing[1])
+
+    file_handler = SizeAndTimeRotatingFileHandler(
+        log_file,
+        max_bytes=settings["max_bytes"],
+        when=settings["rotate_when"],
+        backupCount=settings["backup_count"],
+        encoding="utf-8"
+    )
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+    records: "queue.Queue" = queue.Queue(maxsize=settings["queue_size"])
+    listener = logging.handlers.QueueListener(records, file_handler)
+    listener.start()
+
+    for handler in list(target.handlers):
+        target.removeHandler(handler)
+    target.addHandler(DroppingQueueHandler(records))
+    target.setLevel(logging.INFO)
+    target.propagate = False
+    _file_logs[name] = (log_file, listener)
+    atexit.register(stop_logging_pipeline)
+    return target
+
+def _stop_listener(listener: logging.handlers.QueueListener):
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+def stop_logging_pipeline():
+    """تفريغ الطوابير وإيقاف خيوط الكتابة"""
+    global _listener
+    if _listener is not None:
+        listener, _listener = _listener, None
+        _stop_listener(listener)
+    while _file_logs:
+        _, (_, listener) = _file_logs.popitem()
+        _stop_listener(listener)
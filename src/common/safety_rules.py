@@ -0,0 +1,208 @@
+# src/common/safety_rules.py
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional, List, NamedTuple, Tuple
+
+logger = logging.getLogger(__name__)
+
+# قائمة الأوامر الخطيرة المحظورة على الخادم
+DANGEROUS_COMMANDS = [
+    'format', 'fdisk', 'mkfs', 'diskpart',
+    'del /s', 'rm -rf', 'rmdir /s',
+    'shutdown /s /t 0', 'poweroff', 'halt', 'init 0',
+    'net user', 'passwd', 'chpasswd',
+    'sudo rm', 'sudo dd', 'dd if='
+]
+
+# مجلدات محمية
+PROTECTED_DIRECTORIES = [
+    'C:\\Windows\\System32', 'C:\\Windows\\SysWOW64',
+    '/etc', '/sys', '/proc', '/dev', '/bin', '/sbin',
+    '/System', '/Library'
+]
+
+# رموز ربط الأوامر، تُحظر عند تكرارها في نفس الأمر
+DANGEROUS_OPERATORS = ['&&', '||', ';', '|', '>', '>>', '<']
+
+# الأوامر المحظورة قبل التنفيذ على جهاز العميل
+CLIENT_DANGEROUS_COMMANDS = [
+    'format', 'del *', 'rmdir /s', 'rm -rf', 'shutdown /s',
+    'restart', 'reboot', 'diskpart', 'fdisk', 'mkfs'
+]
+
+RULE_KINDS = ("command", "directory", "operator", "regex")
+SCOPES = ("server", "client")
+
+# ملف القواعد الإضافية، يُعاد تحميله تلقائياً عند تعديله
+DEFAULT_RULES_FILE = "safety_rules.json"
+
+class SafetyRule(NamedTuple):
+    """قاعدة أمان واحدة"""
+    rule_id: str
+    kind: str
+    pattern: str
+    message: str
+    scopes: Tuple[str, ...] = SCOPES
+
+class SafetyMatch(NamedTuple):
+    """القاعدة التي طابقت الأمر والنص المطابق"""
+    rule_id: str
+    kind: str
+    pattern: str
+    message: str
+    matched_text: str
+
+def _make_rule(kind: str, pattern: str, scopes: Tuple[str, ...]) -> SafetyRule:
+    if kind == "command":
+        message = f"Contains dangerous command: {pattern}"
+    elif kind == "directory":
+        message = f"Targets protected directory: {pattern}"
+    elif kind == "operator":
+        message = f"Contains potentially dangerous operator: {pattern}"
+    else:
+        message = f"Matches blocked pattern: {pattern}"
+    return SafetyRule(f"{kind}:{pattern}", kind, pattern, message, scopes)
+
+def _default_rules() -> List[SafetyRule]:
+    rules = []
+    for pattern in DANGEROUS_COMMANDS:
+        scopes = SCOPES if pattern in CLIENT_DANGEROUS_COMMANDS else ("server",)
+        rules.append(_make_rule("command", pattern, scopes))
+    for pattern in CLIENT_DANGEROUS_COMMANDS:
+        if pattern not in DANGEROUS_COMMANDS:
+            rules.append(_make_rule("command", pattern, ("client",)))
+    for pattern in PROTECTED_DIRECTORIES:
+        rules.append(_make_rule("directory", pattern, ("server",)))
+    for pattern in DANGEROUS_OPERATORS:
+        rules.append(_make_rule("operator", pattern, ("server",)))
+    return rules
+
+DEFAULT_RULES = _default_rules()
+
+def _rule_regex(rule: SafetyRule) -> str:
+    if rule.kind == "regex":
+        return rule.pattern
+    escaped = re.escape(rule.pattern)
+    if rule.kind == "operator":
+        # الرمز مكرر مرتين على الأقل (يعادل len(command.split(op)) > 2)
+        return f"{escaped}[\\s\\S]*?{escaped}"
+    return escaped
+
+class SafetyRuleSet:
+    """جميع قواعد نطاق واحد مجمعة في تعبير منتظم واحد يفحص الأمر في مرور واحد"""
+
+    def __init__(self, rules: List[SafetyRule]):
+        self.rules = list(rules)
+        # ترتيب الأنواع يحدد الأولوية عند التطابق في نفس الموضع
+        ordered = sorted(self.rules, key=lambda rule: RULE_KINDS.index(rule.kind))
+        self._groups: Dict[str, SafetyRule] = {}
+        parts = []
+        for index, rule in enumerate(ordered):
+            group = f"r{index}"
+            self._groups[group] = rule
+            parts.append(f"(?P<{group}>{_rule_regex(rule)})")
+        self._regex = re.compile("|".join(parts), re.IGNORECASE) if parts else None
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def check(self, command: str) -> Optional[SafetyMatch]:
+        """إرجاع أول قاعدة مطابقة في الأمر أو None إذا كان آمناً"""
+        if self._regex is None or not command:
+            return None
+        match = self._regex.search(command)
+        if match is None:
+            return None
+        rule = self._groups[match.lastgroup]
+        return SafetyMatch(rule.rule_id, rule.kind, rule.pattern, rule.message, match.group(0))
+
+class SafetyRuleRegistry:
+    """يحمل القواعد الافتراضية وقواعد الملف ويعيد تجميعها عند تغير الملف"""
+
+    def __init__(self, rules_file: Optional[str] = DEFAULT_RULES_FILE, check_interval: float = 1.0):
+        self.rules_file = rules_file
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._file_mtime: Optional[float] = None
+        self._last_check = 0.0
+        self._rule_sets: Dict[str, SafetyRuleSet] = {}
+        self._compile(DEFAULT_RULES)
+
+    def _compile(self, rules: List[SafetyRule]):
+        self._rule_sets = {
+            scope: SafetyRuleSet([rule for rule in rules if scope in rule.scopes])
+            for scope in SCOPES
+        }
+
+    def _load_file(self) -> List[SafetyRule]:
+        with open(self.rules_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        rules = [] if data.get("replace_defaults", False) else list(DEFAULT_RULES)
+        for item in data.get("rules", []):
+            kind = item.get("kind", "command")
+            if kind not in RULE_KINDS:
+                raise ValueError(f"Unknown rule kind: {kind}")
+            pattern = item["pattern"]
+            if kind == "regex":
+                re.compile(pattern)
+            scopes = tuple(item.get("scopes", SCOPES))
+            rule = _make_rule(kind, pattern, scopes)
+            rules.append(rule._replace(
+                rule_id=item.get("id", rule.rule_id),
+                message=item.get("message", rule.message)
+            ))
+        return rules
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        with self._lock:
+            self._last_check = now
+            try:
+                mtime = os.path.getmtime(self.rules_file) if self.rules_file else None
+            except OSError:
+                mtime = None
+
+            if mtime == self._file_mtime:
+                return
+            try:
+                rules = self._load_file() if mtime is not None else DEFAULT_RULES
+                self._compile(rules)
+                self._file_mtime = mtime
+                logger.info(f"🛡️ Safety rules compiled ({len(rules)} rules)")
+            except Exception as e:
+                # نحتفظ بالقواعد السابقة إذا كان الملف غير صالح
+                self._file_mtime = mtime
+                logger.error(f"Invalid safety rules file {self.rules_file}: {e}")
+
+    def get_rule_set(self, scope: str) -> SafetyRuleSet:
+        """مجموعة القواعد المجمعة لنطاق الخادم أو العميل"""
+        self._refresh()
+        return self._rule_sets[scope]
+
+    def reload(self):
+        """فرض إعادة قراءة ملف القواعد"""
+        self._last_check = 0.0
+        self._file_mtime = -1.0
+        self._refresh()
+
+_registry = SafetyRuleRegistry()
+
+def configure_rules_file(path: Optional[str], check_interval: float = 1.0) -> SafetyRuleRegistry:
+    """تغيير مسار ملف القواعد"""
+    global _registry
+    _registry = SafetyRuleRegistry(path, check_interval)
+    return _registry
+
+def get_rule_set(scope: str = "server") -> SafetyRuleSet:
+    return _registry.get_rule_set(scope)
+
+def check_command(command: str, scope: str = "server") -> Optional[SafetyMatch]:
+    """فحص الأمر مقابل قواعد النطاق المحدد"""
+    return _registry.get_rule_set(scope).check(command)
@@ -1,10 +1,16 @@
+import asyncio
 import json
 import logging
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
-from fastapi import FastAPI, WebSocket, HTTPException, Request
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request, Depends
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+
+from ..services.metrics import REGISTRY
+from ..core.scheduler import SchedulerRejected
+from ..core.batch import BatchTooLargeError
 
 logger = logging.getLogger(__name__)
 
@@ -13,7 +19,7 @@ def register_endpoints(app: FastAPI, controller):
     @app.get("/")
     async def root():
         """Root endpoint with server information"""
-        return HTMLResponse(content=f\"\"\"
+        return HTMLResponse(content=f"""
         <!DOCTYPE html>
         <html>
         <head>
@@ -32,44 +38,56 @@ def register_endpoints(app: FastAPI, controller):
                 <div class="info">
                     <h3>Server Status</h3>
                     <p>Version: 2.0</p>
-                    <p>Open Interpreter: {"Available" if controller.interpreter else "Not Available"}</p>
+                    <p>Open Interpreter: {"Available" if controller.interpreter_available else "Not Available"}</p>
                     <p>Active Connections: {len(controller.clients)}</p>
-                    <p>Commands Processed: {len(controller.command_history)}</p>
+                    <p>Commands Processed: {len(controller.history)}</p>
                 </div>
                 <h3>Available Endpoints</h3>
                 <div class="endpoint">GET /status - Server status information</div>
                 <div class="endpoint">POST /process - Process single command</div>
+                <div class="endpoint">POST /process/batch - Process many commands in one call</div>
                 <div class="endpoint">GET /history - Get command history</div>
+                <div class="endpoint">GET /history/export - Stream command history as NDJSON</div>
+                <div class="endpoint">GET /metrics - Prometheus metrics</div>
+                <div class="endpoint">GET /traces/chrome - Per-stage timings in Chrome trace format</div>
                 <div class="endpoint">WebSocket /ws - Real-time communication</div>
             </div>
         </body>
         </html>
-        \"\"\")
+        """)
 
     @app.get("/status")
     async def get_status():
         """Get server status"""
-        # This will need to be improved, maybe move requests to a service
-        import requests
-        ollama_status = "disconnected"
-        try:
-            response = requests.get("http://localhost:11434/api/tags", timeout=5)
-            if response.status_code == 200:
-                ollama_status = "connected"
-        except:
-            pass
+        # Served from the health monitor snapshot: no network I/O on the request path
+        health = controller.health_monitor.snapshot()
+        ollama_status = "connected" if controller.health_monitor.provider_status("ollama") == "connected" else "disconnected"
+        # Aggregated over all workers when running with several processes
+        cluster = await controller.get_cluster_stats()
+        total_commands = cluster["commands"]["total"] if controller.shared_state.shared else len(controller.history)
 
         return {
             "status": "online",
             "version": "2.0",
             "timestamp": datetime.now().isoformat(),
-            "interpreter_available": controller.interpreter is not None,
+            "interpreter_available": controller.interpreter_available,
+            "interpreter_state": controller.interpreter_state,
             "ollama_status": ollama_status,
-            "connected_clients": len(controller.clients),
-            "total_commands": len(controller.command_history),
+            "health_sampled_at": health["sampled_at"],
+            "connected_clients": cluster["connected_clients"],
+            "total_commands": total_commands,
+            "workers": cluster["workers"],
             "uptime": "running"
         }
 
+    def rejected_response(e: SchedulerRejected) -> JSONResponse:
+        """Admission control: rate limited or the queues are full"""
+        return JSONResponse(
+            status_code=429,
+            content={"error": str(e), "reason": e.reason, "retry_after": e.retry_after},
+            headers={"Retry-After": str(max(1, round(e.retry_after)))}
+        )
+
     @app.post("/process")
     async def process_command_endpoint(request: Request):
         """Process a single command"""
@@ -81,7 +99,11 @@ def register_endpoints(app: FastAPI, controller):
                 raise HTTPException(status_code=400, detail="No command provided")
 
             context = data.get('context')
-            result = await controller.process_command(command, context)
+            client_id = data.get('client_id') or (f"http:{request.client.host}" if request.client else None)
+            try:
+                result = await controller.submit_command(command, context, priority="rest", client_id=client_id)
+            except SchedulerRejected as e:
+                return rejected_response(e)
 
             await controller.broadcast_to_clients({
                 "type": "command_processed",
@@ -97,34 +119,157 @@ def register_endpoints(app: FastAPI, controller):
             logger.error(f"Command processing error: {e}")
             raise HTTPException(status_code=500, detail=str(e))
 
+    def command_text(item) -> Optional[str]:
+        return item if isinstance(item, str) else item.get("command")
+
+    @app.post("/process/batch")
+    async def process_batch_endpoint(request: Request):
+        """Process many commands concurrently; results come back in input order.
+
+        Body: {"commands": ["open notepad", {"command": "...", "context": {...}}], "context": {...}, "stream": false}
+        With "stream": true each result is sent as an NDJSON line as soon as it is ready.
+        """
+        try:
+            data = await request.json()
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid JSON")
+        if not isinstance(data, dict):
+            raise HTTPException(status_code=400, detail="Body must be a JSON object")
+
+        items = data.get('commands')
+        context = data.get('context')
+        client_id = data.get('client_id') or (f"http:{request.client.host}" if request.client else None)
+
+        try:
+            controller.batch.validate(items)
+            controller.scheduler.charge(client_id)
+        except BatchTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except SchedulerRejected as e:
+            return rejected_response(e)
+
+        async def run(on_result=None):
+            # The rate limit was charged once above for the whole batch
+            results = await controller.process_batch(
+                items, context, client_id=client_id, on_result=on_result, charge=False
+            )
+            # One aggregated broadcast instead of one per command
+            await controller.broadcast_to_clients({
+                "type": "command_batch_processed",
+                "count": len(items),
+                "results": [
+                    {"command": command_text(item), "result": result} for item, result in zip(items, results)
+                ]
+            })
+            return results
+
+        if not data.get('stream'):
+            results = await run()
+            return JSONResponse(content={"count": len(items), "results": results})
+
+        async def ndjson():
+            queue: asyncio.Queue = asyncio.Queue()
+
+            async def on_result(index, result):
+                await queue.put({"index": index, "command": command_text(items[index]), "result": result})
+
+            task = asyncio.ensure_future(run(on_result))
+            task.add_done_callback(lambda _: queue.put_nowait(None))
+            try:
+                while True:
+                    line = await queue.get()
+                    if line is None:
+                        break
+                    yield json.dumps(line, ensure_ascii=False, default=str) + "\n"
+                task.result()
+                yield json.dumps({"done": True, "count": len(items)}) + "\n"
+            finally:
+                if not task.done():
+                    task.cancel()
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    def history_filters(
+        client_id: Optional[str] = None,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        success: Optional[bool] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        min_processing_time: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Query parameters shared by /history and /history/export"""
+        return {
+            "client_id": client_id,
+            "provider": provider,
+            "model": model,
+            "success": success,
+            "since": since,
+            "until": until,
+            "min_processing_time": min_processing_time
+        }
+
     @app.get("/history")
-    async def get_history(limit: int = 10):
-        """Get command history"""
+    async def get_history(
+        limit: int = 10,
+        before_id: Optional[int] = None,
+        filters: Dict[str, Any] = Depends(history_filters)
+    ):
+        """Get command history, newest first; pass next_before_id to fetch older pages"""
+        filters = {key: value for key, value in filters.items() if value is not None}
+        if filters:
+            # Indexed query against the journal
+            page = await run_in_threadpool(controller.query_history, limit, before_id, **filters)
+        else:
+            # Pages held in memory are served inline; older pages and shared (multi-worker)
+            # mode read the on-disk journal, so they run in the thread pool
+            page = controller.get_memory_history_page(limit, before_id)
+            if page is None:
+                page = await run_in_threadpool(controller.get_history_page, limit, before_id)
         return {
-            "history": controller.get_history(limit),
-            "total_commands": len(controller.command_history)
+            **page,
+            "total_commands": len(controller.history)
         }
 
+    @app.get("/history/export")
+    async def export_history(filters: Dict[str, Any] = Depends(history_filters)):
+        """Stream matching history entries as NDJSON, oldest first"""
+        filters = {key: value for key, value in filters.items() if value is not None}
+
+        def ndjson():
+            for entry in controller.history.iter_export(**filters):
+                yield json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+
+        # A sync generator is iterated in the thread pool, one batch of rows at a time
+        return StreamingResponse(
+            ndjson(),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": "attachment; filename=command_history.ndjson"}
+        )
+
     @app.websocket("/ws")
     async def websocket_endpoint(websocket: WebSocket):
         """WebSocket endpoint for real-time communication"""
         await websocket.accept()
         client_id = id(websocket)
-        controller.clients[client_id] = websocket
+        # All frames for this client go through its send queue so they stay ordered
+        controller.register_client(client_id, websocket)
 
         logger.info(f"WebSocket client {client_id} connected")
 
         try:
-            await websocket.send_text(json.dumps({
+            await controller.send_to_client(client_id, {
                 "type": "connection_established",
                 "client_id": client_id,
                 "message": "Connected to AI Control Server",
                 "server_info": {
                     "version": "2.0",
-                    "interpreter_available": controller.interpreter is not None,
+                    "interpreter_available": controller.interpreter_available,
                     "timestamp": datetime.now().isoformat()
                 }
-            }))
+            })
 
             while True:
                 try:
@@ -137,24 +282,89 @@ def register_endpoints(app: FastAPI, controller):
                         command = message.get('command')
                         if command:
                             context = message.get('context')
-                            result = await controller.process_command(command, context)
+                            on_partial = None
+                            if message.get('stream'):
+                                # Forward tokens and completed actions as the model produces them
+                                async def on_partial(event, command=command):
+                                    await controller.send_to_client(client_id, {
+                                        "type": "command_partial",
+                                        "command": command,
+                                        **event,
+                                        "timestamp": datetime.now().isoformat()
+                                    })
 
-                            await websocket.send_text(json.dumps({
+                            try:
+                                result = await controller.submit_command(
+                                    command, context, priority="interactive",
+                                    on_partial=on_partial, client_id=str(client_id)
+                                )
+                            except SchedulerRejected as e:
+                                await controller.send_to_client(client_id, {
+                                    "type": "busy",
+                                    "command": command,
+                                    "reason": e.reason,
+                                    "retry_after": e.retry_after,
+                                    "timestamp": datetime.now().isoformat()
+                                })
+                                continue
+
+                            await controller.send_to_client(client_id, {
                                 "type": "command_result",
                                 "command": command,
                                 "result": result,
                                 "timestamp": datetime.now().isoformat()
-                            }))
+                            })
                         else:
-                            await websocket.send_text(json.dumps({"type": "error", "message": "No command provided"}))
+                            await controller.send_to_client(client_id, {"type": "error", "message": "No command provided"})
+
+                    elif message_type == 'command_batch':
+                        items = message.get('commands')
+                        on_result = None
+                        if message.get('stream'):
+                            # Send each result as soon as it is ready, then the ordered list
+                            async def on_result(index, result, items=items):
+                                await controller.send_to_client(client_id, {
+                                    "type": "command_batch_item",
+                                    "index": index,
+                                    "command": command_text(items[index]),
+                                    "result": result,
+                                    "timestamp": datetime.now().isoformat()
+                                })
+
+                        try:
+                            results = await controller.process_batch(
+                                items, message.get('context'), client_id=str(client_id), on_result=on_result
+                            )
+                        except SchedulerRejected as e:
+                            await controller.send_to_client(client_id, {
+                                "type": "busy",
+                                "batch": True,
+                                "reason": e.reason,
+                                "retry_after": e.retry_after,
+                                "timestamp": datetime.now().isoformat()
+                            })
+                            continue
+                        except ValueError as e:
+                            await controller.send_to_client(client_id, {"type": "error", "message": str(e)})
+                            continue
+
+                        await controller.send_to_client(client_id, {
+                            "type": "command_batch_result",
+                            "count": len(results),
+                            "results": results,
+                            "timestamp": datetime.now().isoformat()
+                        })
 
                     elif message_type == 'ping':
-                        await websocket.send_text(json.dumps({"type": "pong", "timestamp": datetime.now().isoformat()}))
+                        await controller.send_to_client(client_id, {"type": "pong", "timestamp": datetime.now().isoformat()})
 
                     elif message_type == 'get_status':
                         status = await get_status()
-                        await websocket.send_text(json.dumps({"type": "status_response", "status": status}))
+                        await controller.send_to_client(client_id, {"type": "status_response", "status": status})
 
+                except WebSocketDisconnect:
+                    # Normal close from the client side
+                    break
                 except Exception as e:
                     logger.error(f"WebSocket message handling error: {e}")
                     # Handle specific exceptions if needed
@@ -163,10 +373,27 @@ def register_endpoints(app: FastAPI, controller):
         except Exception as e:
             logger.error(f"WebSocket error for client {client_id}: {e}")
         finally:
-            if client_id in controller.clients:
-                del controller.clients[client_id]
+            await controller.unregister_client(client_id)
             logger.info(f"WebSocket client {client_id} disconnected")
 
+    @app.get("/metrics")
+    async def metrics():
+        """Prometheus text exposition of latency histograms, counters and gauges"""
+        return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+    @app.get("/traces")
+    async def get_traces(limit: int = 20):
+        """Recent per-stage timing traces"""
+        return {"traces": [trace.to_dict() for trace in controller.tracer.recent(limit)]}
+
+    @app.get("/traces/chrome")
+    async def export_chrome_trace(limit: int = 200):
+        """Recent traces in Chrome trace-event format (load in chrome://tracing or Perfetto)"""
+        return JSONResponse(
+            content=controller.tracer.chrome_trace(limit),
+            headers={"Content-Disposition": "attachment; filename=ai_control_trace.json"}
+        )
+
     @app.get("/health")
     async def health_check():
         """Simple health check"""
@@ -1,82 +1,373 @@
 # src/server/config.py
+import asyncio
 import logging
 import os
 import json
-from typing import Dict, Any, Optional
-
-def setup_logging():
-    """إعداد نظام تسجيل محسن"""
-    os.makedirs('logs', exist_ok=True)
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('logs/server.log', mode='w', encoding='utf-8'),
-            logging.StreamHandler()
-        ]
-    )
+import tempfile
+import threading
+from types import MappingProxyType
+from typing import Dict, Any, Optional, Mapping, Callable, List, Tuple
+
+try:
+    from ..common.logging_pipeline import setup_logging_pipeline
+except ImportError:
+    from common.logging_pipeline import setup_logging_pipeline
+
+def setup_logging(config: Optional[Dict[str, Any]] = None):
+    """إعداد نظام تسجيل غير متزامن مع تدوير الملفات (قسم logging في التكوين)"""
+    setup_logging_pipeline('logs/server.log', config)
     return logging.getLogger(__name__)
 
-def load_ai_config() -> Dict[str, Any]:
-    """تحميل إعدادات AI من ملف التكوين"""
-    config_file = "ai_models_config.json"
-    default_config = {
-        "default_provider": "ollama",
-        "providers": {
-            "ollama": {
-                "enabled": True,
-                "base_url": "http://localhost:11434",
-                "default_model": "qwen2.5-coder:7b",
-                "models": [
-                    "qwen2.5-coder:7b",
-                    "llama3.2:3b", 
-                    "mistral:7b",
-                    "deepseek-coder:6.7b",
-                    "phi3:mini"
-                ]
-            },
-            "openai": {
-                "enabled": False,
-                "api_key": "",
-                "default_model": "gpt-4",
-                "models": ["gpt-4", "gpt-3.5-turbo"]
-            },
-            "anthropic": {
-                "enabled": False,
-                "api_key": "",
-                "default_model": "claude-3-sonnet-20240229",
-                "models": ["claude-3-opus-20240229", "claude-3-sonnet-20240229"]
-            },
-            "google": {
-                "enabled": False,
-                "api_key": "",
-                "default_model": "gemini-pro",
-                "models": ["gemini-pro", "gemini-pro-vision"]
-            }
+CONFIG_FILE = "ai_models_config.json"
+
+# التكوين الافتراضي عند عدم وجود ملف التكوين
+DEFAULT_AI_CONFIG = {
+    "default_provider": "ollama",
+    "execution": {
+        "max_concurrent": 4,
+        "timeout": 120
+    },
+    "pool": {
+        "size": 2,
+        "max_failures": 3,
+        "acquire_timeout": 30,
+        "warmup_prompt": None
+    },
+    "conversation": {
+        "policy": "last_n",
+        "max_turns": 5,
+        "max_tokens": 4000
+    },
+    "cache": {
+        "enabled": True,
+        "max_entries": 512,
+        "ttl": 3600,
+        "persist_path": None
+    },
+    "health": {
+        "interval": 10,
+        "provider_timeout": 3
+    },
+    "history": {
+        "capacity": 100,
+        "journal_path": "logs/command_history.db",
+        "batch_size": 64,
+        "flush_interval": 1.0
+    },
+    "logging": {
+        "level": "INFO",
+        "format": "text",
+        "console": True,
+        "max_bytes": 10485760,
+        "backup_count": 5,
+        "rotate_when": "midnight",
+        "sample": []
+    },
+    "tracing": {
+        "enabled": True,
+        "keep": 200,
+        "log_path": "logs/trace.log"
+    },
+    "broadcast": {
+        "queue_size": 256,
+        "overflow_policy": "drop_oldest",
+        "send_timeout": 10
+    },
+    "startup": {
+        "lazy_interpreter": True,
+        "pending_policy": "basic",
+        "queue_timeout": 30
+    },
+    "routing": {
+        "enabled": False,
+        "routes": [],
+        "pool_size": 1,
+        "latency_alpha": 0.2,
+        "error_weight": 4.0,
+        "window": 100,
+        "hedge": False,
+        "hedge_percentile": 95,
+        "hedge_min_samples": 10,
+        "hedge_delay": 2.0,
+        "breaker_failures": 5,
+        "breaker_cooldown": 30
+    },
+    "speculation": {
+        "enabled": False,
+        "min_confidence": 0.75,
+        "llm_policy": "cancel"
+    },
+    "scheduler": {
+        "enabled": True,
+        "max_concurrent": 8,
+        "max_queue": 100,
+        "max_queue_per_client": 10,
+        "queue_timeout": 30,
+        "rate": 5.0,
+        "burst": 10
+    },
+    "batch": {
+        "max_commands": 100,
+        "max_concurrent": 4
+    },
+    "config": {
+        "watch": True,
+        "poll_interval": 2.0
+    },
+    "workers": {
+        "count": 1,
+        "backend": "auto",
+        "path": "logs/shared_state.db",
+        "poll_interval": 0.05,
+        "heartbeat_interval": 2,
+        "stale_after": 10,
+        "event_retention": 60
+    },
+    "providers": {
+        "ollama": {
+            "enabled": True,
+            "base_url": "http://localhost:11434",
+            "default_model": "qwen2.5-coder:7b",
+            "models": [
+                "qwen2.5-coder:7b",
+                "llama3.2:3b", 
+                "mistral:7b",
+                "deepseek-coder:6.7b",
+                "phi3:mini"
+            ]
+        },
+        "openai": {
+            "enabled": False,
+            "api_key": "",
+            "default_model": "gpt-4",
+            "models": ["gpt-4", "gpt-3.5-turbo"]
+        },
+        "anthropic": {
+            "enabled": False,
+            "api_key": "",
+            "default_model": "claude-3-sonnet-20240229",
+            "models": ["claude-3-opus-20240229", "claude-3-sonnet-20240229"]
+        },
+        "google": {
+            "enabled": False,
+            "api_key": "",
+            "default_model": "gemini-pro",
+            "models": ["gemini-pro", "gemini-pro-vision"]
+        },
+        "mock": {
+            "enabled": False,
+            "default_model": "mock-coder",
+            "models": ["mock-coder"],
+            "latency": 0.05,
+            "tokens_per_second": 0,
+            "chunk_chars": 16,
+            "failure_rate": 0.0,
+            "failure_mode": "error",
+            "hang_seconds": 300,
+            "seed": 0,
+            "recordings_path": None,
+            "templates": None
         }
     }
-    
-    try:
-        if os.path.exists(config_file):
-            with open(config_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-    except Exception as e:
-        logging.error(f"Error loading AI config: {e}")
-    
-    # إنشاء ملف التكوين الافتراضي
-    try:
-        with open(config_file, 'w', encoding='utf-8') as f:
-            json.dump(default_config, f, indent=2, ensure_ascii=False)
-        logging.info(f"Created default AI config: {config_file}")
-    except Exception as e:
-        logging.error(f"Error creating default config: {e}")
-    
-    return default_config
+}
+
+def freeze_config(value):
+    """نسخة غير قابلة للتعديل: القواميس MappingProxyType والقوائم tuple"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze_config(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze_config(item) for item in value)
+    return value
+
+def thaw_config(value):
+    """نسخة عادية قابلة للتعديل والحفظ بصيغة JSON من لقطة مجمدة"""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {key: thaw_config(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw_config(item) for item in value]
+    return value
+
+class ConfigService:
+    """تحليل ملف التكوين مرة واحدة وتقديم لقطة ثابتة، مع إعادة التحميل عند تغير الملف والكتابة الذرية"""
+
+    def __init__(self, path: str = CONFIG_FILE, poll_interval: float = 2.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._snapshot: Mapping[str, Any] = freeze_config(DEFAULT_AI_CONFIG)
+        self._listeners: List[Callable] = []
+        self._task: Optional[asyncio.Task] = None
+        self.version = 0
+        self.stats = {"loads": 0, "reloads": 0, "writes": 0, "errors": 0}
+        self._load()
+
+    @property
+    def snapshot(self) -> Mapping[str, Any]:
+        """اللقطة الحالية (قراءة فقط، بدون أي إدخال/إخراج)"""
+        return self._snapshot
+
+    def mutable_copy(self) -> Dict[str, Any]:
+        return thaw_config(self._snapshot)
+
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            info = os.stat(self.path)
+        except OSError:
+            return None
+        return (info.st_mtime_ns, info.st_size)
+
+    def _load(self):
+        """القراءة الأولى، أو إنشاء الملف الافتراضي إن لم يوجد"""
+        if self._file_signature() is None:
+            try:
+                self._write(DEFAULT_AI_CONFIG)
+                logging.info(f"Created default AI config: {self.path}")
+            except Exception as e:
+                self.stats["errors"] += 1
+                logging.error(f"Error creating default config: {e}")
+            return
+        self.reload_if_changed()
 
-def configure_interpreter(interpreter, ai_config: Optional[Dict] = None):
+    def reload_if_changed(self) -> bool:
+        """استبدال اللقطة إن تغير الملف منذ آخر قراءة (stat فقط إن لم يتغير)"""
+        signature = self._file_signature()
+        if signature is None or signature == self._signature:
+            return False
+        with self._lock:
+            if signature == self._signature:
+                return False
+            self._signature = signature
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception as e:
+                # ملف قيد الكتابة أو غير صالح: نبقي اللقطة السابقة
+                self.stats["errors"] += 1
+                logging.error(f"Error loading AI config: {e}")
+                return False
+            self._snapshot = freeze_config(data)
+            self.version += 1
+        self.stats["loads" if self.version == 1 else "reloads"] += 1
+        return True
+
+    def _write(self, data: Dict[str, Any]):
+        """كتابة ذرية: ملف مؤقت في نفس المجلد ثم استبدال باسم الملف"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        descriptor, temp_path = tempfile.mkstemp(prefix=".ai_models_config.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self._snapshot = freeze_config(data)
+        self._signature = self._file_signature()
+        self.version += 1
+        self.stats["writes"] += 1
+
+    def update(self, mutate: Callable[[Dict[str, Any]], None]) -> Mapping[str, Any]:
+        """تعديل نسخة من التكوين وحفظها ذرياً وإرجاع اللقطة الجديدة (دون إشعار المستمعين)"""
+        with self._lock:
+            data = thaw_config(self._snapshot)
+            mutate(data)
+            self._write(data)
+            return self._snapshot
+
+    def subscribe(self, listener: Callable[[Mapping[str, Any], Mapping[str, Any]], Any]):
+        """استدعاء listener(old, new) عند تغير الملف من خارج الخادم"""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    async def check(self) -> bool:
+        """فحص واحد للملف وإشعار المستمعين عند التغيير"""
+        old = self._snapshot
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(None, self.reload_if_changed):
+            return False
+        logging.info(f"🔁 AI config reloaded from {self.path} (version {self.version})")
+        for listener in list(self._listeners):
+            try:
+                outcome = listener(old, self._snapshot)
+                if asyncio.iscoroutine(outcome):
+                    await outcome
+            except Exception as e:
+                self.stats["errors"] += 1
+                logging.error(f"Error applying reloaded config: {e}")
+        return True
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.check()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                logging.error(f"Error watching AI config: {e}")
+
+    def start(self):
+        """بدء مراقبة الملف بفحص زمن التعديل دورياً"""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "version": self.version,
+            "watching": self._task is not None,
+            "poll_interval": self.poll_interval,
+            **self.stats
+        }
+
+# خدمة واحدة لكل ملف تكوين (حسب المسار المطلق، لأن المسار نسبي لمجلد العمل)
+_config_services: Dict[str, ConfigService] = {}
+_config_services_lock = threading.Lock()
+
+def get_config_service(path: str = CONFIG_FILE) -> ConfigService:
+    """خدمة التكوين المشتركة للملف المحدد"""
+    key = os.path.abspath(path)
+    with _config_services_lock:
+        service = _config_services.get(key)
+        if service is None:
+            service = _config_services[key] = ConfigService(path)
+        return service
+
+def load_ai_config() -> Dict[str, Any]:
+    """نسخة قابلة للتعديل من إعدادات AI (تُحلل عند تغير الملف فقط)"""
+    service = get_config_service()
+    service.reload_if_changed()
+    return service.mutable_copy()
+
+def create_interpreter_instance(interpreter_module):
+    """إنشاء نسخة مستقلة من Open Interpreter إن كانت الحزمة تدعم ذلك"""
+    interpreter_class = getattr(interpreter_module, "OpenInterpreter", None)
+    if interpreter_class is None:
+        # الإصدارات القديمة تستبدل الوحدة بنسخة واحدة مشتركة
+        return interpreter_module
+    return interpreter_class()
+
+def configure_interpreter(interpreter, ai_config: Optional[Mapping] = None):
     """تكوين Open Interpreter مع دعم AI متعدد"""
     if not ai_config:
-        ai_config = load_ai_config()
+        ai_config = get_config_service().snapshot
     
     try:
         provider = ai_config.get("default_provider", "ollama")
@@ -121,6 +412,15 @@ def configure_interpreter(interpreter, ai_config: Optional[Dict] = None):
             
             interpreter.llm.model = provider_config.get("default_model", "gemini-pro")
             interpreter.llm.api_key = api_key
+
+        elif provider == "mock":
+            # مزود محلي حتمي بدون شبكة: يستبدل نسخة Open Interpreter بمفسر وهمي
+            from .services.mock_llm import MockInterpreter
+
+            if isinstance(interpreter, MockInterpreter):
+                interpreter.configure(provider_config)
+            else:
+                interpreter = MockInterpreter.from_config(provider_config)
         
         # إعداد رسالة النظام المحسنة
         interpreter.system_message = """أنت مساعد ذكي للتحكم عن بُعد في أجهزة الكمبيوتر.
@@ -153,22 +453,23 @@ def configure_interpreter(interpreter, ai_config: Optional[Dict] = None):
         logging.error(f"❌ Error configuring Open Interpreter: {e}")
         return None
 
-def get_available_models(ai_config: Optional[Dict] = None) -> Dict[str, list]:
+def get_available_models(ai_config: Optional[Mapping] = None) -> Dict[str, list]:
     """الحصول على قائمة النماذج المتاحة لكل مقدم خدمة"""
     if not ai_config:
-        ai_config = load_ai_config()
+        ai_config = get_config_service().snapshot
     
     available_models = {}
     for provider, config in ai_config.get("providers", {}).items():
         if config.get("enabled", False):
-            available_models[provider] = config.get("models", [])
+            available_models[provider] = list(config.get("models", []))
     
     return available_models
 
-def switch_ai_model(interpreter, provider: str, model: str, ai_config: Optional[Dict] = None):
-    """تبديل نموذج AI أثناء التشغيل"""
+def switch_ai_model(interpreter, provider: str, model: str, ai_config: Optional[Mapping] = None):
+    """تبديل نموذج AI أثناء التشغيل لمفسر واحد أو قائمة مفسرات"""
+    service = get_config_service()
     if not ai_config:
-        ai_config = load_ai_config()
+        ai_config = service.snapshot
     
     try:
         provider_config = ai_config.get("providers", {}).get(provider, {})
@@ -178,17 +479,21 @@ def switch_ai_model(interpreter, provider: str, model: str, ai_config: Optional[
         if model not in provider_config.get("models", []):
             return False, f"Model {model} not available for {provider}"
         
-        # تحديث التكوين
-        ai_config["default_provider"] = provider
-        ai_config["providers"][provider]["default_model"] = model
-        
-        # حفظ التكوين المحدث
-        with open("ai_models_config.json", 'w', encoding='utf-8') as f:
-            json.dump(ai_config, f, indent=2, ensure_ascii=False)
+        # المفسر الوهمي ونسخ Open Interpreter لا يتبادلان داخل المجموعة أثناء التشغيل
+        from .services.mock_llm import MockInterpreter
+        interpreters = interpreter if isinstance(interpreter, (list, tuple)) else [interpreter]
+        if any((provider == "mock") != isinstance(item, MockInterpreter) for item in interpreters if item is not None):
+            return False, "Switching to or from the mock provider requires changing default_provider and restarting"
+
+        # تحديث التكوين وحفظه ذرياً (لا يرى القارئ أبداً ملفاً نصف مكتوب)
+        def select(config):
+            config["default_provider"] = provider
+            config["providers"][provider]["default_model"] = model
+        ai_config = service.update(select)
         
-        # إعادة تكوين المفسر
-        new_interpreter = configure_interpreter(interpreter, ai_config)
-        if new_interpreter:
+        # إعادة تكوين المفسرات
+        configured = [configure_interpreter(item, ai_config) for item in interpreters]
+        if configured and all(configured):
             logging.info(f"✅ Switched to {provider}/{model}")
             return True, f"Successfully switched to {provider}/{model}"
         else:
@@ -0,0 +1,92 @@
+# src/server/core/batch.py
+import asyncio
+import logging
+from typing import Dict, Any, Optional, List, Callable, Awaitable, Hashable
+
+logger = logging.getLogger(__name__)
+
+# الإعدادات الافتراضية لدفعات الأوامر
+DEFAULT_BATCH_CONFIG = {
+    "max_commands": 100,
+    "max_concurrent": 4
+}
+
+class BatchTooLargeError(ValueError):
+    """عدد أوامر الدفعة أكبر من الحد المسموح"""
+
+class BatchProcessor:
+    """معالجة قائمة أوامر بتوازي محدود مع إرجاع النتائج بترتيب الإدخال"""
+
+    def __init__(self, max_commands: int = 100, max_concurrent: int = 4):
+        self.max_commands = max(1, int(max_commands))
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.stats = {"batches": 0, "commands": 0, "deduplicated": 0}
+
+    @classmethod
+    def from_config(cls, ai_config: Optional[Dict] = None) -> "BatchProcessor":
+        """إنشاء المعالج من قسم batch في ملف التكوين"""
+        batch = dict(DEFAULT_BATCH_CONFIG)
+        batch.update((ai_config or {}).get("batch", {}))
+        return cls(
+            max_commands=batch.get("max_commands", 100),
+            max_concurrent=batch.get("max_concurrent", 4)
+        )
+
+    def validate(self, items: List[Any]):
+        """ValueError لدفعة فارغة أو عناصر غير صالحة، وBatchTooLargeError عند تجاوز الحد"""
+        if not isinstance(items, list) or not items:
+            raise ValueError("No commands provided")
+        if len(items) > self.max_commands:
+            raise BatchTooLargeError(f"Batch has {len(items)} commands, the limit is {self.max_commands}")
+        for item in items:
+            command = item.get("command") if isinstance(item, dict) else item
+            if not isinstance(command, str) or not command.strip():
+                raise ValueError("Each command must be a non-empty string or an object with a \"command\" string")
+
+    async def run(
+        self,
+        items: List[Any],
+        process: Callable[[Any], Awaitable[Dict[str, Any]]],
+        key: Optional[Callable[[Any], Hashable]] = None,
+        on_result: Optional[Callable[[int, Dict[str, Any]], Awaitable[None]]] = None
+    ) -> List[Dict[str, Any]]:
+        """تشغيل process لكل عنصر بحد أقصى max_concurrent في نفس الوقت
+
+        العناصر المتطابقة حسب key تُعالج مرة واحدة وتتشارك النتيجة،
+        وon_result تُستدعى لكل عنصر فور جاهزية نتيجته.
+        """
+        self.validate(items)
+        self.stats["batches"] += 1
+        self.stats["commands"] += len(items)
+
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+        shared: Dict[Hashable, asyncio.Future] = {}
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+
+        async def limited(item) -> Dict[str, Any]:
+            async with semaphore:
+                return await process(item)
+
+        async def run_one(index: int, item):
+            identity = key(item) if key is not None else index
+            task = shared.get(identity)
+            if task is None:
+                task = shared[identity] = asyncio.ensure_future(limited(item))
+                result = await task
+            else:
+                self.stats["deduplicated"] += 1
+                result = dict(await asyncio.shield(task))
+                result["deduplicated"] = True
+            results[index] = result
+            if on_result is not None:
+                await on_result(index, result)
+
+        await asyncio.gather(*(run_one(index, item) for index, item in enumerate(items)))
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_commands": self.max_commands,
+            "max_concurrent": self.max_concurrent,
+            **self.stats
+        }
@@ -0,0 +1,289 @@
+# src/server/core/broadcaster.py
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import Dict, Any, Optional, Callable, Tuple
+
+from fastapi import WebSocket
+
+logger = logging.getLogger(__name__)
+
+# الإعدادات الافتراضية للبث
+DEFAULT_BROADCAST_CONFIG = {
+    "queue_size": 256,
+    "overflow_policy": "drop_oldest",
+    "send_timeout": 10
+}
+
+# سياسات امتلاء طابور العميل
+OVERFLOW_POLICIES = ("drop_oldest", "disconnect", "block")
+
+class ClientChannel:
+    """طابور إرسال محدود لعميل واحد مع مهمة كتابة خاصة به"""
+
+    def __init__(
+        self,
+        client_id: int,
+        websocket: WebSocket,
+        queue_size: int = 256,
+        send_timeout: Optional[float] = 10,
+        on_close: Optional[Callable[["ClientChannel"], None]] = None
+    ):
+        self.client_id = client_id
+        self.websocket = websocket
+        self.send_timeout = send_timeout
+        self.queue_size = max(1, int(queue_size))
+        # عناصر (وقت الدخول، الرسالة، يجوز إسقاطها): رسائل البث يجوز إسقاطها بخلاف الردود المباشرة
+        self.queue: deque = deque()
+        self._ready = asyncio.Event()
+        self._space = asyncio.Event()
+        self.closed = False
+        self.close_reason: Optional[str] = None
+        self._on_close = on_close
+        self._writer: Optional[asyncio.Task] = None
+        self.stats = {
+            "sent": 0,
+            "dropped": 0,
+            "bytes_sent": 0,
+            "last_lag": 0.0,
+            "max_lag": 0.0,
+            "total_lag": 0.0
+        }
+
+    def start(self):
+        if self._writer is None:
+            self._writer = asyncio.ensure_future(self._write_loop())
+
+    def _push(self, item: Tuple[float, str, bool]):
+        self.queue.append(item)
+        self._ready.set()
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            while not self.queue:
+                self._ready.clear()
+                await self._ready.wait()
+            enqueued_at, payload, _ = self.queue.popleft()
+            self._space.set()
+            try:
+                await asyncio.wait_for(self.websocket.send_text(payload), self.send_timeout)
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                self._mark_closed(f"send timed out after {self.send_timeout}s")
+                return
+            except Exception as e:
+                self._mark_closed(f"send failed: {e}")
+                return
+
+            # التأخر = الزمن من دخول الرسالة الطابور حتى اكتمال إرسالها
+            lag = loop.time() - enqueued_at
+            self.stats["sent"] += 1
+            self.stats["bytes_sent"] += len(payload)
+            self.stats["last_lag"] = lag
+            self.stats["total_lag"] += lag
+            if lag > self.stats["max_lag"]:
+                self.stats["max_lag"] = lag
+
+    def offer(self, payload: str, policy: str) -> bool:
+        """إضافة رسالة بث دون انتظار، وتطبيق السياسة عند امتلاء الطابور"""
+        if self.closed:
+            return False
+        item = (asyncio.get_running_loop().time(), payload, True)
+        if len(self.queue) < self.queue_size:
+            self._push(item)
+            return True
+        if policy == "drop_oldest":
+            self.stats["dropped"] += 1
+            # يُسقط أقدم بث فقط: إسقاط command_result أو command_partial يترك العميل ينتظر نتيجة لن تصل
+            oldest = next((queued for queued in self.queue if queued[2]), None)
+            if oldest is None:
+                # الطابور كله ردود مباشرة: يُسقط البث الجديد نفسه
+                return False
+            self.queue.remove(oldest)
+            self._push(item)
+            return True
+        # disconnect: العميل متأخر جداً فيُفصل بدلاً من تراكم الرسائل
+        self.stats["dropped"] += 1
+        self._mark_closed("send queue overflow")
+        return False
+
+    async def put(self, payload: str, timeout: Optional[float] = None, droppable: bool = False) -> bool:
+        """إضافة رسالة مع انتظار مساحة في الطابور (ضغط عكسي)؛ الردود المباشرة لا تُسقط عند امتلائه بالبث"""
+        if self.closed:
+            return False
+        loop = asyncio.get_running_loop()
+        item = (loop.time(), payload, droppable)
+        deadline = None if timeout is None else loop.time() + timeout
+        while len(self.queue) >= self.queue_size:
+            self._space.clear()
+            remaining = None if deadline is None else deadline - loop.time()
+            try:
+                if remaining is not None and remaining <= 0:
+                    raise asyncio.TimeoutError()
+                await asyncio.wait_for(self._space.wait(), remaining)
+            except asyncio.TimeoutError:
+                self.stats["dropped"] += 1
+                self._mark_closed("send queue blocked")
+                return False
+            if self.closed:
+                return False
+        self._push(item)
+        return True
+
+    def _mark_closed(self, reason: str):
+        if self.closed:
+            return
+        self.closed = True
+        self.close_reason = reason
+        # إيقاظ من ينتظر مساحة في الطابور
+        self._space.set()
+        logger.warning(f"🔌 Client {self.client_id} send channel closed: {reason}")
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        if self._on_close is not None:
+            self._on_close(self)
+
+    async def close(self):
+        """إيقاف مهمة الكتابة وإهمال الرسائل المتبقية"""
+        self.closed = True
+        self._space.set()
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._writer = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        sent = self.stats["sent"]
+        return {
+            "queued": len(self.queue),
+            "closed": self.closed,
+            "sent": sent,
+            "dropped": self.stats["dropped"],
+            "bytes_sent": self.stats["bytes_sent"],
+            "last_lag_ms": round(self.stats["last_lag"] * 1000, 2),
+            "max_lag_ms": round(self.stats["max_lag"] * 1000, 2),
+            "avg_lag_ms": round(self.stats["total_lag"] / sent * 1000, 2) if sent else 0
+        }
+
+class Broadcaster:
+    """بث الرسائل لجميع العملاء بتسلسل واحد للرسالة وطابور مستقل لكل عميل"""
+
+    def __init__(
+        self,
+        queue_size: int = 256,
+        overflow_policy: str = "drop_oldest",
+        send_timeout: Optional[float] = 10,
+        on_disconnect: Optional[Callable[[int], None]] = None
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            logger.warning(f"Unknown overflow policy '{overflow_policy}', using 'drop_oldest'")
+            overflow_policy = "drop_oldest"
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.send_timeout = send_timeout
+        self.on_disconnect = on_disconnect
+        self.channels: Dict[int, ClientChannel] = {}
+        self.stats = {"broadcasts": 0, "messages_queued": 0, "disconnects": 0}
+
+    @classmethod
+    def from_config(cls, ai_config: Optional[Dict] = None, **kwargs) -> "Broadcaster":
+        """إنشاء الباث من قسم broadcast في ملف التكوين"""
+        broadcast = dict(DEFAULT_BROADCAST_CONFIG)
+        broadcast.update((ai_config or {}).get("broadcast", {}))
+        return cls(
+            queue_size=broadcast.get("queue_size", 256),
+            overflow_policy=broadcast.get("overflow_policy", "drop_oldest"),
+            send_timeout=broadcast.get("send_timeout", 10),
+            **kwargs
+        )
+
+    @staticmethod
+    def serialize(message: Dict) -> str:
+        return json.dumps(message, ensure_ascii=False)
+
+    def register(self, client_id: int, websocket: WebSocket) -> ClientChannel:
+        """إنشاء قناة إرسال للعميل وبدء مهمة الكتابة"""
+        channel = ClientChannel(
+            client_id, websocket,
+            queue_size=self.queue_size,
+            send_timeout=self.send_timeout,
+            on_close=self._channel_closed
+        )
+        self.channels[client_id] = channel
+        channel.start()
+        return channel
+
+    async def unregister(self, client_id: int):
+        channel = self.channels.pop(client_id, None)
+        if channel is not None:
+            await channel.close()
+
+    def _channel_closed(self, channel: ClientChannel):
+        # قناة أُغلقت بسبب خطأ أو امتلاء: إزالتها وإغلاق الاتصال
+        if self.channels.get(channel.client_id) is channel:
+            del self.channels[channel.client_id]
+        self.stats["disconnects"] += 1
+        if self.on_disconnect is not None:
+            self.on_disconnect(channel.client_id)
+        asyncio.ensure_future(self._close_websocket(channel))
+
+    async def _close_websocket(self, channel: ClientChannel):
+        await channel.close()
+        try:
+            await channel.websocket.close(code=1013)
+        except Exception:
+            pass
+
+    async def send(self, client_id: int, message: Dict) -> bool:
+        """إرسال رسالة لعميل واحد عبر طابوره مع انتظار المساحة"""
+        channel = self.channels.get(client_id)
+        if channel is None:
+            return False
+        return await channel.put(self.serialize(message), self.send_timeout)
+
+    async def broadcast(self, message: Dict) -> int:
+        """تسلسل الرسالة مرة واحدة ووضعها في طابور كل عميل، وإرجاع عدد المستلمين"""
+        if not self.channels:
+            return 0
+        return await self.broadcast_payload(self.serialize(message))
+
+    async def broadcast_payload(self, payload: str) -> int:
+        """بث رسالة مُسلسلة مسبقاً (مثل البث القادم من عامل آخر)"""
+        if not self.channels:
+            return 0
+        channels = list(self.channels.values())
+        self.stats["broadcasts"] += 1
+
+        if self.overflow_policy == "block":
+            results = await asyncio.gather(*(
+                channel.put(payload, self.send_timeout, droppable=True) for channel in channels
+            ))
+        else:
+            results = [channel.offer(payload, self.overflow_policy) for channel in channels]
+
+        delivered = sum(1 for queued in results if queued)
+        self.stats["messages_queued"] += delivered
+        return delivered
+
+    async def close_all(self):
+        for client_id in list(self.channels):
+            await self.unregister(client_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """إحصائيات البث مع مقاييس التأخر لكل عميل"""
+        return {
+            "clients": len(self.channels),
+            "queue_size": self.queue_size,
+            "overflow_policy": self.overflow_policy,
+            **self.stats,
+            "per_client": {
+                str(client_id): channel.get_stats()
+                for client_id, channel in self.channels.items()
+            }
+        }
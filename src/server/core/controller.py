@@ -1,30 +1,82 @@
 # src/server/core/controller.py
-import json
+import asyncio
+import copy
 import logging
+import os
 import time
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable, Awaitable
 from fastapi import WebSocket
 
 from ..services.interpreter import (
     process_with_interpreter, 
+    process_with_interpreter_stream,
     process_basic_command,
     get_system_status,
-    validate_command_safety
+    find_safety_violation,
+    load_command_mappings,
+    ConversationWindow,
+    ProviderRouter,
+    SpeculativeBasicPath
 )
-from ..config import switch_ai_model, get_available_models, load_ai_config
+from ..services.llm_engine import LLMExecutionEngine
+from ..services.interpreter_pool import InterpreterPool, PoolExhaustedError
+from ..services.interpreter_loader import InterpreterLoader
+from ..services.response_cache import ResponseCache
+from ..services.health_monitor import HealthMonitor
+from ..services.metrics import (
+    COMMAND_LATENCY, SAFETY_CHECK_LATENCY, COMMANDS, BLOCKED_COMMANDS,
+    CACHE_HITS, COALESCED_COMMANDS, CONNECTED_CLIENTS, QUEUE_DEPTH
+)
+from ..services.tracing import TraceRecorder, span, record_span
+from .broadcaster import Broadcaster
+from .history import CommandHistory
+from .shared_state import WorkerCoordinator
+from .scheduler import CommandScheduler, SchedulerRejected
+from .batch import BatchProcessor
+from ..config import switch_ai_model, get_available_models, configure_interpreter, get_config_service
 
 logger = logging.getLogger(__name__)
 
 class AIController:
     """المعالج الرئيسي للذكاء الاصطناعي مع دعم متعدد المقدمين"""
     
-    def __init__(self, interpreter_instance=None):
+    def __init__(
+        self,
+        interpreter_instance=None,
+        interpreter_pool: Optional[InterpreterPool] = None,
+        interpreter_loader: Optional[InterpreterLoader] = None
+    ):
         self.clients: Dict[int, WebSocket] = {}
-        self.command_history: List[Dict] = []
-        self.max_history = 100
-        self.interpreter = interpreter_instance
-        self.ai_config = load_ai_config()
+        self.interpreter_pool = interpreter_pool
+        if self.interpreter_pool is None and interpreter_instance is not None:
+            self.interpreter_pool = InterpreterPool.from_instances([interpreter_instance])
+        # تحميل المفسر في الخلفية عند بدء الخادم بدلاً من وقت الاستيراد
+        self.interpreter_loader = interpreter_loader if self.interpreter_pool is None else None
+        # لقطة ثابتة من خدمة التكوين تُستبدل عند تغير الملف
+        self.config_service = get_config_service()
+        self.config_service.reload_if_changed()
+        self.ai_config = self.config_service.snapshot
+        # الحالة المشتركة بين العمال (خلفية محلية بلا تكلفة عند تشغيل عامل واحد)
+        self.shared_state = WorkerCoordinator.from_config(self.ai_config)
+        self.history = CommandHistory.from_config(
+            self.ai_config,
+            id_allocator=self.shared_state.allocate_ids if self.shared_state.shared else None
+        )
+        self._history_reservation: Optional[asyncio.Future] = None
+        load_command_mappings(self.ai_config)
+        self.llm_engine = LLMExecutionEngine.from_config(self.ai_config)
+        self.router = ProviderRouter.from_config(self.ai_config)
+        self.speculation = SpeculativeBasicPath.from_config(self.ai_config)
+        self.scheduler = CommandScheduler.from_config(self.ai_config)
+        self.batch = BatchProcessor.from_config(self.ai_config)
+        self._router_task: Optional[asyncio.Task] = None
+        self.conversation_window = ConversationWindow.from_config(self.ai_config)
+        self.response_cache = ResponseCache.from_config(self.ai_config)
+        self.health_monitor = HealthMonitor.from_config(self.ai_config)
+        self.tracer = TraceRecorder.from_config(self.ai_config)
+        self.broadcaster = Broadcaster.from_config(self.ai_config, on_disconnect=self._drop_client)
+        self._inflight: Dict[str, asyncio.Future] = {}
         
         # إحصائيات الاستخدام
         self.stats = {
@@ -32,12 +84,15 @@ class AIController:
             "successful_commands": 0,
             "failed_commands": 0,
             "blocked_commands": 0,
+            "coalesced_commands": 0,
             "uptime_start": datetime.now(),
             "last_command_time": None,
             "active_provider": self.ai_config.get("default_provider", "basic"),
             "active_model": self._get_current_model()
         }
         
+        self._register_gauges()
+
         logger.info("✅ AI Controller initialized")
         logger.info(f"🤖 Active AI: {self.stats['active_provider']}/{self.stats['active_model']}")
 
@@ -50,8 +105,307 @@ class AIController:
         provider_config = self.ai_config.get("providers", {}).get(provider, {})
         return provider_config.get("default_model", "unknown")
 
-    async def process_command(self, command: str, context: Optional[Dict] = None) -> Dict[str, Any]:
-        """معالجة الأوامر مع AI محسن"""
+    def _register_gauges(self):
+        """مقاييس تُقرأ من الحالة الحية عند طلب /metrics فقط"""
+        CONNECTED_CLIENTS.set_function(lambda: len(self.clients))
+        QUEUE_DEPTH.labels("llm_waiting").set_function(lambda: self.llm_engine.get_stats()["waiting"])
+        QUEUE_DEPTH.labels("llm_active").set_function(lambda: self.llm_engine.get_stats()["active"])
+        QUEUE_DEPTH.labels("in_flight").set_function(lambda: len(self._inflight))
+        QUEUE_DEPTH.labels("scheduler").set_function(lambda: self.scheduler.waiting)
+        QUEUE_DEPTH.labels("broadcast").set_function(
+            lambda: sum(channel.queue.qsize() for channel in self.broadcaster.channels.values())
+        )
+        QUEUE_DEPTH.labels("history_journal").set_function(lambda: self.history.get_stats()["pending_writes"])
+
+    @property
+    def interpreter_available(self) -> bool:
+        """هل توجد نسخة مفسر واحدة على الأقل في المجموعة"""
+        return self.interpreter_pool is not None and self.interpreter_pool.size > 0
+
+    @property
+    def interpreter_state(self) -> str:
+        """حالة المفسر: loading أثناء التحميل في الخلفية، ثم ready أو unavailable أو failed"""
+        if self.interpreter_loader is not None:
+            return self.interpreter_loader.state
+        return "ready" if self.interpreter_available else "unavailable"
+
+    async def startup(self):
+        """بدء مراقب الصحة وتحميل مجموعة المفسرات وتسخينها عند بدء الخادم"""
+        await self.health_monitor.start()
+        await self.shared_state.start(self._worker_stats, self.broadcaster.broadcast_payload)
+        config_settings = self.ai_config.get("config", {})
+        if config_settings.get("watch", True):
+            self.config_service.poll_interval = config_settings.get("poll_interval", self.config_service.poll_interval)
+            self.config_service.subscribe(self._on_config_changed)
+            self.config_service.start()
+        if self.interpreter_loader is not None:
+            if self.interpreter_loader.lazy:
+                # الخادم يقبل الطلبات فوراً والمفسر يُحمّل في الخلفية
+                self.interpreter_loader.start(self.llm_engine, on_ready=self._attach_pool)
+            else:
+                await self.interpreter_loader.load(self.llm_engine, on_ready=self._attach_pool)
+        elif self.interpreter_pool is not None:
+            await self.interpreter_pool.warm_up(self.llm_engine)
+            self._attach_pool(self.interpreter_pool)
+
+    def _attach_pool(self, pool: InterpreterPool):
+        self.interpreter_pool = pool
+        if self.router.enabled and self._router_task is None:
+            self._router_task = asyncio.ensure_future(self._build_routes(pool))
+
+    async def _build_routes(self, pool: InterpreterPool):
+        """بناء مجموعات مفسرات المسارات الإضافية في الخلفية؛ المسار الافتراضي يبقى يخدم حتى تجهز"""
+        module = self.interpreter_loader.module if self.interpreter_loader is not None else None
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self.router.build, module, self.ai_config, pool)
+            for route in self.router.routes:
+                if route.pool is not pool:
+                    await route.pool.warm_up(self.llm_engine)
+        except Exception as e:
+            logger.error(f"❌ Failed to build provider routes: {e}")
+
+    async def _on_config_changed(self, old: Dict[str, Any], new: Dict[str, Any]):
+        """تطبيق ملف تكوين تغير من خارج الخادم دون إعادة تشغيل"""
+        self.ai_config = new
+        if old.get("command_mappings") != new.get("command_mappings"):
+            load_command_mappings(new)
+
+        if old.get("default_provider") == new.get("default_provider") and old.get("providers") == new.get("providers"):
+            return
+
+        # إعادة تكوين نسخ المفسر المتأثرة فقط؛ تبديل نوع المفسر (وهمي/حقيقي) يتطلب إعادة التشغيل
+        for interpreter in (self.interpreter_pool.instances() if self.interpreter_pool else []):
+            if configure_interpreter(interpreter, new) is not interpreter:
+                logger.warning("⚠️ Reloaded provider settings could not be applied to running interpreters; restart required")
+                break
+
+        self.stats["active_provider"] = new.get("default_provider", "basic")
+        self.stats["active_model"] = self._get_current_model()
+        self.response_cache.invalidate()
+        await self.broadcast_to_clients({
+            "type": "ai_provider_changed",
+            "provider": self.stats["active_provider"],
+            "model": self.stats["active_model"],
+            "timestamp": datetime.now().isoformat()
+        })
+        logger.info(f"🔁 AI config reloaded: {self.stats['active_provider']}/{self.stats['active_model']}")
+
+    async def _process_with_pool(
+        self,
+        command: str,
+        context: Optional[Dict],
+        on_partial: Optional[Callable[[Dict], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """استعارة مفسر من المجموعة لمعالجة أمر واحد"""
+        if self.router.active:
+            return await self.router.process(
+                command, context, self.ai_config,
+                engine=self.llm_engine,
+                window=self.conversation_window,
+                on_partial=on_partial
+            )
+        acquire_started = time.perf_counter()
+        try:
+            async with self.interpreter_pool.acquire() as member:
+                record_span("pool_acquire", acquire_started)
+                if on_partial is not None:
+                    result = await process_with_interpreter_stream(
+                        member.interpreter, command, context, self.ai_config,
+                        engine=self.llm_engine,
+                        window=self.conversation_window,
+                        on_partial=on_partial,
+                        on_abandoned=member.hold
+                    )
+                else:
+                    result = await process_with_interpreter(
+                        member.interpreter, command, context, self.ai_config,
+                        engine=self.llm_engine,
+                        window=self.conversation_window,
+                        on_abandoned=member.hold
+                    )
+                if result.get("fallback_reason") in ("timeout", "error"):
+                    member.mark_failed()
+                else:
+                    member.mark_succeeded()
+                return result
+        except PoolExhaustedError as e:
+            logger.warning(f"⏳ {e}, falling back to basic processing")
+            result = process_basic_command(command)
+            result["fallback_reason"] = "pool_exhausted"
+            return result
+
+    def _cache_key(self, command: str, context: Optional[Dict]) -> str:
+        return ResponseCache.make_key(
+            command, context, self.stats["active_provider"], self.stats["active_model"]
+        )
+
+    async def _process_with_cache(
+        self,
+        command: str,
+        context: Optional[Dict],
+        on_partial: Optional[Callable[[Dict], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """إرجاع النتيجة المخزنة إن وجدت، وإلا مشاركة استدعاء واحد بين الطلبات المتطابقة"""
+        with span("cache_lookup"):
+            cache_key = self._cache_key(command, context)
+            cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            CACHE_HITS.inc()
+            cached["cache_hit"] = True
+            return cached
+
+        # المسار التخميني: المطابقة الأساسية شبه المؤكدة تُرجع فوراً دون انتظار النموذج
+        speculative = self.speculation.evaluate(command)
+        if speculative is not None:
+            if self.speculation.llm_policy == "refresh":
+                # النموذج يكمل في الخلفية وتخدم إجابته الطلبات المتطابقة التالية من الذاكرة المؤقتة
+                self.speculation.stats["llm_refreshed"] += 1
+                self._shared_call(cache_key, command, context)
+            else:
+                self.speculation.stats["llm_cancelled"] += 1
+            if on_partial is not None:
+                for index, action in enumerate(speculative["actions"]):
+                    await on_partial({"action": action, "index": index})
+                # العميل نفذ هذه الإجراءات عند وصولها فلا يعيد تنفيذها من النتيجة
+                speculative["streamed_actions"] = len(speculative["actions"])
+            return speculative
+
+        if on_partial is not None:
+            # البث خاص بكل عميل فلا يُدمج مع الطلبات الأخرى
+            return await self._process_and_store(cache_key, command, context, on_partial)
+
+        # دمج الطلبات المتطابقة الجارية في استدعاء واحد للنموذج
+        coalesced = cache_key in self._inflight
+        if coalesced:
+            self.stats["coalesced_commands"] += 1
+            COALESCED_COMMANDS.inc()
+        task = self._shared_call(cache_key, command, context)
+
+        # shield يمنع إلغاء الاستدعاء المشترك إذا انقطع أحد العملاء
+        # (مراحل الاستدعاء المشترك تُسجل في تتبع الطلب الذي أنشأه)
+        with span("coalesced_wait" if coalesced else "shared_call"):
+            result = copy.deepcopy(await asyncio.shield(task))
+        if coalesced:
+            result["coalesced"] = True
+        return result
+
+    def _shared_call(self, cache_key: str, command: str, context: Optional[Dict]) -> asyncio.Future:
+        """الاستدعاء الجاري لهذا المفتاح، أو بدء استدعاء جديد تشترك فيه الطلبات المتطابقة"""
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(self._process_and_store(cache_key, command, context))
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda done: self._finish_inflight(cache_key, done))
+        return task
+
+    async def _process_and_store(
+        self,
+        cache_key: str,
+        command: str,
+        context: Optional[Dict],
+        on_partial: Optional[Callable[[Dict], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        result = await self._process_with_pool(command, context, on_partial)
+        # نتائج المعالج الأساسي البديلة سريعة ولا تستحق التخزين
+        if result.get("success") and result.get("method") == "interpreter" and not result.get("stream_error"):
+            cached = dict(result)
+            cached.pop("streamed_actions", None)
+            self.response_cache.set(cache_key, cached)
+        return result
+
+    def _finish_inflight(self, cache_key: str, task: asyncio.Future):
+        if self._inflight.get(cache_key) is task:
+            del self._inflight[cache_key]
+        if not task.cancelled():
+            # تجنب تحذير "exception was never retrieved" إذا أُلغي جميع المنتظرين
+            task.exception()
+
+    async def submit_command(
+        self,
+        command: str,
+        context: Optional[Dict] = None,
+        priority: str = "rest",
+        on_partial: Optional[Callable[[Dict], Awaitable[None]]] = None,
+        client_id: Optional[str] = None,
+        charge: bool = True
+    ) -> Dict[str, Any]:
+        """إدخال الأمر عبر المجدول: أوامر server: أولاً ثم WebSocket التفاعلي ثم REST ثم الدفعات
+
+        يرفع SchedulerRejected عند تجاوز حد المعدل أو امتلاء الطوابير.
+        """
+        special = (command or "").strip().lower().startswith("server:")
+
+        async def process() -> Dict[str, Any]:
+            if special:
+                result = await self.handle_special_commands(command)
+                if result is not None:
+                    result.setdefault("timestamp", datetime.now().isoformat())
+                    return result
+            return await self.process_command(command, context, on_partial, client_id)
+
+        return await self.scheduler.run(client_id, "special" if special else priority, process, charge)
+
+    async def process_batch(
+        self,
+        commands: List[Any],
+        context: Optional[Dict] = None,
+        client_id: Optional[str] = None,
+        on_result: Optional[Callable[[int, Dict[str, Any]], Awaitable[None]]] = None,
+        charge: bool = True
+    ) -> List[Dict[str, Any]]:
+        """معالجة دفعة أوامر بتوازي محدود وإرجاع النتائج بنفس الترتيب
+
+        كل عنصر نص الأمر أو {"command", "context"}؛ الأوامر المتطابقة تُعالج مرة واحدة.
+        الدفعة تستهلك رصيداً واحداً من حد المعدل (SchedulerRejected عند تجاوزه، وcharge=False إن سبق احتسابه)
+        وكل أمر فيها يمر بطابور batch.
+        """
+        self.batch.validate(commands)
+        items = [
+            {"command": item, "context": context} if isinstance(item, str)
+            else {"command": item["command"], "context": item.get("context", context)}
+            for item in commands
+        ]
+        if charge:
+            self.scheduler.charge(client_id)
+
+        async def process(item: Dict[str, Any]) -> Dict[str, Any]:
+            try:
+                return await self.submit_command(
+                    item["command"], item["context"], priority="batch", client_id=client_id, charge=False
+                )
+            except SchedulerRejected as e:
+                return {"success": False, "error": str(e), "rejected": e.reason, "retry_after": e.retry_after, "actions": []}
+
+        return await self.batch.run(
+            items, process,
+            key=lambda item: self._cache_key(item["command"].strip(), item["context"]),
+            on_result=on_result
+        )
+
+    async def process_command(
+        self,
+        command: str,
+        context: Optional[Dict] = None,
+        on_partial: Optional[Callable[[Dict], Awaitable[None]]] = None,
+        client_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """معالجة الأوامر مع AI محسن، مع بث جزئي عبر on_partial عند تمريره"""
+        with self.tracer.trace("process_command", command=(command or "")[:100], client_id=client_id) as trace:
+            result = await self._process_command(command, context, on_partial, client_id)
+            if trace is not None:
+                trace.finish()
+                result["trace_id"] = trace.trace_id
+                result["timings"] = trace.timings()
+            return result
+
+    async def _process_command(
+        self,
+        command: str,
+        context: Optional[Dict],
+        on_partial: Optional[Callable[[Dict], Awaitable[None]]],
+        client_id: Optional[str]
+    ) -> Dict[str, Any]:
         start_time = time.time()
         self.stats["total_commands"] += 1
         self.stats["last_command_time"] = datetime.now()
@@ -67,43 +421,59 @@ class AIController:
             command = command.strip()
             
             # فحص الأمان
-            is_safe, safety_message = validate_command_safety(command)
-            if not is_safe:
+            with span("safety_check") as safety:
+                violation = find_safety_violation(command)
+            SAFETY_CHECK_LATENCY.observe(safety.duration)
+            if violation:
                 self.stats["blocked_commands"] += 1
-                logger.warning(f"🚫 Command blocked: {safety_message}")
+                BLOCKED_COMMANDS.labels(violation.rule_id).inc()
+                logger.warning(f"🚫 Command blocked: {violation.message}")
                 return {
-                    "error": f"Command blocked for safety: {safety_message}",
+                    "error": f"Command blocked for safety: {violation.message}",
                     "actions": [],
                     "processing_time": time.time() - start_time,
-                    "safety_block": True
+                    "safety_block": True,
+                    "safety_rule": violation.rule_id
                 }
 
+            # الطلبات قبل جاهزية المفسر تنتظره إن كانت السياسة queue
+            loader = self.interpreter_loader
+            if loader is not None and loader.pending and loader.pending_policy == "queue":
+                with span("interpreter_wait"):
+                    await loader.wait_ready(loader.queue_timeout)
+
             # معالجة الأمر
-            if self.interpreter:
-                result = await process_with_interpreter(
-                    self.interpreter, command, context, self.ai_config
-                )
+            if self.interpreter_available:
+                result = await self._process_with_cache(command, context, on_partial)
             else:
-                result = process_basic_command(command)
+                with span("basic_processing"):
+                    result = process_basic_command(command)
+                if loader is not None and loader.pending:
+                    result["fallback_reason"] = "interpreter_loading"
 
             # إضافة معلومات إضافية للنتيجة
             processing_time = time.time() - start_time
             result.update({
                 "timestamp": datetime.now().isoformat(),
                 "processing_time": processing_time,
-                "provider": self.stats["active_provider"],
-                "model": self.stats["active_model"],
                 "client_context": context
             })
+            # الموجه يضع المزود والنموذج اللذين أجابا فعلاً
+            result.setdefault("provider", self.stats["active_provider"])
+            result.setdefault("model", self.stats["active_model"])
 
             # تحديث الإحصائيات
             if result.get("success", False):
                 self.stats["successful_commands"] += 1
             else:
                 self.stats["failed_commands"] += 1
+            labels = (result["provider"], result["model"], result.get("method", "unknown"))
+            COMMAND_LATENCY.labels(*labels).observe(processing_time)
+            COMMANDS.labels(*labels, "success" if result.get("success", False) else "failure").inc()
 
             # حفظ في التاريخ
-            self._add_to_history(command, result)
+            with span("history_append"):
+                await self._add_to_history(command, result, client_id)
             
             logger.info(f"✅ Command processed successfully in {processing_time:.2f}s")
             return result
@@ -124,13 +494,15 @@ class AIController:
     async def switch_ai_provider(self, provider: str, model: str) -> Dict[str, Any]:
         """تبديل مقدم خدمة AI أثناء التشغيل"""
         try:
-            success, message = switch_ai_model(self.interpreter, provider, model, self.ai_config)
+            interpreters = self.interpreter_pool.instances() if self.interpreter_pool else None
+            success, message = switch_ai_model(interpreters, provider, model, self.ai_config)
             
             if success:
-                # تحديث التكوين المحلي
-                self.ai_config = load_ai_config()
+                # تحديث التكوين المحلي (اللقطة التي كتبها التبديل)
+                self.ai_config = self.config_service.snapshot
                 self.stats["active_provider"] = provider
                 self.stats["active_model"] = model
+                self.response_cache.invalidate()
                 
                 # إشعار جميع العملاء
                 await self.broadcast_to_clients({
@@ -181,86 +553,186 @@ class AIController:
                 "successful": self.stats["successful_commands"],
                 "failed": self.stats["failed_commands"],
                 "blocked": self.stats["blocked_commands"],
+                "coalesced": self.stats["coalesced_commands"],
+                "in_flight": len(self._inflight),
                 "success_rate": round(success_rate, 2)
             },
             "ai_info": {
                 "provider": self.stats["active_provider"],
                 "model": self.stats["active_model"],
-                "interpreter_available": self.interpreter is not None
+                "interpreter_available": self.interpreter_available,
+                "startup": self.interpreter_loader.get_stats() if self.interpreter_loader else None,
+                "execution": self.llm_engine.get_stats(),
+                "pool": self.interpreter_pool.get_stats() if self.interpreter_pool else None,
+                "routing": self.router.get_stats(),
+                "speculation": self.speculation.get_stats(),
+                "conversation": self.conversation_window.get_stats(),
+                "cache": self.response_cache.get_stats(),
+                "health": self.health_monitor.get_stats(),
+                "tracing": self.tracer.get_stats()
             },
             "connections": {
                 "active_clients": len(self.clients),
-                "total_history_entries": len(self.command_history)
+                "broadcast": self.broadcaster.get_stats(),
+                "scheduler": self.scheduler.get_stats(),
+                "batch": self.batch.get_stats(),
+                "total_history_entries": len(self.history),
+                "history": self.history.get_stats()
             },
+            "workers": self.shared_state.get_stats(),
             "last_activity": self.stats["last_command_time"].isoformat() if self.stats["last_command_time"] else None,
-            "system": get_system_status()
+            "system": self.get_system_snapshot()
+        }
+
+    def get_system_snapshot(self) -> Dict[str, Any]:
+        """آخر حالة للنظام من مراقب الصحة دون انتظار أي فحص"""
+        snapshot = self.health_monitor.snapshot()
+        if snapshot["sampled_at"] is None:
+            # لم تُؤخذ أي عينة بعد (المراقب لم يبدأ)
+            return get_system_status()
+        return snapshot["system"]
+
+    def _worker_stats(self) -> Dict[str, Any]:
+        """إحصائيات هذا العامل كما تُنشر في الحالة المشتركة"""
+        return {
+            "pid": os.getpid(),
+            "started_at": self.stats["uptime_start"].isoformat(),
+            "active_clients": len(self.clients),
+            "in_flight": len(self._inflight),
+            "commands": {
+                "total": self.stats["total_commands"],
+                "successful": self.stats["successful_commands"],
+                "failed": self.stats["failed_commands"],
+                "blocked": self.stats["blocked_commands"],
+                "coalesced": self.stats["coalesced_commands"]
+            },
+            "last_activity": self.stats["last_command_time"].isoformat() if self.stats["last_command_time"] else None
         }
 
-    def _add_to_history(self, command: str, result: Dict):
-        """إضافة الأمر للتاريخ مع حد أقصى للحجم"""
-        history_entry = {
-            "id": len(self.command_history) + 1,
+    async def get_cluster_stats(self) -> Dict[str, Any]:
+        """إحصائيات مجمعة من جميع العمال (عامل واحد = إحصائيات هذا العامل)"""
+        return await self.shared_state.aggregate(self._worker_stats())
+
+    async def shutdown(self):
+        """تحرير الموارد عند إيقاف الخادم"""
+        await self.health_monitor.stop()
+        self.config_service.unsubscribe(self._on_config_changed)
+        await self.config_service.stop()
+        if self._router_task is not None and not self._router_task.done():
+            self._router_task.cancel()
+        if self.interpreter_loader is not None:
+            await self.interpreter_loader.stop()
+        await self.shared_state.stop()
+        await self.broadcaster.close_all()
+        self.llm_engine.shutdown(wait=False)
+        self.response_cache.save()
+        self.history.close()
+
+    async def _reserve_history_ids(self):
+        """حجز معرفات التاريخ المشترك في خيط: لا تُنفذ معاملة SQLite على حلقة الأحداث"""
+        loop = asyncio.get_running_loop()
+        # حلقة لأن طلبات أخرى قد تستهلك المعرفات أثناء الانتظار
+        while not self.history.ids_available:
+            await loop.run_in_executor(None, self.history.reserve_ids)
+        if self.history.needs_ids and (self._history_reservation is None or self._history_reservation.done()):
+            # الكتلة التالية تُحجز مسبقاً فلا ينتظر الأمر التالي قاعدة البيانات
+            self._history_reservation = loop.run_in_executor(None, self.history.reserve_ids)
+            self._history_reservation.add_done_callback(self._history_reservation_done)
+
+    @staticmethod
+    def _history_reservation_done(future: asyncio.Future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"❌ Could not reserve history ids: {future.exception()}")
+
+    async def _add_to_history(self, command: str, result: Dict, client_id: Optional[str] = None):
+        """إضافة الأمر للتاريخ (حلقة في الذاكرة + سجل على القرص)"""
+        if self.history.shared:
+            try:
+                await self._reserve_history_ids()
+            except Exception as e:
+                logger.error(f"❌ Could not reserve history ids, command not recorded: {e}")
+                return
+        self.history.append({
             "timestamp": datetime.now().isoformat(),
+            "client_id": client_id,
             "input": command,
             "output": result,
-            "provider": self.stats["active_provider"],
-            "model": self.stats["active_model"],
+            "provider": result.get("provider", self.stats["active_provider"]),
+            "model": result.get("model", self.stats["active_model"]),
             "success": result.get("success", False),
             "processing_time": result.get("processing_time", 0)
+        })
+
+    def get_history(self, limit: int = 10, include_errors: bool = True) -> List[Dict]:
+        """الحصول على تاريخ الأوامر مع خيارات تصفية"""
+        return self.history.recent(limit, include_errors)
+
+    @staticmethod
+    def _history_page(entries: List[Dict[str, Any]], limit: int) -> Dict[str, Any]:
+        return {
+            "history": entries,
+            "next_before_id": entries[-1]["id"] if len(entries) == limit and entries else None
         }
 
-        self.command_history.append(history_entry)
+    def get_history_page(self, limit: int = 10, before_id: Optional[int] = None) -> Dict[str, Any]:
+        """صفحة من التاريخ الأحدث أولاً، مع مؤشر للصفحة التالية (قد تقرأ السجل: تُستدعى في خيط)"""
+        return self._history_page(self.history.page(limit, before_id), limit)
 
-        # الحفاظ على حد أقصى للتاريخ
-        if len(self.command_history) > self.max_history:
-            self.command_history = self.command_history[-self.max_history:]
+    def get_memory_history_page(self, limit: int = 10, before_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """الصفحة من الذاكرة فقط دون حجب حلقة الأحداث، أو None إذا احتاجت السجل"""
+        entries = self.history.memory_page(limit, before_id)
+        return None if entries is None else self._history_page(entries, limit)
 
-    def get_history(self, limit: int = 10, include_errors: bool = True) -> List[Dict]:
-        """الحصول على تاريخ الأوامر مع خيارات تصفية"""
-        history = self.command_history[-limit:]
-        
-        if not include_errors:
-            history = [entry for entry in history if entry.get("success", False)]
-        
-        return history
+    def query_history(self, limit: int = 50, before_id: Optional[int] = None, **filters) -> Dict[str, Any]:
+        """استعلام التاريخ بالمرشحات (العميل، المزود/النموذج، النجاح، الفترة، زمن المعالجة)"""
+        return self._history_page(self.history.query(limit, before_id, **filters), limit)
 
     def clear_history(self) -> bool:
         """مسح تاريخ الأوامر"""
         try:
-            self.command_history.clear()
+            self.history.clear()
             logger.info("🗑️ Command history cleared")
             return True
         except Exception as e:
             logger.error(f"Error clearing history: {e}")
             return False
 
-    async def broadcast_to_clients(self, message: Dict):
-        """بث رسالة لجميع العملاء المتصلين"""
-        if not self.clients:
-            return
+    def register_client(self, client_id: int, websocket: WebSocket):
+        """تسجيل عميل WebSocket وإنشاء طابور الإرسال الخاص به"""
+        self.clients[client_id] = websocket
+        self.shared_state.client_connected(client_id)
+        return self.broadcaster.register(client_id, websocket)
 
-        disconnected_clients = []
-        for client_id, websocket in self.clients.items():
-            try:
-                await websocket.send_text(json.dumps(message, ensure_ascii=False))
-            except Exception as e:
-                logger.warning(f"Failed to send message to client {client_id}: {e}")
-                disconnected_clients.append(client_id)
+    async def unregister_client(self, client_id: int):
+        if self.clients.pop(client_id, None) is not None:
+            self.shared_state.client_disconnected(client_id)
+        await self.broadcaster.unregister(client_id)
+
+    def _drop_client(self, client_id: int):
+        if self.clients.pop(client_id, None) is not None:
+            self.shared_state.client_disconnected(client_id)
+            logger.info(f"🔌 Client {client_id} disconnected")
+
+    async def send_to_client(self, client_id: int, message: Dict) -> bool:
+        """إرسال رسالة لعميل واحد بالترتيب مع باقي رسائله"""
+        return await self.broadcaster.send(client_id, message)
 
-        # تنظيف العملاء المنقطعين
-        for client_id in disconnected_clients:
-            if client_id in self.clients:
-                del self.clients[client_id]
-                logger.info(f"🔌 Client {client_id} disconnected")
+    async def broadcast_to_clients(self, message: Dict) -> int:
+        """بث رسالة لجميع العملاء المتصلين دون انتظار العملاء البطيئين، وعلى باقي العمال"""
+        payload = self.broadcaster.serialize(message)
+        self.shared_state.publish(payload)
+        return await self.broadcaster.broadcast_payload(payload)
 
     async def handle_special_commands(self, command: str) -> Optional[Dict[str, Any]]:
         """معالجة الأوامر الخاصة للخادم"""
         command_lower = command.lower().strip()
         
         if command_lower == "server:stats":
+            stats = self.get_server_stats()
+            stats["cluster"] = await self.get_cluster_stats()
             return {
                 "success": True,
-                "actions": [{"type": "info", "data": self.get_server_stats()}],
+                "actions": [{"type": "info", "data": stats}],
                 "special_command": True
             }
         
@@ -0,0 +1,415 @@
+# src/server/core/history.py
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from collections import deque
+from typing import Dict, Any, Optional, List, Iterator, Tuple, Callable
+
+logger = logging.getLogger(__name__)
+
+# الإعدادات الافتراضية لتاريخ الأوامر
+DEFAULT_HISTORY_CONFIG = {
+    "capacity": 100,
+    "journal_path": "logs/command_history.db",
+    "batch_size": 64,
+    "flush_interval": 1.0
+}
+
+# أمر داخلي لخيط الكتابة لمسح السجل بنفس ترتيب الإضافات
+_CLEAR = object()
+
+# فهارس الاستعلامات الشائعة، جميعها تنتهي بـ id لدعم الترقيم بالمؤشر
+HISTORY_INDEXES = {
+    "idx_history_client": "client_id, id",
+    "idx_history_provider_model": "provider, model, id",
+    "idx_history_success": "success, id",
+    "idx_history_timestamp": "timestamp",
+    "idx_history_processing_time": "processing_time"
+}
+
+# عدد المعرفات المحجوزة في كل طلب عند مشاركة السجل بين عدة عمليات
+ID_BLOCK_SIZE = 64
+
+# مرشحات الاستعلام المدعومة
+HISTORY_FILTERS = ("client_id", "provider", "model", "success", "since", "until", "min_processing_time")
+
+class CommandHistory:
+    """تاريخ الأوامر: حلقة ثابتة الحجم في الذاكرة مع سجل SQLite للإضافة فقط"""
+
+    def __init__(
+        self,
+        capacity: int = 100,
+        journal_path: Optional[str] = None,
+        batch_size: int = 64,
+        flush_interval: float = 1.0,
+        id_allocator: Optional[Callable[[int, int], int]] = None
+    ):
+        self.capacity = max(1, int(capacity))
+        self.journal_path = journal_path
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        # عند مشاركة السجل بين العمال: المعرفات تُحجز كتلاً من الحالة المشتركة والقراءة من السجل
+        self.id_allocator = id_allocator
+        self.shared = id_allocator is not None
+        self._id_block_end = 0
+        # كتل معرفات محجوزة مسبقاً (بداية، نهاية) حتى لا تنتظر الإضافة معاملة SQLite
+        self._id_blocks: deque = deque()
+        self._reserve_lock = threading.Lock()
+        # deque بحد أقصى: الإضافة O(1) ويُزال الأقدم تلقائياً
+        self._buffer: deque = deque(maxlen=self.capacity)
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._total = 0
+        self._pending: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._closed = False
+        self.stats = {"journal_writes": 0, "journal_batches": 0, "journal_errors": 0}
+
+        if self.journal_path:
+            self._open_journal()
+        if self.shared:
+            # الكتلة الأولى عند الإنشاء (قبل بدء الخدمة)، والتالية تُحجز في خيط عبر reserve_ids
+            self.reserve_ids()
+
+    @classmethod
+    def from_config(cls, ai_config: Optional[Dict] = None, **kwargs) -> "CommandHistory":
+        """إنشاء التاريخ من قسم history في ملف التكوين"""
+        history = dict(DEFAULT_HISTORY_CONFIG)
+        history.update((ai_config or {}).get("history", {}))
+        return cls(
+            capacity=history.get("capacity", 100),
+            journal_path=history.get("journal_path"),
+            batch_size=history.get("batch_size", 64),
+            flush_interval=history.get("flush_interval", 1.0),
+            **kwargs
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.journal_path, timeout=10, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def _open_journal(self):
+        """إنشاء الجدول واستعادة آخر الإدخالات وبدء خيط الكتابة"""
+        directory = os.path.dirname(os.path.abspath(self.journal_path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._connect()
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS history (
+                    id INTEGER PRIMARY KEY,
+                    timestamp TEXT NOT NULL,
+                    input TEXT,
+                    provider TEXT,
+                    model TEXT,
+                    success INTEGER,
+                    processing_time REAL,
+                    client_id TEXT,
+                    entry TEXT NOT NULL
+                )
+            """)
+            columns = {row["name"] for row in connection.execute("PRAGMA table_info(history)")}
+            if "client_id" not in columns:
+                # سجل من إصدار سابق بدون عمود العميل
+                connection.execute("ALTER TABLE history ADD COLUMN client_id TEXT")
+            for name, indexed in HISTORY_INDEXES.items():
+                connection.execute(f"CREATE INDEX IF NOT EXISTS {name} ON history ({indexed})")
+            connection.commit()
+            row = connection.execute("SELECT MAX(id) AS last_id, COUNT(*) AS total FROM history").fetchone()
+            self._next_id = (row["last_id"] or 0) + 1
+            self._total = row["total"]
+            rows = connection.execute(
+                "SELECT entry FROM history ORDER BY id DESC LIMIT ?", (self.capacity,)
+            ).fetchall()
+            for stored in reversed(rows):
+                self._buffer.append(json.loads(stored["entry"]))
+        finally:
+            connection.close()
+
+        self._writer = threading.Thread(target=self._write_loop, name="history-journal", daemon=True)
+        self._writer.start()
+        logger.info(f"📚 Command history journal: {self.journal_path} ({self._total} entries)")
+
+    def _write_loop(self):
+        connection = self._connect()
+        connection.execute("PRAGMA synchronous=NORMAL")
+        try:
+            while True:
+                item = self._pending.get()
+                if item is None:
+                    self._pending.task_done()
+                    return
+                batch = [item]
+                # تجميع الإدخالات المتراكمة في معاملة واحدة (مزامنة واحدة للقرص لكل دفعة)
+                while len(batch) < self.batch_size:
+                    try:
+                        extra = self._pending.get(timeout=self.flush_interval if len(batch) == 1 else 0)
+                    except queue.Empty:
+                        break
+                    if extra is None:
+                        self._pending.put(None)
+                        self._pending.task_done()
+                        break
+                    batch.append(extra)
+                self._write_batch(connection, batch)
+                for _ in batch:
+                    self._pending.task_done()
+        finally:
+            connection.close()
+
+    def _write_batch(self, connection: sqlite3.Connection, batch: List):
+        try:
+            with connection:
+                for item in batch:
+                    if item is _CLEAR:
+                        connection.execute("DELETE FROM history")
+                        continue
+                    connection.execute(
+                        "INSERT INTO history (id, timestamp, input, provider, model, success, processing_time, client_id, entry) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            item["id"], item["timestamp"], item["input"], item["provider"], item["model"],
+                            1 if item["success"] else 0, item["processing_time"],
+                            None if item.get("client_id") is None else str(item["client_id"]),
+                            json.dumps(item, ensure_ascii=False, default=str)
+                        )
+                    )
+                    self.stats["journal_writes"] += 1
+            self.stats["journal_batches"] += 1
+        except Exception as e:
+            self.stats["journal_errors"] += 1
+            logger.error(f"Error writing command history journal: {e}")
+
+    def _ids_remaining(self) -> int:
+        return max(0, self._id_block_end - self._next_id) + sum(end - start for start, end in self._id_blocks)
+
+    @property
+    def ids_available(self) -> bool:
+        """هل يوجد معرف محجوز للإضافة التالية (دائماً عند عدم المشاركة)"""
+        with self._lock:
+            return not self.shared or self._ids_remaining() > 0
+
+    @property
+    def needs_ids(self) -> bool:
+        """استُهلك نصف المعرفات المحجوزة: وقت حجز الكتلة التالية في الخلفية"""
+        with self._lock:
+            return self.shared and self._ids_remaining() < ID_BLOCK_SIZE // 2
+
+    def reserve_ids(self):
+        """حجز كتلة معرفات لا تتداخل مع العمال الآخرين (معاملة SQLite متزامنة: تُستدعى في خيط)"""
+        with self._reserve_lock:
+            if not self.needs_ids:
+                return
+            with self._lock:
+                highest = max([self._next_id - 1, self._id_block_end - 1] + [end - 1 for _, end in self._id_blocks])
+            start = self.id_allocator(ID_BLOCK_SIZE, highest)
+            with self._lock:
+                self._id_blocks.append((start, start + ID_BLOCK_SIZE))
+
+    def append(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """إضافة إدخال بمعرف متزايد لا يتكرر وإرساله للسجل
+
+        عند المشاركة تُستخدم معرفات محجوزة مسبقاً فقط (RuntimeError إن نفدت قبل reserve_ids).
+        """
+        with self._lock:
+            if self.shared and self._next_id >= self._id_block_end:
+                if not self._id_blocks:
+                    raise RuntimeError("No reserved history ids left, call reserve_ids first")
+                self._next_id, self._id_block_end = self._id_blocks.popleft()
+            entry["id"] = self._next_id
+            self._next_id += 1
+            self._total += 1
+            self._buffer.append(entry)
+        if self._writer is not None and not self._closed:
+            self._pending.put(entry)
+        return entry
+
+    def recent(self, limit: int = 10, include_errors: bool = True) -> List[Dict[str, Any]]:
+        """آخر الإدخالات من الذاكرة بترتيب زمني"""
+        with self._lock:
+            entries = list(self._buffer)
+        if not include_errors:
+            entries = [entry for entry in entries if entry.get("success", False)]
+        return entries[-limit:] if limit > 0 else []
+
+    def _buffered(self, limit: int, before_id: Optional[int]) -> Tuple[List[Dict[str, Any]], int]:
+        with self._lock:
+            buffered = [
+                entry for entry in reversed(self._buffer)
+                if before_id is None or entry["id"] < before_id
+            ][:limit]
+            oldest_buffered = self._buffer[0]["id"] if self._buffer else self._next_id
+        return buffered, oldest_buffered
+
+    def memory_page(self, limit: int = 10, before_id: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """الصفحة إن أمكن خدمتها من الذاكرة دون إدخال/إخراج، وإلا None (تحتاج page في خيط)"""
+        limit = max(0, int(limit))
+        if self.shared and self._writer is not None:
+            return None
+        buffered, _ = self._buffered(limit, before_id)
+        if len(buffered) == limit or self._writer is None:
+            return buffered
+        return None
+
+    def page(self, limit: int = 10, before_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """صفحة من الإدخالات الأقدم من before_id (الأحدث أولاً)، من الذاكرة أو من السجل"""
+        limit = max(0, int(limit))
+        if self.shared and self._writer is not None:
+            # الحلقة في الذاكرة لا تحوي أوامر العمال الآخرين
+            return self.query(limit, before_id)
+        buffered, oldest_buffered = self._buffered(limit, before_id)
+        if len(buffered) == limit or self._writer is None:
+            return buffered
+
+        # الإدخالات الأقدم من الحلقة تُقرأ من السجل دون تحميل التاريخ كاملاً
+        self.flush()
+        cursor = buffered[-1]["id"] if buffered else min(before_id or oldest_buffered, oldest_buffered)
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                "SELECT entry FROM history WHERE id < ? ORDER BY id DESC LIMIT ?",
+                (cursor, limit - len(buffered))
+            ).fetchall()
+        finally:
+            connection.close()
+        return buffered + [json.loads(row["entry"]) for row in rows]
+
+    @staticmethod
+    def _where(filters: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        """بناء شرط WHERE من المرشحات غير الفارغة"""
+        clauses, params = [], []
+        for column in ("client_id", "provider", "model"):
+            if filters.get(column) is not None:
+                clauses.append(f"{column} = ?")
+                params.append(str(filters[column]))
+        if filters.get("success") is not None:
+            clauses.append("success = ?")
+            params.append(1 if filters["success"] else 0)
+        if filters.get("since") is not None:
+            clauses.append("timestamp >= ?")
+            params.append(filters["since"])
+        if filters.get("until") is not None:
+            clauses.append("timestamp < ?")
+            params.append(filters["until"])
+        if filters.get("min_processing_time") is not None:
+            clauses.append("processing_time >= ?")
+            params.append(float(filters["min_processing_time"]))
+        return " AND ".join(clauses) or "1", params
+
+    @staticmethod
+    def _matches(entry: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+        """نفس المرشحات على إدخال في الذاكرة (عند عدم وجود سجل)"""
+        for column in ("client_id", "provider", "model"):
+            if filters.get(column) is not None and str(entry.get(column)) != str(filters[column]):
+                return False
+        if filters.get("success") is not None and bool(entry.get("success")) != bool(filters["success"]):
+            return False
+        if filters.get("since") is not None and entry["timestamp"] < filters["since"]:
+            return False
+        if filters.get("until") is not None and entry["timestamp"] >= filters["until"]:
+            return False
+        if filters.get("min_processing_time") is not None and \
+                (entry.get("processing_time") or 0) < float(filters["min_processing_time"]):
+            return False
+        return True
+
+    def query(self, limit: int = 50, before_id: Optional[int] = None, **filters) -> List[Dict[str, Any]]:
+        """استعلام مفهرس بالمرشحات، الأحدث أولاً، مع ترقيم بالمؤشر before_id"""
+        limit = max(0, int(limit))
+        unknown = set(filters) - set(HISTORY_FILTERS)
+        if unknown:
+            raise ValueError(f"Unknown history filters: {', '.join(sorted(unknown))}")
+
+        if self._writer is None:
+            with self._lock:
+                entries = list(reversed(self._buffer))
+            return [
+                entry for entry in entries
+                if (before_id is None or entry["id"] < before_id) and self._matches(entry, filters)
+            ][:limit]
+
+        self.flush()
+        where, params = self._where(filters)
+        if before_id is not None:
+            where += " AND id < ?"
+            params.append(int(before_id))
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                f"SELECT entry FROM history WHERE {where} ORDER BY id DESC LIMIT ?",
+                params + [limit]
+            ).fetchall()
+        finally:
+            connection.close()
+        return [json.loads(row["entry"]) for row in rows]
+
+    def iter_export(self, batch_size: int = 500, **filters) -> Iterator[Dict[str, Any]]:
+        """تصدير الإدخالات المطابقة بالترتيب الزمني على دفعات دون تحميلها كلها"""
+        unknown = set(filters) - set(HISTORY_FILTERS)
+        if unknown:
+            raise ValueError(f"Unknown history filters: {', '.join(sorted(unknown))}")
+
+        if self._writer is None:
+            with self._lock:
+                entries = list(self._buffer)
+            for entry in entries:
+                if self._matches(entry, filters):
+                    yield entry
+            return
+
+        self.flush()
+        where, params = self._where(filters)
+        after_id = 0
+        connection = self._connect()
+        try:
+            while True:
+                rows = connection.execute(
+                    f"SELECT id, entry FROM history WHERE {where} AND id > ? ORDER BY id LIMIT ?",
+                    params + [after_id, batch_size]
+                ).fetchall()
+                if not rows:
+                    return
+                for row in rows:
+                    yield json.loads(row["entry"])
+                after_id = rows[-1]["id"]
+        finally:
+            connection.close()
+
+    def clear(self):
+        """مسح الذاكرة والسجل، مع الإبقاء على تسلسل المعرفات"""
+        with self._lock:
+            self._buffer.clear()
+            self._total = 0
+        if self._writer is not None and not self._closed:
+            self._pending.put(_CLEAR)
+
+    def flush(self):
+        """انتظار كتابة جميع الإدخالات المعلقة في السجل"""
+        if self._writer is not None and self._writer.is_alive():
+            self._pending.join()
+
+    def close(self):
+        """إنهاء خيط الكتابة بعد تفريغ الطابور"""
+        if self._writer is None or self._closed:
+            return
+        self._closed = True
+        self._pending.put(None)
+        self._writer.join(timeout=10)
+
+    def __len__(self) -> int:
+        return self._total
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "buffered": len(self._buffer),
+            "total": self._total,
+            "last_id": self._next_id - 1,
+            "journal": self.journal_path,
+            "pending_writes": self._pending.qsize(),
+            **self.stats
+        }
@@ -0,0 +1,301 @@
+# src/server/core/scheduler.py
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Any, Optional, Callable, Awaitable
+
+from ..services.metrics import QUEUE_WAIT, REJECTED_COMMANDS
+
+logger = logging.getLogger(__name__)
+
+# الإعدادات الافتراضية لجدولة الأوامر
+DEFAULT_SCHEDULER_CONFIG = {
+    "enabled": True,
+    "max_concurrent": 8,
+    "max_queue": 100,
+    "max_queue_per_client": 10,
+    "queue_timeout": 30,
+    "rate": 5.0,
+    "burst": 10
+}
+
+# فئات الأولوية من الأعلى للأدنى
+PRIORITY_CLASSES = ("special", "interactive", "rest", "batch")
+
+class SchedulerRejected(Exception):
+    """رفض الأمر قبل معالجته (حد المعدل، امتلاء الطابور أو انتهاء مهلة الانتظار)"""
+
+    def __init__(self, reason: str, retry_after: float = 1.0):
+        super().__init__(f"Command rejected: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """حد معدل لعميل واحد: سعة burst تمتلئ بمعدل rate رمز في الثانية"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now: Optional[float] = None) -> float:
+        """أخذ رمز؛ يعيد 0 عند النجاح أو الزمن حتى توفر الرمز التالي"""
+        self._refill(time.monotonic() if now is None else now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else 60.0
+
+    def full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+class _Waiter:
+    __slots__ = ("client_id", "priority", "future", "enqueued")
+
+    def __init__(self, client_id: str, priority: str, future: asyncio.Future):
+        self.client_id = client_id
+        self.priority = priority
+        self.future = future
+        self.enqueued = time.perf_counter()
+
+class CommandScheduler:
+    """طوابير أولوية أمام معالجة الأوامر: تناوب عادل بين العملاء، حد معدل لكل عميل ورفض عند الحمل الزائد"""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_concurrent: int = 8,
+        max_queue: int = 100,
+        max_queue_per_client: int = 10,
+        queue_timeout: Optional[float] = 30,
+        rate: float = 5.0,
+        burst: float = 10
+    ):
+        self.enabled = enabled
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        self.max_queue_per_client = max(1, int(max_queue_per_client))
+        self.queue_timeout = queue_timeout
+        self.rate = rate
+        self.burst = max(1.0, float(burst))
+        self._active = 0
+        self._waiting = 0
+        # لكل فئة: عميل -> طابوره، ويتناوب العملاء على الدور بترتيب القاموس
+        self._queues: Dict[str, "OrderedDict[str, deque]"] = {name: OrderedDict() for name in PRIORITY_CLASSES}
+        self._client_waiting: Dict[str, int] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self.stats = {
+            "admitted": 0,
+            "queued": 0,
+            "rate_limited": 0,
+            "shed": 0,
+            "timeouts": 0,
+            "max_wait": 0.0,
+            "total_wait": 0.0,
+            "by_priority": {name: 0 for name in PRIORITY_CLASSES}
+        }
+
+    @classmethod
+    def from_config(cls, ai_config: Optional[Dict] = None) -> "CommandScheduler":
+        """إنشاء المجدول من قسم scheduler في ملف التكوين"""
+        scheduler = dict(DEFAULT_SCHEDULER_CONFIG)
+        scheduler.update((ai_config or {}).get("scheduler", {}))
+        return cls(
+            enabled=scheduler.get("enabled", True),
+            max_concurrent=scheduler.get("max_concurrent", 8),
+            max_queue=scheduler.get("max_queue", 100),
+            max_queue_per_client=scheduler.get("max_queue_per_client", 10),
+            queue_timeout=scheduler.get("queue_timeout", 30),
+            rate=scheduler.get("rate", 5.0),
+            burst=scheduler.get("burst", 10)
+        )
+
+    @property
+    def waiting(self) -> int:
+        return self._waiting
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def _check_rate(self, client_id: str):
+        if not self.rate:
+            return
+        now = time.monotonic()
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            if len(self._buckets) >= 4096:
+                # العملاء الخاملون بدلو ممتلئ لا يحتاجون حالة
+                self._buckets = {key: value for key, value in self._buckets.items() if not value.full(now)}
+            bucket = self._buckets[client_id] = TokenBucket(self.rate, self.burst)
+        retry_after = bucket.take(now)
+        if retry_after:
+            self.stats["rate_limited"] += 1
+            raise SchedulerRejected("rate_limited", retry_after)
+
+    def _enqueue(self, waiter: _Waiter):
+        queues = self._queues[waiter.priority]
+        queues.setdefault(waiter.client_id, deque()).append(waiter)
+        self._client_waiting[waiter.client_id] = self._client_waiting.get(waiter.client_id, 0) + 1
+        self._waiting += 1
+
+    def _remove(self, waiter: _Waiter) -> bool:
+        queues = self._queues[waiter.priority]
+        queue = queues.get(waiter.client_id)
+        if not queue or waiter not in queue:
+            return False
+        queue.remove(waiter)
+        if not queue:
+            del queues[waiter.client_id]
+        self._forget(waiter)
+        return True
+
+    def _forget(self, waiter: _Waiter):
+        self._waiting -= 1
+        remaining = self._client_waiting.get(waiter.client_id, 1) - 1
+        if remaining:
+            self._client_waiting[waiter.client_id] = remaining
+        else:
+            self._client_waiting.pop(waiter.client_id, None)
+
+    def _shed_for(self, priority: str) -> bool:
+        """إفساح مكان لأمر بإسقاط أحدث أمر من أدنى فئة أقل أولوية منه، من العميل صاحب أطول طابور"""
+        rank = PRIORITY_CLASSES.index(priority)
+        for name in reversed(PRIORITY_CLASSES[rank + 1:]):
+            queues = self._queues[name]
+            if not queues:
+                continue
+            victim = max(queues.values(), key=lambda queue: (len(queue), queue[-1].enqueued))[-1]
+            self._remove(victim)
+            self.stats["shed"] += 1
+            victim.future.set_exception(SchedulerRejected("shed"))
+            return True
+        return False
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        """الأعلى أولوية أولاً، وداخل الفئة يتناوب العملاء أمراً بأمر"""
+        for name in PRIORITY_CLASSES:
+            queues = self._queues[name]
+            if not queues:
+                continue
+            client_id, queue = next(iter(queues.items()))
+            waiter = queue.popleft()
+            del queues[client_id]
+            if queue:
+                # العميل ينتقل لآخر الدور حتى لا يحجز الطابور
+                queues[client_id] = queue
+            self._forget(waiter)
+            return waiter
+        return None
+
+    def _release(self):
+        self._active -= 1
+        while self._active < self.max_concurrent:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            if waiter.future.done():
+                continue
+            self._active += 1
+            waiter.future.set_result(None)
+
+    def charge(self, client_id: Optional[str], priority: str = "batch"):
+        """أخذ رصيد واحد من حد معدل العميل دون حجز مقعد (دفعة كاملة تُحسب طلباً واحداً)"""
+        if not self.enabled:
+            return
+        try:
+            self._check_rate(client_id or "anonymous")
+        except SchedulerRejected as e:
+            REJECTED_COMMANDS.labels(priority, e.reason).inc()
+            raise
+
+    async def _admit(self, client_id: str, priority: str, charge: bool = True) -> float:
+        """حجز مقعد معالجة؛ يعيد زمن الانتظار في الطابور بالثواني"""
+        if charge:
+            self._check_rate(client_id)
+        if self._active < self.max_concurrent and not self._waiting:
+            self._active += 1
+            return 0.0
+
+        if self._client_waiting.get(client_id, 0) >= self.max_queue_per_client:
+            self.stats["shed"] += 1
+            raise SchedulerRejected("client_queue_full")
+        if self._waiting >= self.max_queue and not self._shed_for(priority):
+            self.stats["shed"] += 1
+            raise SchedulerRejected("queue_full")
+
+        waiter = _Waiter(client_id, priority, asyncio.get_running_loop().create_future())
+        self._enqueue(waiter)
+        self.stats["queued"] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if self._remove(waiter):
+                self.stats["timeouts"] += 1
+                raise SchedulerRejected("queue_timeout")
+            # أُعطي المقعد في نفس لحظة انتهاء المهلة
+        except asyncio.CancelledError:
+            if not self._remove(waiter) and waiter.future.done() and not waiter.future.exception():
+                # المقعد أُعطي لطلب أُلغي: يُمرر للتالي
+                self._release()
+            raise
+        return time.perf_counter() - waiter.enqueued
+
+    async def run(
+        self,
+        client_id: Optional[str],
+        priority: str,
+        process: Callable[[], Awaitable[Dict[str, Any]]],
+        charge: bool = True
+    ) -> Dict[str, Any]:
+        """تنفيذ process بعد القبول، مع إضافة زمن الانتظار في الطابور للنتيجة
+
+        charge=False لأوامر سبق احتسابها في حد المعدل (أوامر الدفعة بعد charge).
+        """
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class: {priority}")
+        if not self.enabled:
+            return await process()
+
+        client_id = client_id or "anonymous"
+        try:
+            wait = await self._admit(client_id, priority, charge)
+        except SchedulerRejected as e:
+            REJECTED_COMMANDS.labels(priority, e.reason).inc()
+            raise
+        QUEUE_WAIT.labels(priority).observe(wait)
+        self.stats["admitted"] += 1
+        self.stats["by_priority"][priority] += 1
+        self.stats["total_wait"] += wait
+        self.stats["max_wait"] = max(self.stats["max_wait"], wait)
+        try:
+            result = await process()
+        finally:
+            self._release()
+        result["queue_time"] = wait
+        result["priority"] = priority
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        admitted = self.stats["admitted"]
+        return {
+            "enabled": self.enabled,
+            "max_concurrent": self.max_concurrent,
+            "active": self._active,
+            "waiting": self._waiting,
+            "waiting_by_priority": {
+                name: sum(len(queue) for queue in queues.values()) for name, queues in self._queues.items()
+            },
+            "average_wait": self.stats["total_wait"] / admitted if admitted else 0.0,
+            **self.stats,
+            "by_priority": dict(self.stats["by_priority"])
+        }
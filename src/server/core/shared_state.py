@@ -0,0 +1,460 @@
+# src/server/core/shared_state.py
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple, Callable, Awaitable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# الإعدادات الافتراضية لوضع تعدد العمليات
+DEFAULT_WORKERS_CONFIG = {
+    "count": 1,
+    "backend": "auto",
+    "path": "logs/shared_state.db",
+    "poll_interval": 0.05,
+    "heartbeat_interval": 2,
+    "stale_after": 10,
+    "event_retention": 60
+}
+
+# عدادات الأوامر التي تُجمع من كل العمال في /status
+AGGREGATED_COMMAND_STATS = ("total", "successful", "failed", "blocked", "coalesced")
+
+class SharedStateBackend(ABC):
+    """واجهة الحالة المشتركة بين العمال: سجل العمال والعملاء، أحداث البث، وحجز المعرفات"""
+
+    # هل تصل الحالة لعمليات أخرى (يحدد تشغيل مهام الترحيل والنبض)
+    shared = False
+
+    @abstractmethod
+    def publish_worker(self, worker_id: str, stats: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    def remove_worker(self, worker_id: str):
+        ...
+
+    @abstractmethod
+    def workers(self, stale_after: float) -> Dict[str, Dict[str, Any]]:
+        """إحصائيات آخر نبضة لكل عامل حي"""
+
+    @abstractmethod
+    def add_client(self, worker_id: str, client_id: str):
+        ...
+
+    @abstractmethod
+    def remove_client(self, worker_id: str, client_id: str):
+        ...
+
+    @abstractmethod
+    def client_count(self, stale_after: float) -> int:
+        ...
+
+    @abstractmethod
+    def publish_event(self, origin: str, payload: str) -> int:
+        ...
+
+    @abstractmethod
+    def events_after(self, after_id: int) -> List[Tuple[int, str, str]]:
+        ...
+
+    @abstractmethod
+    def last_event_id(self) -> int:
+        ...
+
+    def prune(self, event_retention: float, stale_after: float):
+        """حذف الأحداث القديمة والعمال المتوقفين دون إيقاف نظيف"""
+
+    @abstractmethod
+    def allocate_ids(self, name: str, count: int, minimum: int = 0) -> int:
+        """حجز كتلة من المعرفات المتتالية وإرجاع أولها"""
+
+    def close(self):
+        pass
+
+class LocalStateBackend(SharedStateBackend):
+    """حالة داخل العملية نفسها لعامل واحد، بدون أي إدخال/إخراج"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._workers: Dict[str, Dict[str, Any]] = {}
+        self._clients: Dict[str, set] = {}
+        self._counters: Dict[str, int] = {}
+
+    def publish_worker(self, worker_id: str, stats: Dict[str, Any]):
+        self._workers[worker_id] = dict(stats, heartbeat_at=time.time())
+
+    def remove_worker(self, worker_id: str):
+        self._workers.pop(worker_id, None)
+        self._clients.pop(worker_id, None)
+
+    def workers(self, stale_after: float) -> Dict[str, Dict[str, Any]]:
+        return {worker_id: dict(stats) for worker_id, stats in self._workers.items()}
+
+    def add_client(self, worker_id: str, client_id: str):
+        self._clients.setdefault(worker_id, set()).add(client_id)
+
+    def remove_client(self, worker_id: str, client_id: str):
+        self._clients.get(worker_id, set()).discard(client_id)
+
+    def client_count(self, stale_after: float) -> int:
+        return sum(len(clients) for clients in self._clients.values())
+
+    def publish_event(self, origin: str, payload: str) -> int:
+        # لا توجد عمليات أخرى تستقبل البث
+        return 0
+
+    def events_after(self, after_id: int) -> List[Tuple[int, str, str]]:
+        return []
+
+    def last_event_id(self) -> int:
+        return 0
+
+    def allocate_ids(self, name: str, count: int, minimum: int = 0) -> int:
+        with self._lock:
+            start = max(self._counters.get(name, 0), minimum) + 1
+            self._counters[name] = start + count - 1
+        return start
+
+class SQLiteStateBackend(SharedStateBackend):
+    """حالة مشتركة في ملف SQLite بوضع WAL، يفتحه كل عامل باتصاله الخاص"""
+
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._transaction() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS workers (
+                    worker_id TEXT PRIMARY KEY,
+                    heartbeat_at REAL NOT NULL,
+                    stats TEXT NOT NULL
+                )
+            """)
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS clients (
+                    worker_id TEXT NOT NULL,
+                    client_id TEXT NOT NULL,
+                    connected_at REAL NOT NULL,
+                    PRIMARY KEY (worker_id, client_id)
+                )
+            """)
+            # AUTOINCREMENT يمنع إعادة استخدام معرف حدث محذوف فلا يفوت العمال أي بث
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    origin TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    payload TEXT NOT NULL
+                )
+            """)
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS counters (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            """)
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            # BEGIN IMMEDIATE: قفل الكتابة من البداية لتجنب تعارض الترقية بين العمليات
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._connection
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    def publish_worker(self, worker_id: str, stats: Dict[str, Any]):
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO workers (worker_id, heartbeat_at, stats) VALUES (?, ?, ?)",
+                (worker_id, time.time(), json.dumps(stats, default=str))
+            )
+
+    def remove_worker(self, worker_id: str):
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+            connection.execute("DELETE FROM clients WHERE worker_id = ?", (worker_id,))
+
+    def workers(self, stale_after: float) -> Dict[str, Dict[str, Any]]:
+        rows = self._query(
+            "SELECT worker_id, heartbeat_at, stats FROM workers WHERE heartbeat_at >= ?",
+            (time.time() - stale_after,)
+        )
+        return {
+            row["worker_id"]: dict(json.loads(row["stats"]), heartbeat_at=row["heartbeat_at"])
+            for row in rows
+        }
+
+    def add_client(self, worker_id: str, client_id: str):
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO clients (worker_id, client_id, connected_at) VALUES (?, ?, ?)",
+                (worker_id, client_id, time.time())
+            )
+
+    def remove_client(self, worker_id: str, client_id: str):
+        with self._transaction() as connection:
+            connection.execute(
+                "DELETE FROM clients WHERE worker_id = ? AND client_id = ?", (worker_id, client_id)
+            )
+
+    def client_count(self, stale_after: float) -> int:
+        # عملاء العمال المتوقفين بدون نبضة حديثة لا يُحسبون
+        row = self._query(
+            "SELECT COUNT(*) AS total FROM clients JOIN workers USING (worker_id) WHERE heartbeat_at >= ?",
+            (time.time() - stale_after,)
+        )[0]
+        return row["total"]
+
+    def publish_event(self, origin: str, payload: str) -> int:
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "INSERT INTO events (origin, created_at, payload) VALUES (?, ?, ?)",
+                (origin, time.time(), payload)
+            )
+            return cursor.lastrowid
+
+    def events_after(self, after_id: int) -> List[Tuple[int, str, str]]:
+        rows = self._query("SELECT id, origin, payload FROM events WHERE id > ? ORDER BY id", (after_id,))
+        return [(row["id"], row["origin"], row["payload"]) for row in rows]
+
+    def last_event_id(self) -> int:
+        return self._query("SELECT COALESCE(MAX(id), 0) AS last_id FROM events")[0]["last_id"]
+
+    def prune(self, event_retention: float, stale_after: float):
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM events WHERE created_at < ?", (now - event_retention,))
+            stale = [
+                row["worker_id"] for row in connection.execute(
+                    "SELECT worker_id FROM workers WHERE heartbeat_at < ?", (now - stale_after,)
+                )
+            ]
+            for worker_id in stale:
+                connection.execute("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+                connection.execute("DELETE FROM clients WHERE worker_id = ?", (worker_id,))
+        if stale:
+            logger.warning(f"Removed stale workers: {', '.join(stale)}")
+
+    def allocate_ids(self, name: str, count: int, minimum: int = 0) -> int:
+        with self._transaction() as connection:
+            row = connection.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+            start = max(row["value"] if row else 0, minimum) + 1
+            connection.execute(
+                "INSERT OR REPLACE INTO counters (name, value) VALUES (?, ?)", (name, start + count - 1)
+            )
+        return start
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+# الخلفيات المتاحة؛ يمكن إضافة خلفية أخرى (مثل Redis) بتسجيل صنفها هنا
+BACKENDS: Dict[str, Callable[[Dict[str, Any]], SharedStateBackend]] = {
+    "local": lambda config: LocalStateBackend(),
+    "sqlite": lambda config: SQLiteStateBackend(config.get("path", "logs/shared_state.db"))
+}
+
+def create_backend(config: Dict[str, Any]) -> SharedStateBackend:
+    """اختيار الخلفية: auto تعني local لعامل واحد و sqlite لعدة عمال"""
+    name = config.get("backend", "auto")
+    if name == "auto":
+        name = "sqlite" if int(config.get("count", 1)) > 1 else "local"
+    if name not in BACKENDS:
+        logger.warning(f"Unknown shared state backend '{name}', using 'local'")
+        name = "local"
+    return BACKENDS[name](config)
+
+class WorkerCoordinator:
+    """ربط عامل واحد بالحالة المشتركة: نبضات الإحصائيات، سجل العملاء، وترحيل البث بين العمال"""
+
+    def __init__(
+        self,
+        backend: Optional[SharedStateBackend] = None,
+        worker_id: Optional[str] = None,
+        poll_interval: float = 0.05,
+        heartbeat_interval: float = 2,
+        stale_after: float = 10,
+        event_retention: float = 60
+    ):
+        self.backend = backend or LocalStateBackend()
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self.event_retention = event_retention
+        # خيط واحد لكل عمليات الخلفية: ترتيب ثابت (الاتصال قبل الانقطاع) وبدون حجب حلقة الأحداث
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shared-state")
+        self._tasks: List[asyncio.Task] = []
+        self._last_event_id = 0
+        self._stats_provider: Optional[Callable[[], Dict[str, Any]]] = None
+        self._deliver: Optional[Callable[[str], Awaitable[int]]] = None
+        self.started_at = datetime.now().isoformat()
+        self.stats = {"events_published": 0, "events_relayed": 0, "errors": 0}
+
+    @classmethod
+    def from_config(cls, ai_config: Optional[Dict] = None) -> "WorkerCoordinator":
+        """إنشاء المنسق من قسم workers في ملف التكوين"""
+        workers = dict(DEFAULT_WORKERS_CONFIG)
+        workers.update((ai_config or {}).get("workers", {}))
+        return cls(
+            backend=create_backend(workers),
+            poll_interval=workers.get("poll_interval", 0.05),
+            heartbeat_interval=workers.get("heartbeat_interval", 2),
+            stale_after=workers.get("stale_after", 10),
+            event_retention=workers.get("event_retention", 60)
+        )
+
+    @property
+    def shared(self) -> bool:
+        return self.backend.shared
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _submit(self, func, *args):
+        """تنفيذ بالخلفية دون انتظار، مع تسجيل الأخطاء"""
+        def call():
+            try:
+                func(*args)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Shared state error in {func.__name__}: {e}")
+        self._executor.submit(call)
+
+    async def start(
+        self,
+        stats_provider: Callable[[], Dict[str, Any]],
+        deliver: Callable[[str], Awaitable[int]]
+    ):
+        """تسجيل العامل وبدء مهام النبض وترحيل البث (فقط عند مشاركة الحالة بين عمليات)"""
+        self._stats_provider = stats_provider
+        self._deliver = deliver
+        if not self.shared or self._tasks:
+            return
+        self._last_event_id = await self._run(self.backend.last_event_id)
+        await self._run(self.backend.publish_worker, self.worker_id, stats_provider())
+        self._tasks = [
+            asyncio.ensure_future(self._relay_loop()),
+            asyncio.ensure_future(self._heartbeat_loop())
+        ]
+        logger.info(f"🧩 Worker {self.worker_id} joined shared state ({type(self.backend).__name__})")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
+            try:
+                await self._run(self.backend.remove_worker, self.worker_id)
+            except Exception as e:
+                logger.error(f"Error leaving shared state: {e}")
+        self._executor.shutdown(wait=True)
+        self.backend.close()
+
+    async def _relay_loop(self):
+        """تسليم البث الصادر من العمال الآخرين لعملاء هذا العامل"""
+        while True:
+            try:
+                events = await self._run(self.backend.events_after, self._last_event_id)
+                for event_id, origin, payload in events:
+                    self._last_event_id = event_id
+                    if origin != self.worker_id:
+                        await self._deliver(payload)
+                        self.stats["events_relayed"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Broadcast relay error: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self._run(self.backend.publish_worker, self.worker_id, self._stats_provider())
+                await self._run(self.backend.prune, self.event_retention, self.stale_after)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Worker heartbeat error: {e}")
+
+    def publish(self, payload: str):
+        """نشر رسالة بث مُسلسلة لباقي العمال"""
+        if not self.shared:
+            return
+        self._submit(self.backend.publish_event, self.worker_id, payload)
+        self.stats["events_published"] += 1
+
+    def client_connected(self, client_id):
+        if self.shared:
+            self._submit(self.backend.add_client, self.worker_id, str(client_id))
+        else:
+            self.backend.add_client(self.worker_id, str(client_id))
+
+    def client_disconnected(self, client_id):
+        if self.shared:
+            self._submit(self.backend.remove_client, self.worker_id, str(client_id))
+        else:
+            self.backend.remove_client(self.worker_id, str(client_id))
+
+    def allocate_ids(self, count: int, minimum: int = 0) -> int:
+        """حجز كتلة معرفات للتاريخ لا تتكرر بين العمال (استدعاء متزامن نادر)"""
+        return self.backend.allocate_ids("history", count, minimum)
+
+    async def aggregate(self, local: Dict[str, Any]) -> Dict[str, Any]:
+        """مجموع إحصائيات العمال الأحياء، مع إحصائيات هذا العامل الحالية بدل آخر نبضة"""
+        if self.shared:
+            workers = await self._run(self.backend.workers, self.stale_after)
+            connected = await self._run(self.backend.client_count, self.stale_after)
+        else:
+            workers = {}
+            connected = self.backend.client_count(self.stale_after)
+        workers[self.worker_id] = dict(local)
+        commands = {
+            name: sum(worker.get("commands", {}).get(name, 0) for worker in workers.values())
+            for name in AGGREGATED_COMMAND_STATS
+        }
+        return {
+            "worker_id": self.worker_id,
+            "workers": len(workers),
+            "connected_clients": connected,
+            "commands": commands,
+            "per_worker": workers
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "worker_id": self.worker_id,
+            "backend": type(self.backend).__name__,
+            "shared": self.shared,
+            **self.stats
+        }
@@ -1,4 +1,7 @@
 # src/server/main.py
+import time
+_startup_started = time.perf_counter()
+
 import os
 import sys
 import socket
@@ -8,12 +11,21 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 # Project-specific imports
-from .config import setup_logging, configure_interpreter
+from .config import setup_logging, load_ai_config
 from .core.controller import AIController
+from .services.interpreter_loader import InterpreterLoader
 from .api.endpoints import register_endpoints
 
+# Load the configuration once for everything built at import time
+ai_config = load_ai_config()
+
 # Setup logging
-logger = setup_logging()
+logger = setup_logging(ai_config.get("logging"))
+
+# Open Interpreter is imported, configured and warmed up on startup (see InterpreterLoader),
+# so the app can answer /health before the heavy import chain finishes
+interpreter_loader = InterpreterLoader.from_config(ai_config)
+interpreter_loader.record("module_import", _startup_started)
 
 # --- Application Setup ---
 
@@ -35,25 +47,21 @@ app.add_middleware(
 
 # --- Dependency Initialization ---
 
-# Attempt to import and configure the Open Interpreter
-interpreter_instance = None
-try:
-    import interpreter
-    interpreter_instance = configure_interpreter(interpreter)
-    if interpreter_instance:
-        logger.info("✅ Open Interpreter loaded and configured.")
-    else:
-        logger.warning("⚠️ Open Interpreter configuration failed.")
-except ImportError:
-    logger.warning("⚠️ Open Interpreter not available. Running in basic mode.")
-except Exception as e:
-    logger.error(f"❌ Failed to configure Open Interpreter: {e}")
-
 # Initialize the main controller
-ai_controller = AIController(interpreter_instance=interpreter_instance)
+_setup_started = time.perf_counter()
+ai_controller = AIController(interpreter_loader=interpreter_loader)
 
 # Register API endpoints
 register_endpoints(app, ai_controller)
+interpreter_loader.record("app_setup", _setup_started)
+
+@app.on_event("startup")
+async def startup_controller():
+    await ai_controller.startup()
+
+@app.on_event("shutdown")
+async def shutdown_controller():
+    await ai_controller.shutdown()
 
 # --- Main Execution ---
 
@@ -75,7 +83,8 @@ def main():
     print(f"📊 Status Endpoint: http://{local_ip}:8000/status")
     print("="*80)
     print(f"📁 Working Directory: {os.getcwd()}")
-    print(f"🤖 Open Interpreter: {'✅ Available' if interpreter_instance else '❌ Not Available'}")
+    print(f"🤖 Open Interpreter: {'⏳ Loading in background' if interpreter_loader.lazy else 'Loading before startup'}")
+    print(f"🧩 Workers:          {ai_config.get('workers', {}).get('count', 1)}")
     print(f"📝 Logs: {os.path.join(os.getcwd(), 'logs')}")
     print("="*80)
     print("💡 Server Features:")
@@ -90,15 +99,27 @@ def main():
     logger.info("Starting AI Control Server v3.0")
     logger.info(f"Server accessible at: http://{local_ip}:8000")
 
-    # Run the server
+    # Run the server; several workers share stats, clients and broadcasts (workers section)
+    workers = int(ai_config.get("workers", {}).get("count", 1))
     try:
-        uvicorn.run(
-            app,
-            host="0.0.0.0",
-            port=8000,
-            log_level="info",
-            access_log=True
-        )
+        if workers > 1:
+            logger.info(f"Starting {workers} worker processes")
+            uvicorn.run(
+                f"{__package__}.main:app",
+                host="0.0.0.0",
+                port=8000,
+                workers=workers,
+                log_level="info",
+                access_log=True
+            )
+        else:
+            uvicorn.run(
+                app,
+                host="0.0.0.0",
+                port=8000,
+                log_level="info",
+                access_log=True
+            )
     except Exception as e:
         logger.error(f"Server failed to start: {e}")
         raise
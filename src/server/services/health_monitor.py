@@ -0,0 +1,167 @@
+# src/server/services/health_monitor.py
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+import requests
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from .interpreter import get_system_status
+
+logger = logging.getLogger(__name__)
+
+# الإعدادات الافتراضية لمراقب الصحة
+DEFAULT_HEALTH_CONFIG = {
+    "interval": 10,
+    "provider_timeout": 3
+}
+
+# مسار فحص الاتصال لكل مقدم خدمة محلي
+PROVIDER_PROBES = {
+    "ollama": "/api/tags"
+}
+
+class HealthMonitor:
+    """مهمة خلفية تأخذ عينات من حالة النظام والمقدمين وتحتفظ بآخر لقطة"""
+
+    def __init__(self, ai_config: Optional[Dict] = None, interval: float = 10, provider_timeout: float = 3):
+        self.ai_config = ai_config or {}
+        self.interval = interval
+        self.provider_timeout = provider_timeout
+        self._task: Optional[asyncio.Task] = None
+        self._http_client = None
+        self._session: Optional[requests.Session] = None
+        self._snapshot: Dict[str, Any] = {
+            "status": "starting",
+            "sampled_at": None,
+            "system": {},
+            "providers": {}
+        }
+        self.stats = {"samples": 0, "errors": 0, "last_sample_duration": 0.0}
+
+    @classmethod
+    def from_config(cls, ai_config: Optional[Dict] = None) -> "HealthMonitor":
+        """إنشاء المراقب من قسم health في ملف التكوين"""
+        health = dict(DEFAULT_HEALTH_CONFIG)
+        health.update((ai_config or {}).get("health", {}))
+        return cls(
+            ai_config=ai_config,
+            interval=health.get("interval", 10),
+            provider_timeout=health.get("provider_timeout", 3)
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """آخر لقطة بدون أي عمليات إدخال/إخراج"""
+        return self._snapshot
+
+    def provider_status(self, provider: str) -> str:
+        return self._snapshot["providers"].get(provider, {}).get("status", "unknown")
+
+    async def start(self):
+        """بدء أخذ العينات في الخلفية، أول عينة فورية"""
+        if self._task is not None:
+            return
+        if httpx is not None:
+            # عميل HTTP غير متزامن يعيد استخدام الاتصالات بين العينات
+            self._http_client = httpx.AsyncClient(timeout=self.provider_timeout)
+        else:
+            self._session = requests.Session()
+        self._task = asyncio.ensure_future(self._run())
+        logger.info(f"🩺 Health monitor started (every {self.interval}s)")
+
+    async def stop(self):
+        """إيقاف المهمة وإغلاق عميل HTTP"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sample_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Health sample failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def sample_once(self) -> Dict[str, Any]:
+        """أخذ عينة واحدة واستبدال اللقطة دفعة واحدة"""
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        system_task = loop.run_in_executor(None, get_system_status)
+        probes = {
+            name: self._probe_provider(name, config)
+            for name, config in self.ai_config.get("providers", {}).items()
+            if config.get("enabled", False) and name in PROVIDER_PROBES
+        }
+        probe_results = await asyncio.gather(*probes.values()) if probes else []
+        system = await system_task
+        providers = dict(zip(probes.keys(), probe_results))
+
+        # حقل ollama في حالة النظام بنفس الشكل السابق
+        if "ollama" in providers:
+            ollama = providers["ollama"]
+            system["ollama"] = {
+                "status": "running" if ollama["status"] == "connected" else (
+                    "error" if ollama["status"] == "error" else "not_running"
+                ),
+                "models": ollama.get("models", [])
+            }
+
+        self._snapshot = {
+            "status": "ok",
+            "sampled_at": datetime.now().isoformat(),
+            "system": system,
+            "providers": providers
+        }
+        self.stats["samples"] += 1
+        self.stats["last_sample_duration"] = round(time.perf_counter() - started, 4)
+        return self._snapshot
+
+    async def _probe_provider(self, name: str, config: Dict) -> Dict[str, Any]:
+        base_url = config.get("base_url", "http://localhost:11434").rstrip("/")
+        url = base_url + PROVIDER_PROBES[name]
+        started = time.perf_counter()
+        try:
+            if self._http_client is not None:
+                response = await self._http_client.get(url)
+                status_code, body = response.status_code, response
+            else:
+                session = self._session or requests.Session()
+                loop = asyncio.get_running_loop()
+                response = await loop.run_in_executor(
+                    None, lambda: session.get(url, timeout=self.provider_timeout)
+                )
+                status_code, body = response.status_code, response
+            latency = round((time.perf_counter() - started) * 1000, 2)
+            if status_code != 200:
+                return {"status": "error", "http_status": status_code, "latency_ms": latency, "models": []}
+            return {"status": "connected", "latency_ms": latency, "models": body.json()}
+        except Exception as e:
+            return {"status": "disconnected", "error": str(e), "models": []}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "interval": self.interval,
+            "running": self._task is not None,
+            "http_client": "httpx" if self._http_client is not None else "requests",
+            **self.stats
+        }
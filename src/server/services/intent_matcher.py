@@ -0,0 +1,101 @@
+# src/server/services/intent_matcher.py
+import re
+import unicodedata
+from collections import deque
+from typing import Dict, Any, Optional, List, NamedTuple
+
+# التشكيل والتطويل في النص العربي
+_ARABIC_DIACRITICS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+_ALEF_VARIANTS = str.maketrans({'\u0623': '\u0627', '\u0625': '\u0627', '\u0622': '\u0627', '\u0671': '\u0627', '\u0649': '\u064a'})
+_WHITESPACE = re.compile(r'\s+')
+
+def normalize_phrase(text: str) -> str:
+    """توحيد النص قبل المطابقة: حالة الأحرف، التشكيل، أشكال الألف والمسافات"""
+    text = unicodedata.normalize('NFKC', text).casefold()
+    text = _ARABIC_DIACRITICS.sub('', text)
+    text = text.translate(_ALEF_VARIANTS)
+    return _WHITESPACE.sub(' ', text).strip()
+
+class IntentMatch(NamedTuple):
+    """نتيجة مطابقة عبارة داخل الأمر"""
+    phrase: str
+    value: Any
+    start: int
+    end: int
+
+class IntentMatcher:
+    """مطابق Aho-Corasick مبني مرة واحدة يعيد أطول عبارة موجودة في الأمر"""
+
+    def __init__(self, mappings: Dict[str, Any]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # أطول عبارة تنتهي عند كل حالة (بما فيها عبر روابط الفشل)
+        self._best: List[int] = [-1]
+        self._phrases: List[str] = []
+        self._values: List[Any] = []
+
+        for phrase, value in mappings.items():
+            self._add(normalize_phrase(phrase), value)
+        self._build_links()
+
+    def __len__(self) -> int:
+        return len(self._phrases)
+
+    def _add(self, phrase: str, value: Any):
+        if not phrase:
+            return
+        state = 0
+        for char in phrase:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._best.append(-1)
+                self._goto[state][char] = next_state
+            state = next_state
+
+        if self._best[state] == -1:
+            self._best[state] = len(self._phrases)
+            self._phrases.append(phrase)
+            self._values.append(value)
+        else:
+            # عبارة مكررة بعد التوحيد: القيمة الأخيرة تفوز كما في القاموس
+            self._values[self._best[state]] = value
+
+    def _build_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                if self._best[child] == -1:
+                    self._best[child] = self._best[self._fail[child]]
+                queue.append(child)
+
+    def match(self, text: str, normalized: bool = False) -> Optional[IntentMatch]:
+        """البحث عن أطول عبارة مطابقة في مرور واحد على النص، والأبكر عند التساوي"""
+        if not normalized:
+            text = normalize_phrase(text)
+
+        goto, fail, best = self._goto, self._fail, self._best
+        state = 0
+        found = -1
+        found_end = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            candidate = best[state]
+            if candidate != -1 and (found == -1 or len(self._phrases[candidate]) > len(self._phrases[found])):
+                found = candidate
+                found_end = position + 1
+
+        if found == -1:
+            return None
+        phrase = self._phrases[found]
+        return IntentMatch(phrase, self._values[found], found_end - len(phrase), found_end)
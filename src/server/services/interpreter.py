@@ -1,193 +1,769 @@
 # src/server/services/interpreter.py
+import asyncio
+import functools
 import json
 import logging
+import math
 import os
 import platform
+import time
 import psutil
-import requests
-from typing import Dict, Any, Optional, List, Tuple
+import re
+from collections import deque
+from typing import Dict, Any, Optional, List, Tuple, Callable, Awaitable
+
+try:
+    from ...common.safety_rules import SafetyMatch, check_command
+except ImportError:
+    from common.safety_rules import SafetyMatch, check_command
+from .llm_engine import LLMExecutionEngine, LLMTimeoutError
+from .intent_matcher import IntentMatcher, IntentMatch, normalize_phrase
+from .metrics import LLM_LATENCY, EXTRACTION_LATENCY, provider_labels
+from .tracing import span, record_span
 
 logger = logging.getLogger(__name__)
 
-# قائمة الأوامر الخطيرة المحظورة
-DANGEROUS_COMMANDS = [
-    'format', 'fdisk', 'mkfs', 'diskpart',
-    'del /s', 'rm -rf', 'rmdir /s',
-    'shutdown /s /t 0', 'poweroff', 'halt', 'init 0',
-    'net user', 'passwd', 'chpasswd',
-    'sudo rm', 'sudo dd', 'dd if='
-]
-
-# مجلدات محمية
-PROTECTED_DIRECTORIES = [
-    'C:\\Windows\\System32', 'C:\\Windows\\SysWOW64',
-    '/etc', '/sys', '/proc', '/dev', '/bin', '/sbin',
-    '/System', '/Library'
-]
+def find_safety_violation(command: str) -> Optional[SafetyMatch]:
+    """إرجاع قاعدة الأمان التي يخالفها الأمر إن وجدت"""
+    return check_command(command, "server")
 
 def validate_command_safety(command: str) -> Tuple[bool, str]:
     """التحقق من أمان الأمر قبل التنفيذ"""
-    command_lower = command.lower().strip()
-    
-    # فحص الأوامر المحظورة
-    for dangerous in DANGEROUS_COMMANDS:
-        if dangerous.lower() in command_lower:
-            return False, f"Contains dangerous command: {dangerous}"
-    
-    # فحص المجلدات المحمية
-    for protected_dir in PROTECTED_DIRECTORIES:
-        if protected_dir.lower() in command_lower:
-            return False, f"Targets protected directory: {protected_dir}"
-    
-    # فحص الرموز الخطيرة
-    dangerous_chars = ['&&', '||', ';', '|', '>', '>>', '<']
-    for char in dangerous_chars:
-        if char in command and len(command.split(char)) > 2:
-            return False, f"Contains potentially dangerous operator: {char}"
-    
+    violation = find_safety_violation(command.strip())
+    if violation:
+        return False, violation.message
     return True, "Command is safe"
 
+# سياسات نافذة المحادثة
+CONVERSATION_POLICIES = ("reset", "last_n", "token_budget")
+
+DEFAULT_CONVERSATION_CONFIG = {
+    "policy": "last_n",
+    "max_turns": 5,
+    "max_tokens": 4000
+}
+
+def estimate_tokens(text: str, chars_per_token: int = 4) -> int:
+    """تقدير تقريبي لعدد الرموز بدون الاعتماد على مكتبة tokenizer"""
+    if not text:
+        return 0
+    return max(1, len(text) // chars_per_token)
+
+class ConversationWindow:
+    """تحديد حجم محادثة المفسر قبل كل طلب حتى لا تنمو بلا حدود"""
+
+    def __init__(self, policy: str = "last_n", max_turns: int = 5, max_tokens: int = 4000):
+        if policy not in CONVERSATION_POLICIES:
+            raise ValueError(f"Unknown conversation policy: {policy}")
+        self.policy = policy
+        self.max_turns = max(0, int(max_turns))
+        self.max_tokens = max(0, int(max_tokens))
+        self.stats = {
+            "requests": 0,
+            "trimmed_messages": 0,
+            "last_prompt_tokens": 0,
+            "last_history_tokens": 0,
+            "last_history_messages": 0,
+            "last_history_bytes": 0,
+            "peak_history_bytes": 0
+        }
+
+    @classmethod
+    def from_config(cls, ai_config: Optional[Dict] = None) -> "ConversationWindow":
+        """إنشاء النافذة من قسم conversation في ملف التكوين"""
+        conversation = dict(DEFAULT_CONVERSATION_CONFIG)
+        conversation.update((ai_config or {}).get("conversation", {}))
+        return cls(
+            policy=conversation.get("policy", "last_n"),
+            max_turns=conversation.get("max_turns", 5),
+            max_tokens=conversation.get("max_tokens", 4000)
+        )
+
+    @staticmethod
+    def _message_text(message) -> str:
+        if isinstance(message, dict):
+            content = message.get("content", "")
+            return content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+        return str(message)
+
+    @staticmethod
+    def _split_turns(messages: List) -> List[List]:
+        """تقسيم الرسائل إلى أدوار يبدأ كل منها برسالة من المستخدم"""
+        turns = []
+        for message in messages:
+            is_user = isinstance(message, dict) and message.get("role") == "user"
+            if is_user or not turns:
+                turns.append([])
+            turns[-1].append(message)
+        return turns
+
+    def _turn_tokens(self, turn: List) -> int:
+        return sum(estimate_tokens(self._message_text(message)) for message in turn)
+
+    def apply(self, interpreter, prompt: str = "") -> Dict[str, int]:
+        """تقليص رسائل المفسر حسب السياسة وتسجيل حجم الطلب"""
+        messages = list(getattr(interpreter, "messages", None) or [])
+        prompt_tokens = estimate_tokens(prompt)
+
+        if self.policy == "reset":
+            kept = []
+        elif self.policy == "last_n":
+            turns = self._split_turns(messages)
+            kept_turns = turns[-self.max_turns:] if self.max_turns else []
+            kept = [message for turn in kept_turns for message in turn]
+        else:
+            budget = max(0, self.max_tokens - prompt_tokens)
+            kept_turns = []
+            for turn in reversed(self._split_turns(messages)):
+                tokens = self._turn_tokens(turn)
+                if tokens > budget:
+                    break
+                budget -= tokens
+                kept_turns.insert(0, turn)
+            kept = [message for turn in kept_turns for message in turn]
+
+        if len(kept) != len(messages) and hasattr(interpreter, "messages"):
+            interpreter.messages = kept
+            self.stats["trimmed_messages"] += len(messages) - len(kept)
+
+        history_tokens = sum(estimate_tokens(self._message_text(message)) for message in kept)
+        history_bytes = sum(len(self._message_text(message).encode("utf-8")) for message in kept)
+
+        self.stats["requests"] += 1
+        self.stats["last_prompt_tokens"] = prompt_tokens
+        self.stats["last_history_tokens"] = history_tokens
+        self.stats["last_history_messages"] = len(kept)
+        self.stats["last_history_bytes"] = history_bytes
+        self.stats["peak_history_bytes"] = max(self.stats["peak_history_bytes"], history_bytes)
+
+        return {
+            "prompt_tokens": prompt_tokens + history_tokens,
+            "history_messages": len(kept)
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """مقاييس حجم المحادثة الحالية"""
+        return {
+            "policy": self.policy,
+            "max_turns": self.max_turns,
+            "max_tokens": self.max_tokens,
+            **self.stats
+        }
+
+def build_interpreter_prompt(command: str, context: Optional[Dict] = None) -> str:
+    """بناء prompt محسن مع السياق"""
+    prompt_parts = [
+        f"المهمة: {command}",
+        "",
+        "قم بتحليل هذه المهمة وتحويلها إلى أوامر قابلة للتنفيذ على Windows.",
+        "",
+        "متطلبات الاستجابة:",
+        "1. استخدم أوامر Windows صحيحة (CMD أو PowerShell)",
+        "2. قدم مسارات كاملة للملفات عند الحاجة", 
+        "3. تجنب العمليات المدمرة تماماً",
+        "4. إذا كانت المهمة تتطلب أتمتة GUI، استخدم pyautogui",
+        "5. كن دقيقاً في بناء الجملة",
+        "",
+    ]
+
+    if context:
+        prompt_parts.extend([
+            "معلومات السياق:",
+            f"- نوع العميل: {context.get('mode', 'unknown')}",
+            f"- نظام التشغيل: {context.get('system_info', {}).get('platform', 'unknown')}",
+            f"- معلومات إضافية: {json.dumps(context, ensure_ascii=False, indent=2)}",
+            ""
+        ])
+
+    # إضافة أمثلة للتوضيح
+    prompt_parts.extend([
+        "أمثلة على الاستجابات المطلوبة:",
+        "",
+        "مثال 1 - فتح تطبيق:",
+        "المهمة: 'افتح متصفح Chrome'",
+        "الاستجابة: start chrome",
+        "",
+        "مثال 2 - إنشاء ملف:",
+        "المهمة: 'أنشئ ملف نصي باسم test.txt'",
+        "الاستجابة: echo. > test.txt",
+        "",
+        "مثال 3 - لقطة شاشة:",
+        "المهمة: 'التقط لقطة شاشة'",
+        "الاستجابة: import pyautogui; pyautogui.screenshot().save('screenshot.png')",
+        "",
+        "الآن، حلل المهمة المطلوبة واعطني الأوامر المناسبة:"
+    ])
+
+    return "\n".join(prompt_parts)
+
 async def process_with_interpreter(
     interpreter, 
     command: str, 
     context: Optional[Dict] = None,
-    ai_config: Optional[Dict] = None
+    ai_config: Optional[Dict] = None,
+    engine: Optional[LLMExecutionEngine] = None,
+    window: Optional[ConversationWindow] = None,
+    on_abandoned: Optional[Callable] = None
 ) -> Dict[str, Any]:
     """معالجة الأمر باستخدام Open Interpreter مع تحسينات"""
     try:
-        # بناء prompt محسن مع السياق
-        prompt_parts = [
-            f"المهمة: {command}",
-            "",
-            "قم بتحليل هذه المهمة وتحويلها إلى أوامر قابلة للتنفيذ على Windows.",
-            "",
-            "متطلبات الاستجابة:",
-            "1. استخدم أوامر Windows صحيحة (CMD أو PowerShell)",
-            "2. قدم مسارات كاملة للملفات عند الحاجة", 
-            "3. تجنب العمليات المدمرة تماماً",
-            "4. إذا كانت المهمة تتطلب أتمتة GUI، استخدم pyautogui",
-            "5. كن دقيقاً في بناء الجملة",
-            "",
-        ]
-
-        if context:
-            prompt_parts.extend([
-                "معلومات السياق:",
-                f"- نوع العميل: {context.get('mode', 'unknown')}",
-                f"- نظام التشغيل: {context.get('system_info', {}).get('platform', 'unknown')}",
-                f"- معلومات إضافية: {json.dumps(context, ensure_ascii=False, indent=2)}",
-                ""
-            ])
+        with span("prompt_build"):
+            full_prompt = build_interpreter_prompt(command, context)
 
-        # إضافة أمثلة للتوضيح
-        prompt_parts.extend([
-            "أمثلة على الاستجابات المطلوبة:",
-            "",
-            "مثال 1 - فتح تطبيق:",
-            "المهمة: 'افتح متصفح Chrome'",
-            "الاستجابة: start chrome",
-            "",
-            "مثال 2 - إنشاء ملف:",
-            "المهمة: 'أنشئ ملف نصي باسم test.txt'",
-            "الاستجابة: echo. > test.txt",
-            "",
-            "مثال 3 - لقطة شاشة:",
-            "المهمة: 'التقط لقطة شاشة'",
-            "الاستجابة: import pyautogui; pyautogui.screenshot().save('screenshot.png')",
-            "",
-            "الآن، حلل المهمة المطلوبة واعطني الأوامر المناسبة:"
-        ])
+        # تقليص المحادثة السابقة قبل إضافة الطلب الجديد
+        with span("conversation_window"):
+            prompt_info = window.apply(interpreter, full_prompt) if window is not None else None
 
-        full_prompt = "\n".join(prompt_parts)
+        labels = provider_labels(ai_config)
 
-        # الحصول على استجابة من المفسر
+        # الحصول على استجابة من المفسر خارج حلقة الأحداث
         try:
-            response = interpreter.chat(full_prompt, display=False)
-            commands = extract_commands_from_response(response)
+            started = time.perf_counter()
+            if engine is not None:
+                response = await engine.run(interpreter.chat, full_prompt, display=False, on_abandoned=on_abandoned)
+            else:
+                loop = asyncio.get_running_loop()
+                response = await loop.run_in_executor(
+                    None, functools.partial(interpreter.chat, full_prompt, display=False)
+                )
+            extract_started = time.perf_counter()
+            LLM_LATENCY.labels(*labels).observe(extract_started - started)
+            record_span("llm", started, extract_started - started)
+            with span("extraction") as extraction:
+                commands = extract_commands_from_response(response)
+            EXTRACTION_LATENCY.labels(*labels).observe(extraction.duration)
             
             if not commands:
                 # إذا لم نحصل على أوامر، استخدم المعالج الأساسي
                 logger.warning("No commands extracted from interpreter, falling back to basic processing")
-                return process_basic_command(command)
+                return _fallback_to_basic(command, "no_commands")
 
-            return {
+            result = {
                 "success": True,
                 "actions": commands,
                 "method": "interpreter",
                 "raw_response": str(response)[:500] + "..." if len(str(response)) > 500 else str(response)
             }
+            if prompt_info:
+                result["prompt_tokens"] = prompt_info["prompt_tokens"]
+            return result
 
+        except LLMTimeoutError as e:
+            logger.warning(f"{e}, falling back to basic processing")
+            return _fallback_to_basic(command, "timeout")
         except Exception as e:
             logger.error(f"Interpreter chat error: {e}")
-            return process_basic_command(command)
+            return _fallback_to_basic(command, "error")
 
     except Exception as e:
         logger.error(f"Interpreter processing error: {e}")
-        return process_basic_command(command)
+        return _fallback_to_basic(command, "error")
 
-def process_basic_command(command: str) -> Dict[str, Any]:
-    """معالجة أساسية للأوامر بدون Open Interpreter - محسنة"""
-    command_lower = command.lower().strip()
-    actions = []
+async def process_with_interpreter_stream(
+    interpreter,
+    command: str,
+    context: Optional[Dict] = None,
+    ai_config: Optional[Dict] = None,
+    engine: Optional[LLMExecutionEngine] = None,
+    window: Optional[ConversationWindow] = None,
+    on_partial: Optional[Callable[[Dict], Awaitable[None]]] = None,
+    on_abandoned: Optional[Callable] = None
+) -> Dict[str, Any]:
+    """معالجة الأمر مع بث الرموز والإجراءات فور اكتمال كل كتلة كود"""
+    with span("prompt_build"):
+        full_prompt = build_interpreter_prompt(command, context)
+    with span("conversation_window"):
+        prompt_info = window.apply(interpreter, full_prompt) if window is not None else None
+    extractor = IncrementalCodeBlockExtractor()
+    actions: List[Dict] = []
 
-    # خريطة أوامر محسنة ومتوسعة
-    command_mappings = {
-        # متصفحات
-        'open chrome': 'start chrome',
-        'open browser': 'start chrome',
-        'open firefox': 'start firefox',
-        'open edge': 'start msedge',
-        
-        # تطبيقات Windows أساسية
-        'open notepad': 'notepad',
-        'open calculator': 'calc',
-        'open file explorer': 'explorer',
-        'open task manager': 'taskmgr',
-        'open control panel': 'control',
-        'open settings': 'start ms-settings:',
-        'open cmd': 'start cmd',
-        'open powershell': 'start powershell',
-        
-        # تطبيقات Office
-        'open word': 'start winword',
-        'open excel': 'start excel',
-        'open powerpoint': 'start powerpnt',
-        'open outlook': 'start outlook',
-        
-        # أوامر النظام
-        'system info': 'systeminfo',
-        'list files': 'dir',
-        'current directory': 'cd',
-        'list processes': 'tasklist',
-        'network info': 'ipconfig /all',
-        'disk space': 'dir C:\\ /-c',
-        'system uptime': 'systeminfo | findstr "System Boot Time"',
-        
-        # أوامر الطاقة (آمنة مع تأخير)
-        'shutdown': 'shutdown /s /t 60',
-        'restart': 'shutdown /r /t 60',
-        'lock screen': 'rundll32.exe user32.dll,LockWorkStation',
-        'sleep': 'rundll32.exe powrprof.dll,SetSuspendState 0,1,0',
-        
-        # أوامر خاصة
-        'take screenshot': 'screenshot_command',
-        'screen capture': 'screenshot_command',
-        'get screenshot': 'screenshot_command',
-        'volume up': 'volume_up_command',
-        'volume down': 'volume_down_command',
-        'mute': 'volume_mute_command'
+    async def emit(event: Dict):
+        if on_partial is not None:
+            await on_partial(event)
+
+    owned_engine = engine is None
+    if owned_engine:
+        engine = LLMExecutionEngine(max_concurrent=1)
+
+    labels = provider_labels(ai_config)
+    started = time.perf_counter()
+    extraction_time = 0.0
+    try:
+        async for chunk in engine.stream(
+            interpreter.chat, full_prompt, display=False, stream=True, on_abandoned=on_abandoned
+        ):
+            feed_started = time.perf_counter()
+            delta, completed = extractor.feed(chunk)
+            extraction_time += time.perf_counter() - feed_started
+            if delta:
+                await emit({"delta": delta})
+            for action in completed:
+                actions.append(action)
+                await emit({"action": action, "index": len(actions) - 1})
+
+        for action in extractor.finish():
+            actions.append(action)
+            await emit({"action": action, "index": len(actions) - 1})
+
+    except LLMTimeoutError as e:
+        if not actions:
+            logger.warning(f"{e}, falling back to basic processing")
+            return _fallback_to_basic(command, "timeout")
+        return _partial_stream_result(actions, extractor, "timeout", str(e))
+    except Exception as e:
+        logger.error(f"Interpreter stream error: {e}")
+        if not actions:
+            return _fallback_to_basic(command, "error")
+        return _partial_stream_result(actions, extractor, "error", str(e))
+    finally:
+        if owned_engine:
+            engine.shutdown(wait=False)
+        # زمن البث يشمل الاستخراج التدريجي، فنطرحه ليبقى زمن النموذج وحده
+        llm_time = time.perf_counter() - started - extraction_time
+        LLM_LATENCY.labels(*labels).observe(llm_time)
+        EXTRACTION_LATENCY.labels(*labels).observe(extraction_time)
+        record_span("llm", started, llm_time, streamed=True)
+        record_span("extraction", started, extraction_time, streamed=True)
+
+    if not actions:
+        # النص الكامل قد يكون أمراً مباشراً بدون كتل كود
+        actions = extract_commands_from_response(extractor.text)
+        if not actions:
+            logger.warning("No commands extracted from interpreter stream, falling back to basic processing")
+            return _fallback_to_basic(command, "no_commands")
+        result = {"success": True, "actions": actions, "method": "interpreter", "streamed_actions": 0}
+    else:
+        result = {"success": True, "actions": actions, "method": "interpreter", "streamed_actions": len(actions)}
+
+    text = extractor.text
+    result["raw_response"] = text[:500] + "..." if len(text) > 500 else text
+    if prompt_info:
+        result["prompt_tokens"] = prompt_info["prompt_tokens"]
+    return result
+
+def _partial_stream_result(actions: List[Dict], extractor, reason: str, error: str) -> Dict[str, Any]:
+    """الإجراءات المبثوثة قبل الخطأ أُرسلت للعميل فعلاً فلا نستبدلها بالمعالج الأساسي"""
+    return {
+        "success": True,
+        "actions": actions,
+        "method": "interpreter",
+        "streamed_actions": len(actions),
+        "fallback_reason": reason,
+        "stream_error": error,
+        "raw_response": extractor.text[:500]
     }
 
-    # البحث عن تطابق مباشر أولاً
-    matched = False
-    for key, value in command_mappings.items():
-        if key in command_lower:
-            matched = True
-            
-            if value == 'screenshot_command':
-                actions.append({
-                    "type": "python",
-                    "code": """
+def _fallback_to_basic(command: str, reason: str) -> Dict[str, Any]:
+    """المعالجة الأساسية مع تسجيل سبب عدم استخدام المفسر"""
+    with span("fallback_basic", reason=reason):
+        result = process_basic_command(command)
+    result["fallback_reason"] = reason
+    return result
+
+# الإعدادات الافتراضية لتوجيه الطلبات بين عدة مزودين/نماذج
+DEFAULT_ROUTING_CONFIG = {
+    "enabled": False,
+    "routes": [],
+    "pool_size": 1,
+    "latency_alpha": 0.2,
+    "error_weight": 4.0,
+    "window": 100,
+    "hedge": False,
+    "hedge_percentile": 95,
+    "hedge_min_samples": 10,
+    "hedge_delay": 2.0,
+    "breaker_failures": 5,
+    "breaker_cooldown": 30
+}
+
+# حالات قاطع الدائرة لكل مسار
+BREAKER_STATES = ("closed", "open", "half_open")
+
+def route_config(ai_config: Optional[Dict], provider: str, model: str, settings: Optional[Dict] = None) -> Dict[str, Any]:
+    """نسخة من التكوين يكون فيها المزود والنموذج المحددان هما الافتراضيين"""
+    ai_config = ai_config or {}
+    providers = dict(ai_config.get("providers", {}))
+    provider_config = dict(providers.get(provider, {}))
+    provider_config.update(settings or {})
+    provider_config["default_model"] = model
+    providers[provider] = provider_config
+    return {**ai_config, "default_provider": provider, "providers": providers}
+
+class ProviderRoute:
+    """مسار واحد (مزود/نموذج) بمجموعة مفسراته وزمن استجابته ومعدل أخطائه المتحركين"""
+
+    def __init__(self, provider: str, model: str, pool, window: int = 100, alpha: float = 0.2):
+        self.provider = provider
+        self.model = model
+        self.pool = pool
+        self.alpha = alpha
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.samples = deque(maxlen=max(1, int(window)))
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.stats = {"requests": 0, "failures": 0, "hedges": 0, "wins": 0, "trips": 0}
+
+    @property
+    def name(self) -> str:
+        return f"{self.provider}/{self.model}"
+
+    def available(self, cooldown: float, now: Optional[float] = None) -> bool:
+        """المسار المفتوح يُجرب بطلب واحد بعد انتهاء فترة التهدئة"""
+        if self.state == "closed":
+            return True
+        now = time.monotonic() if now is None else now
+        if self.state == "open" and now - self.opened_at >= cooldown:
+            self.state = "half_open"
+        return self.state == "half_open" and self.in_flight == 0
+
+    def score(self, error_weight: float) -> float:
+        """الزمن المتوقع: المتوسط المتحرك مضروباً في الإشغال ومعدل الأخطاء (المسار الجديد يُجرب أولاً)"""
+        if self.latency is None:
+            return 0.0
+        size = max(1, getattr(self.pool, "size", 1))
+        return self.latency * (1 + self.in_flight / size) * (1 + error_weight * self.error_rate)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(percent / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def record(self, latency: float, success: bool, breaker_failures: int):
+        """تحديث المتوسطات المتحركة وحالة قاطع الدائرة بعد كل طلب مكتمل"""
+        self.stats["requests"] += 1
+        self.error_rate += self.alpha * ((0.0 if success else 1.0) - self.error_rate)
+        if success:
+            self.samples.append(latency)
+            self.latency = latency if self.latency is None else self.latency + self.alpha * (latency - self.latency)
+            self.consecutive_failures = 0
+            self.state = "closed"
+            return
+
+        self.stats["failures"] += 1
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= breaker_failures:
+            if self.state != "open":
+                self.stats["trips"] += 1
+                logger.warning(f"🔌 Circuit open for {self.name} after {self.consecutive_failures} consecutive failure(s)")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def get_stats(self) -> Dict[str, Any]:
+        p95 = self.percentile(95)
+        return {
+            "route": self.name,
+            "state": self.state,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "in_flight": self.in_flight,
+            "consecutive_failures": self.consecutive_failures,
+            **self.stats
+        }
+
+class ProviderRouter:
+    """توجيه كل طلب إلى أسرع مسار سليم، مع طلب احتياطي (hedge) اختياري وقاطع دائرة لكل مسار"""
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        routes: Optional[List] = None,
+        pool_size: int = 1,
+        latency_alpha: float = 0.2,
+        error_weight: float = 4.0,
+        window: int = 100,
+        hedge: bool = False,
+        hedge_percentile: float = 95,
+        hedge_min_samples: int = 10,
+        hedge_delay: float = 2.0,
+        breaker_failures: int = 5,
+        breaker_cooldown: float = 30
+    ):
+        self.enabled = enabled
+        self.route_specs = list(routes or [])
+        self.pool_size = max(1, int(pool_size))
+        self.latency_alpha = latency_alpha
+        self.error_weight = error_weight
+        self.window = window
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = max(1, int(hedge_min_samples))
+        self.hedge_delay = hedge_delay
+        self.breaker_failures = max(1, int(breaker_failures))
+        self.breaker_cooldown = breaker_cooldown
+        self.routes: List[ProviderRoute] = []
+        self._stragglers = set()
+        self.stats = {"routed": 0, "hedged": 0, "hedge_wins": 0, "no_route": 0}
+
+    @classmethod
+    def from_config(cls, ai_config: Optional[Dict] = None) -> "ProviderRouter":
+        """إنشاء الموجه من قسم routing في ملف التكوين"""
+        routing = dict(DEFAULT_ROUTING_CONFIG)
+        routing.update((ai_config or {}).get("routing", {}))
+        return cls(
+            enabled=routing.get("enabled", False),
+            routes=routing.get("routes", []),
+            pool_size=routing.get("pool_size", 1),
+            latency_alpha=routing.get("latency_alpha", 0.2),
+            error_weight=routing.get("error_weight", 4.0),
+            window=routing.get("window", 100),
+            hedge=routing.get("hedge", False),
+            hedge_percentile=routing.get("hedge_percentile", 95),
+            hedge_min_samples=routing.get("hedge_min_samples", 10),
+            hedge_delay=routing.get("hedge_delay", 2.0),
+            breaker_failures=routing.get("breaker_failures", 5),
+            breaker_cooldown=routing.get("breaker_cooldown", 30)
+        )
+
+    @property
+    def active(self) -> bool:
+        """التوجيه لا معنى له بأقل من مسارين"""
+        return self.enabled and len(self.routes) > 1
+
+    def add_route(self, provider: str, model: str, pool) -> ProviderRoute:
+        route = ProviderRoute(provider, model, pool, window=self.window, alpha=self.latency_alpha)
+        self.routes.append(route)
+        return route
+
+    def candidates(self, ai_config: Optional[Dict] = None) -> List[Tuple[str, str, Dict]]:
+        """المسارات من قسم routing، أو النموذج الافتراضي لكل مزود مفعل"""
+        ai_config = ai_config or {}
+        providers = ai_config.get("providers", {})
+        specs = self.route_specs or [
+            f"{name}/{config.get('default_model')}"
+            for name, config in providers.items()
+            if config.get("enabled", False) and config.get("default_model")
+        ]
+        candidates = []
+        for spec in specs:
+            if isinstance(spec, str):
+                provider, _, model = spec.partition("/")
+                settings = {}
+            else:
+                provider, model, settings = spec.get("provider"), spec.get("model"), spec.get("settings", {})
+            if not providers.get(provider, {}).get("enabled", False) or not model:
+                logger.warning(f"Skipping route {provider}/{model}: provider disabled or model missing")
+                continue
+            candidates.append((provider, model, settings))
+        return candidates
+
+    def build(self, interpreter_module, ai_config: Optional[Dict], primary_pool=None):
+        """إنشاء مجموعة مفسرات لكل مسار (عملية حاجبة)؛ المسار الافتراضي يستخدم المجموعة الموجودة"""
+        from .interpreter_pool import InterpreterPool
+
+        default = provider_labels(ai_config)
+        for provider, model, settings in self.candidates(ai_config):
+            if primary_pool is not None and (provider, model) == default and not settings:
+                self.add_route(provider, model, primary_pool)
+                continue
+            config = route_config(ai_config, provider, model, settings)
+            config["pool"] = {**config.get("pool", {}), "size": self.pool_size}
+            pool = InterpreterPool.from_config(interpreter_module, config)
+            if pool is None:
+                logger.warning(f"⚠️ Route {provider}/{model} could not be configured")
+                continue
+            self.add_route(provider, model, pool)
+        if self.enabled:
+            logger.info(f"🧭 Provider router ready with {len(self.routes)} route(s): {', '.join(r.name for r in self.routes)}")
+
+    def choose(self, exclude: Optional[ProviderRoute] = None) -> Optional[ProviderRoute]:
+        """أفضل مسار متاح حسب الزمن المتوقع"""
+        now = time.monotonic()
+        available = [
+            route for route in self.routes
+            if route is not exclude and route.available(self.breaker_cooldown, now)
+        ]
+        if not available:
+            return None
+        return min(available, key=lambda route: route.score(self.error_weight))
+
+    def hedge_after(self, route: ProviderRoute) -> float:
+        """مهلة الطلب الاحتياطي: النسبة المئوية المحددة من أزمنة المسار، أو القيمة الثابتة قبل توفر عينات كافية"""
+        if len(route.samples) < self.hedge_min_samples:
+            return self.hedge_delay
+        return route.percentile(self.hedge_percentile)
+
+    async def _attempt(
+        self,
+        route: ProviderRoute,
+        command: str,
+        context: Optional[Dict],
+        ai_config: Optional[Dict],
+        engine: Optional[LLMExecutionEngine],
+        window: Optional[ConversationWindow],
+        on_partial: Optional[Callable[[Dict], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        from .interpreter_pool import PoolExhaustedError
+
+        config = route_config(ai_config, route.provider, route.model)
+        route.in_flight += 1
+        started = time.perf_counter()
+        try:
+            async with route.pool.acquire() as member:
+                record_span("pool_acquire", started, route=route.name)
+                if on_partial is not None:
+                    result = await process_with_interpreter_stream(
+                        member.interpreter, command, context, config,
+                        engine=engine, window=window, on_partial=on_partial, on_abandoned=member.hold
+                    )
+                else:
+                    result = await process_with_interpreter(
+                        member.interpreter, command, context, config,
+                        engine=engine, window=window, on_abandoned=member.hold
+                    )
+                failed = result.get("fallback_reason") in ("timeout", "error")
+                if failed:
+                    member.mark_failed()
+                else:
+                    member.mark_succeeded()
+        except PoolExhaustedError as e:
+            logger.warning(f"⏳ {route.name}: {e}")
+            result = _fallback_to_basic(command, "pool_exhausted")
+            failed = True
+        finally:
+            route.in_flight -= 1
+
+        route.record(time.perf_counter() - started, not failed, self.breaker_failures)
+        result["provider"], result["model"] = route.provider, route.model
+        return result
+
+    async def process(
+        self,
+        command: str,
+        context: Optional[Dict] = None,
+        ai_config: Optional[Dict] = None,
+        engine: Optional[LLMExecutionEngine] = None,
+        window: Optional[ConversationWindow] = None,
+        on_partial: Optional[Callable[[Dict], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """معالجة الأمر عبر أفضل مسار، وإرسال طلب احتياطي لمسار آخر إذا تأخر الأول"""
+        primary = self.choose()
+        if primary is None:
+            self.stats["no_route"] += 1
+            return _fallback_to_basic(command, "circuit_open")
+        self.stats["routed"] += 1
+
+        def attempt(route: ProviderRoute, partial=None):
+            return asyncio.ensure_future(
+                self._attempt(route, command, context, ai_config, engine, window, partial)
+            )
+
+        # البث يُرسل أجزاء للعميل فلا يُكرر على مسارين
+        if not self.hedge or on_partial is not None:
+            return await attempt(primary, on_partial)
+
+        first = attempt(primary)
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_after(primary))
+        backup = self.choose(exclude=primary) if not done else None
+        if backup is None:
+            return await first
+
+        self.stats["hedged"] += 1
+        backup.stats["hedges"] += 1
+        second = attempt(backup)
+        pending = {first, second}
+        result = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            task = done.pop()
+            result = task.result()
+            if result.get("method") == "interpreter" and not result.get("fallback_reason"):
+                break
+        # الطلب الخاسر لا يُلغى: مفسره ما زال يعمل في خيطه ولا يعود للمجموعة قبل انتهائه،
+        # ونتيجته تُهمل بعد تحديث زمن مساره
+        for loser in pending:
+            self._stragglers.add(loser)
+            loser.add_done_callback(self._stragglers.discard)
+        if task is second:
+            self.stats["hedge_wins"] += 1
+            backup.stats["wins"] += 1
+        else:
+            primary.stats["wins"] += 1
+        result["hedged"] = True
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "active": self.active,
+            "hedge": self.hedge,
+            **self.stats,
+            "routes": [route.get_stats() for route in self.routes]
+        }
+
+# خريطة أوامر محسنة ومتوسعة - تُترجم مرة واحدة إلى مطابق مجمّع
+COMMAND_MAPPINGS = {
+    # متصفحات
+    'open chrome': 'start chrome',
+    'open browser': 'start chrome',
+    'open firefox': 'start firefox',
+    'open edge': 'start msedge',
+    
+    # تطبيقات Windows أساسية
+    'open notepad': 'notepad',
+    'open calculator': 'calc',
+    'open file explorer': 'explorer',
+    'open task manager': 'taskmgr',
+    'open control panel': 'control',
+    'open settings': 'start ms-settings:',
+    'open cmd': 'start cmd',
+    'open powershell': 'start powershell',
+    
+    # تطبيقات Office
+    'open word': 'start winword',
+    'open excel': 'start excel',
+    'open powerpoint': 'start powerpnt',
+    'open outlook': 'start outlook',
+    
+    # أوامر النظام
+    'system info': 'systeminfo',
+    'list files': 'dir',
+    'current directory': 'cd',
+    'list processes': 'tasklist',
+    'network info': 'ipconfig /all',
+    'disk space': 'dir C:\\ /-c',
+    'system uptime': 'systeminfo | findstr "System Boot Time"',
+    
+    # أوامر الطاقة (آمنة مع تأخير)
+    'shutdown': 'shutdown /s /t 60',
+    'restart': 'shutdown /r /t 60',
+    'lock screen': 'rundll32.exe user32.dll,LockWorkStation',
+    'sleep': 'rundll32.exe powrprof.dll,SetSuspendState 0,1,0',
+    
+    # أوامر خاصة
+    'take screenshot': 'screenshot_command',
+    'screen capture': 'screenshot_command',
+    'get screenshot': 'screenshot_command',
+    'volume up': 'volume_up_command',
+    'volume down': 'volume_down_command',
+    'mute': 'volume_mute_command',
+
+    # أوامر عربية
+    'افتح كروم': 'start chrome',
+    'افتح المتصفح': 'start chrome',
+    'افتح المفكرة': 'notepad',
+    'افتح الحاسبة': 'calc',
+    'افتح مستكشف الملفات': 'explorer',
+    'افتح مدير المهام': 'taskmgr',
+    'معلومات النظام': 'systeminfo',
+    'اعرض الملفات': 'dir',
+    'قائمة العمليات': 'tasklist',
+    'معلومات الشبكة': 'ipconfig /all',
+    'اقفل الشاشة': 'rundll32.exe user32.dll,LockWorkStation',
+    'لقطة شاشة': 'screenshot_command',
+    'ارفع الصوت': 'volume_up_command',
+    'اخفض الصوت': 'volume_down_command',
+    'اكتم الصوت': 'volume_mute_command'
+}
+
+# أكواد Python للأوامر الخاصة
+SPECIAL_COMMAND_CODE = {
+    'screenshot_command': """
 import pyautogui
 import os
 from datetime import datetime
@@ -208,14 +784,8 @@ try:
     print(f'Screenshot saved: {filepath}')
 except Exception as e:
     print(f'Screenshot failed: {e}')
-"""
-                })
-            elif value.endswith('_command'):
-                # أوامر التحكم في الصوت
-                if 'volume_up' in value:
-                    actions.append({
-                        "type": "python",
-                        "code": """
+""",
+    'volume_up_command': """
 import subprocess
 try:
     # زيادة الصوت بـ 10%
@@ -223,12 +793,8 @@ try:
     print('Volume increased')
 except Exception as e:
     print(f'Volume control failed: {e}')
-"""
-                    })
-                elif 'volume_down' in value:
-                    actions.append({
-                        "type": "python", 
-                        "code": """
+""",
+    'volume_down_command': """
 import subprocess
 try:
     # تقليل الصوت بـ 10%
@@ -236,12 +802,8 @@ try:
     print('Volume decreased')
 except Exception as e:
     print(f'Volume control failed: {e}')
-"""
-                    })
-                elif 'volume_mute' in value:
-                    actions.append({
-                        "type": "python",
-                        "code": """
+""",
+    'volume_mute_command': """
 import subprocess
 try:
     # كتم/إلغاء كتم الصوت
@@ -250,16 +812,35 @@ try:
 except Exception as e:
     print(f'Mute control failed: {e}')
 """
-                    })
-            else:
-                actions.append({
-                    "type": "command",
-                    "code": value
-                })
-            break
+}
+
+_command_matcher = IntentMatcher(COMMAND_MAPPINGS)
+
+def load_command_mappings(ai_config: Optional[Dict] = None) -> int:
+    """إعادة بناء المطابق مع الأوامر الإضافية من قسم command_mappings في التكوين"""
+    global _command_matcher
+    mappings = dict(COMMAND_MAPPINGS)
+    mappings.update((ai_config or {}).get("command_mappings", {}))
+    _command_matcher = IntentMatcher(mappings)
+    logger.info(f"🧭 Command matcher compiled with {len(_command_matcher)} phrases")
+    return len(_command_matcher)
+
+def _build_basic_action(value: str) -> Dict[str, str]:
+    """تحويل قيمة الخريطة إلى إجراء قابل للتنفيذ"""
+    if value in SPECIAL_COMMAND_CODE:
+        return {"type": "python", "code": SPECIAL_COMMAND_CODE[value]}
+    return {"type": "command", "code": value}
+
+def process_basic_command(command: str) -> Dict[str, Any]:
+    """معالجة أساسية للأوامر بدون Open Interpreter - محسنة"""
+    actions = []
 
-    # إذا لم نجد تطابق، حاول تحليل أكثر ذكاءً
-    if not matched:
+    # البحث عن أطول عبارة مطابقة في مرور واحد
+    match = _command_matcher.match(command)
+    if match:
+        actions.append(_build_basic_action(match.value))
+    else:
+        # إذا لم نجد تطابق، حاول تحليل أكثر ذكاءً
         actions.extend(smart_command_analysis(command))
 
     # إذا لم نجد أي أوامر، استخدم الأمر كما هو مع فحص الأمان
@@ -282,6 +863,91 @@ except Exception as e:
         "method": "basic_enhanced"
     }
 
+# كلمات لا تغير معنى الأمر عند حساب ثقة المطابقة
+FILLER_WORDS = frozenset({
+    "please", "now", "the", "my", "a", "an", "me", "for", "can", "could", "would", "you", "just",
+    "من", "فضلك", "لو", "سمحت", "الان"
+})
+
+_WORD = re.compile(r"\w+")
+
+def match_basic_command(command: str) -> Tuple[Optional[IntentMatch], float]:
+    """أطول عبارة مطابقة مع ثقة المطابقة: كلمات العبارة إلى الكلمات ذات المعنى في الأمر"""
+    text = normalize_phrase(command)
+    match = _command_matcher.match(text, normalized=True)
+    if match is None:
+        return None, 0.0
+    # عبارة داخل كلمة أطول (mute في commute) ليست مطابقة حقيقية
+    if (match.start > 0 and text[match.start - 1].isalnum()) or (match.end < len(text) and text[match.end].isalnum()):
+        return match, 0.0
+    extra = sum(
+        1 for word in _WORD.findall(text[:match.start] + " " + text[match.end:])
+        if word not in FILLER_WORDS
+    )
+    words = len(match.phrase.split())
+    return match, words / (words + extra)
+
+# الإعدادات الافتراضية للمسار الأساسي التخميني
+DEFAULT_SPECULATION_CONFIG = {
+    "enabled": False,
+    "min_confidence": 0.75,
+    "llm_policy": "cancel"
+}
+
+# ما يحدث لاستدعاء النموذج عند قبول الإجابة الأساسية: إلغاؤه، أو إكماله في الخلفية لتحديث الذاكرة المؤقتة
+SPECULATION_LLM_POLICIES = ("cancel", "refresh")
+
+class SpeculativeBasicPath:
+    """إجابة فورية من المطابق الأساسي عندما تكون المطابقة شبه مؤكدة بدلاً من انتظار النموذج"""
+
+    def __init__(self, enabled: bool = False, min_confidence: float = 0.75, llm_policy: str = "cancel"):
+        if llm_policy not in SPECULATION_LLM_POLICIES:
+            logger.warning(f"Unknown speculation LLM policy '{llm_policy}', using 'cancel'")
+            llm_policy = "cancel"
+        self.enabled = enabled
+        self.min_confidence = min_confidence
+        self.llm_policy = llm_policy
+        self.stats = {"evaluated": 0, "hits": 0, "misses": 0, "llm_cancelled": 0, "llm_refreshed": 0}
+
+    @classmethod
+    def from_config(cls, ai_config: Optional[Dict] = None) -> "SpeculativeBasicPath":
+        """إنشاء المسار التخميني من قسم speculation في ملف التكوين"""
+        speculation = dict(DEFAULT_SPECULATION_CONFIG)
+        speculation.update((ai_config or {}).get("speculation", {}))
+        return cls(
+            enabled=speculation.get("enabled", False),
+            min_confidence=speculation.get("min_confidence", 0.75),
+            llm_policy=speculation.get("llm_policy", "cancel")
+        )
+
+    def evaluate(self, command: str) -> Optional[Dict[str, Any]]:
+        """نتيجة المعالج الأساسي إن بلغت ثقة المطابقة الحد الأدنى، وإلا None"""
+        if not self.enabled:
+            return None
+        self.stats["evaluated"] += 1
+        with span("speculative_match"):
+            match, confidence = match_basic_command(command)
+        if match is None or confidence < self.min_confidence:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return {
+            "success": True,
+            "actions": [_build_basic_action(match.value)],
+            "method": "basic_enhanced",
+            "speculative": True,
+            "confidence": round(confidence, 2),
+            "matched_phrase": match.phrase
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "min_confidence": self.min_confidence,
+            "llm_policy": self.llm_policy,
+            **self.stats
+        }
+
 def smart_command_analysis(command: str) -> List[Dict]:
     """تحليل ذكي للأوامر غير المطابقة"""
     command_lower = command.lower().strip()
@@ -467,6 +1133,101 @@ def extract_code_blocks(text: str) -> List[Dict]:
     
     return commands
 
+class IncrementalCodeBlockExtractor:
+    """نسخة تدريجية من extract_code_blocks تُخرج كل إجراء فور إغلاق كتلته"""
+
+    FENCE = '```'
+
+    def __init__(self):
+        self._buffer = ""
+        self._in_block = False
+        self._scan_from = 0
+        self._code_parts: Optional[List[str]] = None
+        self._code_format = 'auto'
+        self._text_parts: List[str] = []
+
+    @property
+    def text(self) -> str:
+        """النص الكامل المستلم حتى الآن"""
+        return "".join(self._text_parts)
+
+    def feed(self, chunk) -> Tuple[str, List[Dict]]:
+        """استقبال جزء من استجابة المفسر وإرجاع النص الجديد والإجراءات المكتملة"""
+        if isinstance(chunk, str):
+            return chunk, self.feed_text(chunk)
+        if not isinstance(chunk, dict):
+            return "", []
+
+        chunk_type = chunk.get('type')
+        content = chunk.get('content')
+        content = content if isinstance(content, str) else ""
+
+        if chunk_type == 'message':
+            return content, self.feed_text(content)
+
+        if chunk_type == 'code':
+            # كتل الكود التي يرسلها Open Interpreter مباشرة بعلامات start/end
+            if chunk.get('start') or self._code_parts is None:
+                self._code_parts = []
+                self._code_format = chunk.get('format', 'auto')
+            if content:
+                self._code_parts.append(content)
+            if chunk.get('end'):
+                code = "".join(self._code_parts).strip()
+                self._code_parts = None
+                if code:
+                    return content, [{
+                        'type': 'execute' if self._code_format == 'python' else 'command',
+                        'code': code,
+                        'language': self._code_format
+                    }]
+            return content, []
+
+        return "", []
+
+    def feed_text(self, text: str) -> List[Dict]:
+        """البحث عن علامات ``` في النص المتراكم"""
+        if not text:
+            return []
+        self._text_parts.append(text)
+        self._buffer += text
+        completed = []
+        while True:
+            index = self._buffer.find(self.FENCE, self._scan_from)
+            if index == -1:
+                if self._in_block:
+                    # قد تكون العلامة مقسومة بين جزأين
+                    self._scan_from = max(0, len(self._buffer) - len(self.FENCE) + 1)
+                else:
+                    self._buffer = self._buffer[-(len(self.FENCE) - 1):]
+                    self._scan_from = 0
+                break
+
+            if self._in_block:
+                completed.extend(extract_code_blocks(self.FENCE + self._buffer[:index] + self.FENCE))
+            self._buffer = self._buffer[index + len(self.FENCE):]
+            self._in_block = not self._in_block
+            self._scan_from = 0
+        return completed
+
+    def finish(self) -> List[Dict]:
+        """إخراج الكتلة الأخيرة غير المغلقة كما يفعل extract_code_blocks"""
+        completed = []
+        if self._in_block and self._buffer.strip():
+            completed.extend(extract_code_blocks(self.FENCE + self._buffer))
+        if self._code_parts:
+            code = "".join(self._code_parts).strip()
+            if code:
+                completed.append({
+                    'type': 'execute' if self._code_format == 'python' else 'command',
+                    'code': code,
+                    'language': self._code_format
+                })
+        self._buffer = ""
+        self._in_block = False
+        self._code_parts = None
+        return completed
+
 def is_likely_command(text: str) -> bool:
     """تحديد ما إذا كان النص يبدو كأمر"""
     text = text.strip().lower()
@@ -481,38 +1242,29 @@ def is_likely_command(text: str) -> bool:
     return any(indicator in text for indicator in command_indicators)
 
 def get_system_status() -> Dict[str, Any]:
-    """الحصول على حالة النظام الحالية"""
+    """الحصول على حالة النظام الحالية دون انتظار (يُستدعى من مراقب الصحة)"""
     try:
-        status = {
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage('C:\\' if platform.system() == 'Windows' else '/')
+        return {
             "os": platform.system(),
             "platform": platform.platform(),
             "python_version": platform.python_version(),
             "cpu_count": psutil.cpu_count(),
-            "cpu_percent": psutil.cpu_percent(interval=1),
+            # interval=None يقيس منذ الاستدعاء السابق بدلاً من الانتظار ثانية كاملة
+            "cpu_percent": psutil.cpu_percent(interval=None),
             "memory": {
-                "total": psutil.virtual_memory().total,
-                "available": psutil.virtual_memory().available,
-                "percent": psutil.virtual_memory().percent
+                "total": memory.total,
+                "available": memory.available,
+                "percent": memory.percent
             },
             "disk": {
-                "total": psutil.disk_usage('/').total if platform.system() != 'Windows' else psutil.disk_usage('C:\\').total,
-                "free": psutil.disk_usage('/').free if platform.system() != 'Windows' else psutil.disk_usage('C:\\').free,
-                "percent": psutil.disk_usage('/').percent if platform.system() != 'Windows' else psutil.disk_usage('C:\\').percent
+                "total": disk.total,
+                "free": disk.free,
+                "percent": disk.percent
             }
         }
         
-        # فحص Ollama
-        try:
-            response = requests.get("http://localhost:11434/api/tags", timeout=3)
-            status["ollama"] = {
-                "status": "running" if response.status_code == 200 else "error",
-                "models": response.json() if response.status_code == 200 else []
-            }
-        except:
-            status["ollama"] = {"status": "not_running", "models": []}
-        
-        return status
-        
     except Exception as e:
         logger.error(f"Error getting system status: {e}")
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
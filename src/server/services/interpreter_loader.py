@@ -0,0 +1,161 @@
+# src/server/services/interpreter_loader.py
+import asyncio
+import importlib
+import logging
+import time
+from typing import Dict, Any, Optional, Callable
+
+from .interpreter_pool import InterpreterPool
+
+logger = logging.getLogger(__name__)
+
+# الإعدادات الافتراضية لبدء التشغيل
+DEFAULT_STARTUP_CONFIG = {
+    "lazy_interpreter": True,
+    "pending_policy": "basic",
+    "queue_timeout": 30
+}
+
+# ما يحدث للطلبات قبل جاهزية المفسر: معالجة أساسية فوراً أو الانتظار حتى المهلة
+PENDING_POLICIES = ("basic", "queue")
+
+class InterpreterLoader:
+    """تحميل Open Interpreter وبناء المجموعة وتسخينها في الخلفية مع قياس كل مرحلة"""
+
+    def __init__(
+        self,
+        ai_config: Optional[Dict] = None,
+        lazy: bool = True,
+        pending_policy: str = "basic",
+        queue_timeout: float = 30,
+        module_name: str = "interpreter"
+    ):
+        if pending_policy not in PENDING_POLICIES:
+            logger.warning(f"Unknown pending policy '{pending_policy}', using 'basic'")
+            pending_policy = "basic"
+        self.ai_config = ai_config or {}
+        self.lazy = lazy
+        self.pending_policy = pending_policy
+        self.queue_timeout = queue_timeout
+        self.module_name = module_name
+        self.state = "idle"
+        self.error: Optional[str] = None
+        self.pool: Optional[InterpreterPool] = None
+        # الوحدة المستوردة لبناء مسارات الموجه لاحقاً (None للمزود الوهمي)
+        self.module = None
+        # مدة كل مرحلة بالمللي ثانية بترتيب حدوثها
+        self.timings: Dict[str, float] = {}
+        self._created = time.perf_counter()
+        self._ready: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(cls, ai_config: Optional[Dict] = None) -> "InterpreterLoader":
+        """إنشاء المحمل من قسم startup في ملف التكوين"""
+        startup = dict(DEFAULT_STARTUP_CONFIG)
+        startup.update((ai_config or {}).get("startup", {}))
+        return cls(
+            ai_config=ai_config,
+            lazy=startup.get("lazy_interpreter", True),
+            pending_policy=startup.get("pending_policy", "basic"),
+            queue_timeout=startup.get("queue_timeout", 30)
+        )
+
+    def record(self, phase: str, started: float) -> float:
+        """تسجيل مدة مرحلة بدأت عند started (perf_counter)"""
+        elapsed = (time.perf_counter() - started) * 1000
+        self.timings[phase] = round(elapsed, 2)
+        return elapsed
+
+    @property
+    def pending(self) -> bool:
+        """هل ما زال المفسر قيد التحميل (أو لم يبدأ)"""
+        return self.state in ("idle", "loading")
+
+    def _get_ready_event(self) -> asyncio.Event:
+        # يُنشأ داخل الحلقة الجارية لتوافق Python 3.8/3.9
+        if self._ready is None:
+            self._ready = asyncio.Event()
+            if not self.pending:
+                self._ready.set()
+        return self._ready
+
+    def _import_module(self):
+        # المزود الوهمي لا يحتاج Open Interpreter إطلاقاً
+        if self.ai_config.get("default_provider") == "mock":
+            return None
+        return importlib.import_module(self.module_name)
+
+    def load_pool(self) -> Optional[InterpreterPool]:
+        """الاستيراد وبناء المجموعة (عمليات حاجبة تُنفذ خارج حلقة الأحداث)"""
+        started = time.perf_counter()
+        module = self.module = self._import_module()
+        self.record("interpreter_import", started)
+        started = time.perf_counter()
+        pool = InterpreterPool.from_config(module, self.ai_config)
+        self.record("pool_create", started)
+        return pool
+
+    async def load(self, engine=None, on_ready: Optional[Callable[[InterpreterPool], None]] = None):
+        """تحميل المجموعة وتسخينها ثم إبلاغ المتحكم"""
+        ready = self._get_ready_event()
+        self.state = "loading"
+        loop = asyncio.get_running_loop()
+        try:
+            pool = await loop.run_in_executor(None, self.load_pool)
+            if pool is not None:
+                started = time.perf_counter()
+                await pool.warm_up(engine)
+                self.record("warm_up", started)
+            self.pool = pool
+            self.state = "ready" if pool is not None and pool.size else "unavailable"
+            if pool is None:
+                logger.warning("⚠️ Open Interpreter configuration failed.")
+            if pool is not None and on_ready is not None:
+                on_ready(pool)
+        except ImportError:
+            self.state = "unavailable"
+            logger.warning("⚠️ Open Interpreter not available. Running in basic mode.")
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            logger.error(f"❌ Failed to configure Open Interpreter: {e}")
+        finally:
+            total = self.record("interpreter_ready", self._created)
+            ready.set()
+
+        if self.state == "ready":
+            phases = ", ".join(f"{name} {value:.0f}ms" for name, value in self.timings.items())
+            logger.info(f"✅ Open Interpreter ready ({self.pool.size} instance(s)) in {total:.0f}ms: {phases}")
+
+    def start(self, engine=None, on_ready: Optional[Callable[[InterpreterPool], None]] = None):
+        """بدء التحميل في الخلفية دون تأخير قبول الطلبات"""
+        if self._task is None:
+            self.state = "loading"
+            self._task = asyncio.ensure_future(self.load(engine, on_ready))
+        return self._task
+
+    async def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """انتظار انتهاء التحميل (بنجاح أو فشل) حتى المهلة"""
+        try:
+            await asyncio.wait_for(self._get_ready_event().wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "lazy": self.lazy,
+            "pending_policy": self.pending_policy,
+            "timings_ms": dict(self.timings),
+            "error": self.error
+        }
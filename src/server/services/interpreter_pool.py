@@ -0,0 +1,267 @@
+# src/server/services/interpreter_pool.py
+import asyncio
+import itertools
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, List, Callable
+
+from ..config import configure_interpreter, create_interpreter_instance
+
+logger = logging.getLogger(__name__)
+
+# الإعدادات الافتراضية لمجموعة المفسرات
+DEFAULT_POOL_CONFIG = {
+    "size": 2,
+    "max_failures": 3,
+    "acquire_timeout": 30,
+    "warmup_prompt": None
+}
+
+class PoolExhaustedError(Exception):
+    """لا توجد نسخة متاحة من المفسر خلال المهلة"""
+
+class PooledInterpreter:
+    """نسخة مفسر داخل المجموعة مع حالتها الصحية"""
+
+    def __init__(self, member_id: int, interpreter):
+        self.id = member_id
+        self.interpreter = interpreter
+        self.uses = 0
+        self.consecutive_failures = 0
+        self.total_failures = 0
+        # استدعاء chat ما زال يعمل في خيط بعد انتهاء مهلة الطلب
+        self.pending = None
+
+    def hold(self, work):
+        """حجز النسخة حتى ينتهي الخيط الذي ما زال يستخدمها"""
+        self.pending = work
+
+    def mark_failed(self):
+        """تسجيل فشل استدعاء على هذه النسخة"""
+        self.consecutive_failures += 1
+        self.total_failures += 1
+
+    def mark_succeeded(self):
+        self.consecutive_failures = 0
+
+class InterpreterPool:
+    """مجموعة نسخ معزولة من Open Interpreter تُستعار لكل طلب ثم تُعاد"""
+
+    def __init__(
+        self,
+        factory: Optional[Callable[[], Any]] = None,
+        size: int = 2,
+        max_failures: int = 3,
+        acquire_timeout: Optional[float] = 30,
+        warmup_prompt: Optional[str] = None,
+        instances: Optional[List[Any]] = None
+    ):
+        self.factory = factory
+        self.max_failures = max(1, int(max_failures))
+        self.acquire_timeout = acquire_timeout
+        self.warmup_prompt = warmup_prompt
+        self._ids = itertools.count(1)
+        self._members: Dict[int, PooledInterpreter] = {}
+        self._idle: Optional[asyncio.Queue] = None
+        self._initial_idle: List[PooledInterpreter] = []
+        self.stats = {"checkouts": 0, "evictions": 0, "replacements": 0, "held": 0}
+        self._held = 0
+
+        if instances is None:
+            instances = self._create_instances(size)
+        for instance in instances:
+            self._add_member(instance)
+
+    @classmethod
+    def from_config(cls, interpreter_module, ai_config: Optional[Dict] = None) -> Optional["InterpreterPool"]:
+        """بناء المجموعة من قسم pool في ملف التكوين باستخدام configure_interpreter"""
+        pool_config = dict(DEFAULT_POOL_CONFIG)
+        pool_config.update((ai_config or {}).get("pool", {}))
+
+        def factory():
+            return configure_interpreter(create_interpreter_instance(interpreter_module), ai_config)
+
+        pool = cls(
+            factory=factory,
+            size=pool_config.get("size", 2),
+            max_failures=pool_config.get("max_failures", 3),
+            acquire_timeout=pool_config.get("acquire_timeout", 30),
+            warmup_prompt=pool_config.get("warmup_prompt")
+        )
+        if not pool.size:
+            logger.warning("⚠️ No interpreter instance could be configured")
+            return None
+        return pool
+
+    @classmethod
+    def from_instances(cls, instances: List[Any]) -> "InterpreterPool":
+        """مجموعة ثابتة من نسخ جاهزة بدون مصنع للاستبدال"""
+        return cls(instances=list(instances))
+
+    @property
+    def size(self) -> int:
+        return len(self._members)
+
+    def _create_instances(self, count: int) -> List[Any]:
+        instances = []
+        for _ in range(max(0, int(count))):
+            instance = self.factory() if self.factory else None
+            if instance is None:
+                continue
+            if any(instance is existing for existing in instances):
+                # نسخة Open Interpreter القديمة لا توفر إنشاء نسخ مستقلة
+                logger.warning("⚠️ Interpreter module does not support separate instances, pool size limited to 1")
+                break
+            instances.append(instance)
+        return instances
+
+    def _add_member(self, instance) -> PooledInterpreter:
+        member = PooledInterpreter(next(self._ids), instance)
+        self._members[member.id] = member
+        if self._idle is None:
+            self._initial_idle.append(member)
+        else:
+            self._idle.put_nowait(member)
+        return member
+
+    def _get_idle_queue(self) -> asyncio.Queue:
+        # يُنشأ داخل الحلقة الجارية لتوافق Python 3.8/3.9
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            for member in self._initial_idle:
+                self._idle.put_nowait(member)
+            self._initial_idle = []
+        return self._idle
+
+    def instances(self) -> List[Any]:
+        """جميع النسخ الحالية بما فيها المستعارة"""
+        return [member.interpreter for member in self._members.values()]
+
+    @asynccontextmanager
+    async def acquire(self, timeout: Optional[float] = None):
+        """استعارة نسخة لطلب واحد وإعادتها تلقائياً"""
+        queue = self._get_idle_queue()
+        timeout = self.acquire_timeout if timeout is None else timeout
+        try:
+            member = await asyncio.wait_for(queue.get(), timeout)
+        except asyncio.TimeoutError:
+            raise PoolExhaustedError(f"No interpreter available within {timeout}s")
+
+        member.uses += 1
+        self.stats["checkouts"] += 1
+        try:
+            yield member
+        except Exception:
+            member.mark_failed()
+            raise
+        finally:
+            await self._release(member)
+
+    async def _release(self, member: PooledInterpreter):
+        if member.consecutive_failures >= self.max_failures:
+            await self._evict(member)
+            return
+        work, member.pending = member.pending, None
+        if work is not None and not work.done():
+            # الطلب توقف عن الانتظار لكن الخيط ما زال داخل chat ويعدل messages:
+            # لا تُعار النسخة لطلب آخر قبل انتهائه
+            self._hold_until_done(member, work)
+            return
+        self._get_idle_queue().put_nowait(member)
+
+    def _hold_until_done(self, member: PooledInterpreter, work):
+        loop = asyncio.get_running_loop()
+        self._held += 1
+        self.stats["held"] += 1
+        logger.warning(f"⏳ Interpreter #{member.id} held until its abandoned call finishes")
+
+        def finished(_):
+            try:
+                loop.call_soon_threadsafe(self._return_held, member)
+            except RuntimeError:
+                # الحلقة أُغلقت (إيقاف الخادم)
+                pass
+
+        work.add_done_callback(finished)
+
+    def _return_held(self, member: PooledInterpreter):
+        self._held -= 1
+        if member.id in self._members:
+            self._get_idle_queue().put_nowait(member)
+
+    async def _evict(self, member: PooledInterpreter):
+        """إزالة نسخة غير سليمة واستبدالها بنسخة جديدة"""
+        self._members.pop(member.id, None)
+        self.stats["evictions"] += 1
+        logger.warning(
+            f"🩺 Evicting interpreter #{member.id} after {member.consecutive_failures} consecutive failures"
+        )
+        if not self.factory:
+            return
+
+        loop = asyncio.get_running_loop()
+        try:
+            replacement = await loop.run_in_executor(None, self.factory)
+        except Exception as e:
+            logger.error(f"❌ Failed to create replacement interpreter: {e}")
+            return
+        if replacement is not None:
+            new_member = self._add_member(replacement)
+            self.stats["replacements"] += 1
+            logger.info(f"✅ Interpreter #{new_member.id} added to pool")
+
+    async def warm_up(self, engine=None):
+        """تسخين النسخ عند بدء التشغيل وإزالة ما يفشل منها"""
+        queue = self._get_idle_queue()
+        members = []
+        while not queue.empty():
+            members.append(queue.get_nowait())
+
+        for member in members:
+            healthy = self._check_configured(member.interpreter)
+            if healthy and self.warmup_prompt:
+                try:
+                    if engine is not None:
+                        await engine.run(member.interpreter.chat, self.warmup_prompt, display=False)
+                    else:
+                        loop = asyncio.get_running_loop()
+                        await loop.run_in_executor(None, lambda: member.interpreter.chat(self.warmup_prompt, display=False))
+                    reset = getattr(member.interpreter, "reset", None)
+                    if callable(reset):
+                        reset()
+                except Exception as e:
+                    logger.warning(f"⚠️ Warm-up failed for interpreter #{member.id}: {e}")
+                    healthy = False
+
+            if healthy:
+                queue.put_nowait(member)
+            else:
+                member.consecutive_failures = self.max_failures
+                await self._evict(member)
+
+        logger.info(f"🔥 Interpreter pool warmed up ({self.size} instance(s))")
+
+    @staticmethod
+    def _check_configured(interpreter) -> bool:
+        llm = getattr(interpreter, "llm", None)
+        return llm is None or bool(getattr(llm, "model", None))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """إحصائيات المجموعة الحالية"""
+        idle = self._idle.qsize() if self._idle is not None else len(self._initial_idle)
+        return {
+            "size": self.size,
+            "idle": idle,
+            "in_use": self.size - idle - self._held,
+            "held_now": self._held,
+            **self.stats,
+            "members": [
+                {
+                    "id": member.id,
+                    "uses": member.uses,
+                    "consecutive_failures": member.consecutive_failures,
+                    "total_failures": member.total_failures
+                }
+                for member in self._members.values()
+            ]
+        }
@@ -0,0 +1,210 @@
+# src/server/services/llm_engine.py
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable, AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+# الإعدادات الافتراضية لمحرك التنفيذ
+DEFAULT_EXECUTION_CONFIG = {
+    "max_concurrent": 4,
+    "timeout": 120
+}
+
+# علامة نهاية البث بين خيط التوليد وحلقة الأحداث
+_STREAM_END = object()
+
+class LLMTimeoutError(Exception):
+    """انتهت مهلة استدعاء النموذج"""
+
+class LLMExecutionEngine:
+    """تشغيل استدعاءات النموذج المتزامنة في مجموعة خيوط خارج حلقة الأحداث"""
+
+    def __init__(self, max_concurrent: int = 4, timeout: Optional[float] = 120):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrent,
+            thread_name_prefix="llm-worker"
+        )
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._active = 0
+        self._waiting = 0
+        self.stats = {
+            "completed": 0,
+            "failed": 0,
+            "timeouts": 0,
+            "cancelled": 0
+        }
+
+    @classmethod
+    def from_config(cls, ai_config: Optional[Dict] = None) -> "LLMExecutionEngine":
+        """إنشاء المحرك من قسم execution في ملف التكوين"""
+        execution = dict(DEFAULT_EXECUTION_CONFIG)
+        execution.update((ai_config or {}).get("execution", {}))
+        return cls(
+            max_concurrent=execution.get("max_concurrent", 4),
+            timeout=execution.get("timeout", 120)
+        )
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # يُنشأ داخل الحلقة الجارية لتوافق Python 3.8/3.9
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        return self._semaphore
+
+    async def _submit(self, fn: Callable):
+        """انتظار مقعد متاح ثم إرسال الدالة إلى مجموعة الخيوط"""
+        semaphore = self._get_semaphore()
+        self._waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
+        loop = asyncio.get_running_loop()
+        self._active += 1
+        try:
+            work = self._executor.submit(fn)
+        except Exception:
+            self._active -= 1
+            semaphore.release()
+            raise
+
+        def _release(_):
+            # لا يتحرر المقعد إلا بعد انتهاء الخيط فعلياً حتى لا يتجاوز الحد
+            try:
+                loop.call_soon_threadsafe(self._on_finished, semaphore)
+            except RuntimeError:
+                # الحلقة أُغلقت قبل انتهاء الخيط (إيقاف الخادم)
+                pass
+
+        work.add_done_callback(_release)
+        return work
+
+    @staticmethod
+    def _abandon(work, on_abandoned: Optional[Callable]):
+        # الخيط لا يمكن إيقافه: من يملك الكائن المستخدم يُبلغ ليحجزه حتى ينتهي
+        if on_abandoned is not None and not work.done():
+            on_abandoned(work)
+
+    async def run(
+        self,
+        func: Callable,
+        *args,
+        timeout: Optional[float] = None,
+        on_abandoned: Optional[Callable] = None,
+        **kwargs
+    ) -> Any:
+        """تنفيذ دالة متزامنة في خيط منفصل مع حد للتوازي ومهلة زمنية
+
+        on_abandoned تستقبل Future الخيط إذا توقف الانتظار (مهلة أو إلغاء) والخيط ما زال يعمل.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        work = await self._submit(functools.partial(func, *args, **kwargs))
+
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(work), timeout)
+            self.stats["completed"] += 1
+            return result
+        except asyncio.TimeoutError:
+            work.cancel()
+            self._abandon(work, on_abandoned)
+            self.stats["timeouts"] += 1
+            logger.warning(f"⏱️ LLM call timed out after {timeout}s")
+            raise LLMTimeoutError(f"LLM call timed out after {timeout}s")
+        except asyncio.CancelledError:
+            # إلغاء الطلبات التي لم تبدأ بعد، أما الجارية فتُترك لتنتهي وتُهمل نتيجتها
+            work.cancel()
+            self._abandon(work, on_abandoned)
+            self.stats["cancelled"] += 1
+            raise
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+
+    async def stream(
+        self,
+        func: Callable,
+        *args,
+        timeout: Optional[float] = None,
+        on_abandoned: Optional[Callable] = None,
+        **kwargs
+    ) -> AsyncIterator[Any]:
+        """تشغيل دالة مولّدة في خيط منفصل وتمرير عناصرها فور وصولها"""
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def publish(item, error=None):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, (item, error))
+            except RuntimeError:
+                stop.set()
+
+        def produce():
+            try:
+                for item in func(*args, **kwargs):
+                    if stop.is_set():
+                        # توقف المستهلك: نغلق المولّد بدلاً من إكمال التوليد
+                        break
+                    publish(item)
+            except BaseException as e:
+                publish(_STREAM_END, e)
+            else:
+                publish(_STREAM_END)
+
+        work = await self._submit(produce)
+        deadline = loop.time() + timeout if timeout else None
+        ended = False
+        try:
+            while True:
+                remaining = None if deadline is None else deadline - loop.time()
+                if remaining is not None and remaining <= 0:
+                    raise asyncio.TimeoutError()
+                item, error = await asyncio.wait_for(queue.get(), remaining)
+                if item is _STREAM_END:
+                    ended = True
+                    if error is not None:
+                        raise error
+                    break
+                yield item
+            self.stats["completed"] += 1
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            logger.warning(f"⏱️ LLM stream timed out after {timeout}s")
+            raise LLMTimeoutError(f"LLM stream timed out after {timeout}s")
+        except (asyncio.CancelledError, GeneratorExit):
+            self.stats["cancelled"] += 1
+            raise
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+        finally:
+            stop.set()
+            work.cancel()
+            if not ended:
+                self._abandon(work, on_abandoned)
+
+    def _on_finished(self, semaphore: asyncio.Semaphore):
+        self._active -= 1
+        semaphore.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """إحصائيات المحرك الحالية"""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "timeout": self.timeout,
+            "active": self._active,
+            "waiting": self._waiting,
+            **self.stats
+        }
+
+    def shutdown(self, wait: bool = False):
+        """إيقاف مجموعة الخيوط"""
+        self._executor.shutdown(wait=wait)
+        logger.info("🛑 LLM execution engine stopped")
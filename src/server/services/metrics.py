@@ -0,0 +1,251 @@
+# src/server/services/metrics.py
+import math
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Dict, Any, Optional, Tuple, Callable, List
+
+# حدود فئات زمن الاستجابة بالثواني (من أوامر المعالج الأساسي حتى استدعاءات النموذج الطويلة)
+DEFAULT_LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0
+)
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _label_text(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+class _GaugeChild:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        """قيمة تُحسب عند القراءة فقط (مثل عدد العملاء المتصلين)"""
+        self.function = function
+
+    def get(self) -> float:
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception:
+                return math.nan
+        return self.value
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        # بحث ثنائي على الحدود ثم زيادة عداد واحد؛ التجميع التراكمي يتم عند العرض فقط
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class _Metric(ABC):
+    kind = ""
+    child_class: Callable = _CounterChild
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        return self.child_class()
+
+    def labels(self, *values) -> Any:
+        """القيم بنفس ترتيب labelnames؛ العنصر يُنشأ مرة واحدة ثم يُعاد استخدامه"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            yield tuple(str(value) for value in key), child
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    @abstractmethod
+    def _render_samples(self) -> List[str]:
+        ...
+
+class Counter(_Metric):
+    kind = "counter"
+    child_class = _CounterChild
+
+    def inc(self, amount: float = 1.0):
+        self._children[()].inc(amount)
+
+    def _render_samples(self) -> List[str]:
+        return [
+            f"{self.name}_total{_label_text(self.labelnames, key)} {_format_value(child.value)}"
+            for key, child in self._samples()
+        ]
+
+class Gauge(_Metric):
+    kind = "gauge"
+    child_class = _GaugeChild
+
+    def set(self, value: float):
+        self._children[()].set(value)
+
+    def set_function(self, function: Callable[[], float]):
+        self._children[()].set_function(function)
+
+    def _render_samples(self) -> List[str]:
+        return [
+            f"{self.name}{_label_text(self.labelnames, key)} {_format_value(child.get())}"
+            for key, child in self._samples()
+        ]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_LATENCY_BUCKETS):
+        self.bounds = tuple(sorted(float(bound) for bound in buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float):
+        self._children[()].observe(value)
+
+    def _render_samples(self) -> List[str]:
+        lines = []
+        for key, child in self._samples():
+            cumulative = 0
+            for bound, count in zip(self.bounds + (math.inf,), child.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, le)} {cumulative}")
+            labels = _label_text(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+class MetricsRegistry:
+    """مجموعة المقاييس وعرضها بصيغة Prometheus النصية"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# السجل الافتراضي للخادم
+REGISTRY = MetricsRegistry()
+
+COMMAND_LATENCY = REGISTRY.histogram(
+    "ai_control_command_duration_seconds", "End-to-end command processing time",
+    ("provider", "model", "method")
+)
+SAFETY_CHECK_LATENCY = REGISTRY.histogram(
+    "ai_control_safety_check_duration_seconds", "Time spent in the safety rules check"
+)
+LLM_LATENCY = REGISTRY.histogram(
+    "ai_control_llm_duration_seconds", "Time spent waiting for the language model",
+    ("provider", "model")
+)
+EXTRACTION_LATENCY = REGISTRY.histogram(
+    "ai_control_extraction_duration_seconds", "Time spent extracting actions from model output",
+    ("provider", "model")
+)
+COMMANDS = REGISTRY.counter(
+    "ai_control_commands", "Processed commands by outcome",
+    ("provider", "model", "method", "outcome")
+)
+BLOCKED_COMMANDS = REGISTRY.counter(
+    "ai_control_blocked_commands", "Commands blocked by the safety rules", ("rule",)
+)
+CACHE_HITS = REGISTRY.counter(
+    "ai_control_cache_hits", "Commands answered from the response cache"
+)
+COALESCED_COMMANDS = REGISTRY.counter(
+    "ai_control_coalesced_commands", "Commands that joined an identical in-flight LLM call"
+)
+CONNECTED_CLIENTS = REGISTRY.gauge(
+    "ai_control_connected_clients", "Connected WebSocket clients"
+)
+QUEUE_DEPTH = REGISTRY.gauge(
+    "ai_control_queue_depth", "Items waiting in internal queues", ("queue",)
+)
+QUEUE_WAIT = REGISTRY.histogram(
+    "ai_control_queue_wait_seconds", "Time commands waited for admission before processing", ("priority",)
+)
+REJECTED_COMMANDS = REGISTRY.counter(
+    "ai_control_rejected_commands", "Commands rejected by admission control", ("priority", "reason")
+)
+
+def provider_labels(ai_config: Optional[Dict]) -> Tuple[str, str]:
+    """المزود والنموذج النشطان من التكوين لاستخدامهما كوسوم"""
+    ai_config = ai_config or {}
+    provider = ai_config.get("default_provider", "basic")
+    if provider == "basic":
+        return provider, "basic_commands"
+    model = ai_config.get("providers", {}).get(provider, {}).get("default_model", "unknown")
+    return provider, model
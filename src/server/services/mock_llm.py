@@ -0,0 +1,175 @@
+# src/server/services/mock_llm.py
+import hashlib
+import json
+import logging
+import random
+import time
+from typing import Dict, Any, List, Optional, Iterator, Union
+
+logger = logging.getLogger(__name__)
+
+# ردود حتمية تُختار حسب بصمة الطلب، بنفس شكل ردود Open Interpreter
+DEFAULT_MOCK_TEMPLATES = [
+    "Here is the command:\n```cmd\ndir\n```",
+    "Opening it now:\n```cmd\nstart chrome\n```",
+    "```python\nimport os\nprint(os.getcwd())\n```",
+    "Two steps:\n```cmd\ncd %USERPROFILE%\n```\n```cmd\ndir /b\n```"
+]
+
+# الإعدادات الافتراضية لمزود mock في قسم providers
+DEFAULT_MOCK_CONFIG = {
+    "latency": 0.05,
+    "tokens_per_second": 0,
+    "chunk_chars": 16,
+    "failure_rate": 0.0,
+    "failure_mode": "error",
+    "hang_seconds": 300,
+    "seed": 0,
+    "recordings_path": None,
+    "templates": None
+}
+
+# error: استثناء (في البث بعد نصف الرد)، hang: توقف حتى تنتهي مهلة المحرك
+FAILURE_MODES = ("error", "hang")
+
+class MockLLMError(Exception):
+    """فشل مُحقن من المزود الوهمي"""
+
+def load_recordings(path: str) -> List[Dict[str, str]]:
+    """قراءة الردود المسجلة: قائمة {match, response} أو قاموس match -> response"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = [{"match": match, "response": response} for match, response in data.items()]
+    recordings = []
+    for item in data:
+        if item.get("match") and isinstance(item.get("response"), str):
+            recordings.append({"match": item["match"].lower(), "response": item["response"]})
+    return recordings
+
+class MockInterpreter:
+    """بديل محلي للمفسر بزمن استجابة قابل للضبط وبدون شبكة"""
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        templates: Optional[List[str]] = None,
+        tokens_per_second: float = 0,
+        chunk_chars: int = 16,
+        failure_rate: float = 0.0,
+        failure_mode: str = "error",
+        hang_seconds: float = 300,
+        seed: int = 0,
+        recordings: Optional[List[Dict[str, str]]] = None
+    ):
+        if failure_mode not in FAILURE_MODES:
+            raise ValueError(f"Unknown failure mode: {failure_mode}")
+        self.latency = latency
+        self.templates = list(templates or DEFAULT_MOCK_TEMPLATES)
+        self.tokens_per_second = max(0.0, float(tokens_per_second or 0))
+        self.chunk_chars = max(1, int(chunk_chars))
+        self.failure_rate = min(1.0, max(0.0, float(failure_rate)))
+        self.failure_mode = failure_mode
+        self.hang_seconds = hang_seconds
+        self.recordings = list(recordings or [])
+        # مولد خاص بكل نسخة حتى يتكرر تسلسل الأعطال نفسه في كل تشغيل
+        self._rng = random.Random(seed)
+        self.messages: List[Dict[str, Any]] = []
+        self.calls = 0
+        self.stats = {"replayed": 0, "templated": 0, "failures": 0}
+
+    @staticmethod
+    def _settings(provider_config: Optional[Dict] = None) -> Dict[str, Any]:
+        config = dict(DEFAULT_MOCK_CONFIG)
+        config.update(provider_config or {})
+        recordings = []
+        if config.get("recordings_path"):
+            try:
+                recordings = load_recordings(config["recordings_path"])
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not load mock recordings from {config['recordings_path']}: {e}")
+        return {
+            "latency": config.get("latency", 0.05),
+            "templates": config.get("templates"),
+            "tokens_per_second": config.get("tokens_per_second", 0),
+            "chunk_chars": config.get("chunk_chars", 16),
+            "failure_rate": config.get("failure_rate", 0.0),
+            "failure_mode": config.get("failure_mode", "error"),
+            "hang_seconds": config.get("hang_seconds", 300),
+            "seed": config.get("seed", 0),
+            "recordings": recordings
+        }
+
+    @classmethod
+    def from_config(cls, provider_config: Optional[Dict] = None) -> "MockInterpreter":
+        """بناء المفسر الوهمي من providers.mock في ملف التكوين"""
+        return cls(**cls._settings(provider_config))
+
+    def configure(self, provider_config: Optional[Dict] = None):
+        """تطبيق إعدادات جديدة مع الإبقاء على المحادثة والعدادات"""
+        messages, calls, stats = self.messages, self.calls, self.stats
+        self.__init__(**self._settings(provider_config))
+        self.messages, self.calls, self.stats = messages, calls, stats
+
+    def _pick(self, prompt: str) -> str:
+        # الرد المسجل أولاً إن احتوى الطلب على نصه المطابق
+        lowered = prompt.lower()
+        for recording in self.recordings:
+            if recording["match"] in lowered:
+                self.stats["replayed"] += 1
+                return recording["response"]
+        # نفس الطلب يعطي نفس الرد دائماً لتكون نتائج القياس قابلة للتكرار
+        self.stats["templated"] += 1
+        digest = hashlib.sha1(prompt.encode("utf-8")).digest()
+        return self.templates[digest[0] % len(self.templates)]
+
+    def _generation_time(self, text: str) -> float:
+        """زمن توليد الرد بعد أول رمز، بتقدير 4 أحرف لكل رمز"""
+        if not self.tokens_per_second:
+            return 0.0
+        return max(1, len(text) // 4) / self.tokens_per_second
+
+    def _should_fail(self) -> bool:
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            self.stats["failures"] += 1
+            return True
+        return False
+
+    def _fail(self):
+        if self.failure_mode == "hang":
+            time.sleep(self.hang_seconds)
+        raise MockLLMError("Injected mock LLM failure")
+
+    def chat(self, prompt: str, display: bool = False, stream: bool = False) -> Union[List[Dict], Iterator[Dict]]:
+        self.calls += 1
+        text = self._pick(prompt)
+        fail = self._should_fail()
+        self.messages.append({"role": "user", "type": "message", "content": prompt})
+        if stream:
+            return self._stream(text, fail)
+        time.sleep(self.latency + self._generation_time(text))
+        if fail:
+            self._fail()
+        reply = {"role": "assistant", "type": "message", "content": text}
+        self.messages.append(reply)
+        return [reply]
+
+    def _stream(self, text: str, fail: bool = False) -> Iterator[Dict]:
+        pieces = [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)] or [""]
+        if self.tokens_per_second:
+            # زمن أول رمز ثم معدل ثابت للرموز
+            time.sleep(self.latency)
+            delay = self._generation_time(text) / len(pieces)
+        else:
+            delay = self.latency / len(pieces)
+        # الفشل أثناء البث يقع بعد نصف الرد لاختبار مسار الإجراءات الجزئية
+        fail_at = len(pieces) // 2 if fail else None
+        for index, piece in enumerate(pieces):
+            if index == fail_at:
+                self._fail()
+            time.sleep(delay)
+            yield {"role": "assistant", "type": "message", "content": piece}
+        self.messages.append({"role": "assistant", "type": "message", "content": text})
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"calls": self.calls, **self.stats}
@@ -0,0 +1,171 @@
+# src/server/services/response_cache.py
+import copy
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from .intent_matcher import normalize_phrase
+
+logger = logging.getLogger(__name__)
+
+# الإعدادات الافتراضية للتخزين المؤقت
+DEFAULT_CACHE_CONFIG = {
+    "enabled": True,
+    "max_entries": 512,
+    "ttl": 3600,
+    "persist_path": None
+}
+
+class ResponseCache:
+    """تخزين مؤقت لنتائج النموذج مع إزالة LRU وانتهاء صلاحية TTL"""
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl: Optional[float] = 3600,
+        persist_path: Optional[str] = None,
+        enabled: bool = True
+    ):
+        self.enabled = enabled
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl
+        self.persist_path = persist_path
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0
+        }
+        if self.persist_path:
+            self.load()
+
+    @classmethod
+    def from_config(cls, ai_config: Optional[Dict] = None) -> "ResponseCache":
+        """إنشاء التخزين المؤقت من قسم cache في ملف التكوين"""
+        cache_config = dict(DEFAULT_CACHE_CONFIG)
+        cache_config.update((ai_config or {}).get("cache", {}))
+        return cls(
+            max_entries=cache_config.get("max_entries", 512),
+            ttl=cache_config.get("ttl", 3600),
+            persist_path=cache_config.get("persist_path"),
+            enabled=cache_config.get("enabled", True)
+        )
+
+    @staticmethod
+    def make_key(command: str, context: Optional[Dict], provider: str, model: str) -> str:
+        """مفتاح يجمع الأمر الموحد مع المنصة ونوع العميل والمزود والنموذج"""
+        context = context or {}
+        system_info = context.get("system_info") or {}
+        parts = [
+            normalize_phrase(command),
+            str(system_info.get("platform", "")),
+            str(context.get("mode", "")),
+            str(provider),
+            str(model)
+        ]
+        raw = json.dumps(parts, ensure_ascii=False)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """إرجاع نسخة من النتيجة المخزنة أو None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            if entry["expires_at"] is not None and entry["expires_at"] <= time.time():
+                del self._entries[key]
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return copy.deepcopy(entry["result"])
+
+    def set(self, key: str, result: Dict[str, Any]):
+        """تخزين نسخة من النتيجة مع إزالة الأقدم عند تجاوز الحد"""
+        if not self.enabled:
+            return
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = {"result": copy.deepcopy(result), "expires_at": expires_at}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def invalidate(self):
+        """مسح جميع النتائج المخزنة"""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self.stats["invalidations"] += 1
+        if self.persist_path:
+            self.save()
+        logger.info(f"🧹 Response cache invalidated ({count} entries)")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self) -> int:
+        """تحميل النتائج غير المنتهية من الملف"""
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return 0
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading response cache: {e}")
+            return 0
+
+        now = time.time()
+        with self._lock:
+            for key, entry in data.get("entries", []):
+                if entry.get("expires_at") is not None and entry["expires_at"] <= now:
+                    continue
+                self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        logger.info(f"📦 Loaded {len(self._entries)} cached responses from {self.persist_path}")
+        return len(self._entries)
+
+    def save(self) -> bool:
+        """حفظ النتائج في الملف بكتابة ذرية"""
+        if not self.persist_path:
+            return False
+        with self._lock:
+            data = {"entries": list(self._entries.items())}
+        directory = os.path.dirname(os.path.abspath(self.persist_path))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(prefix=".cache-", dir=directory)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, self.persist_path)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving response cache: {e}")
+            return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """عدادات الإصابة والإخفاق وحجم التخزين"""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hit_rate": round(self.stats["hits"] / lookups * 100, 2) if lookups else 0,
+            **self.stats
+        }
@@ -0,0 +1,185 @@
+# src/server/services/tracing.py
+import contextvars
+import itertools
+import json
+import logging
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List, Iterator
+
+try:
+    from ...common.logging_pipeline import attach_file_log
+except ImportError:
+    from common.logging_pipeline import attach_file_log
+
+logger = logging.getLogger(__name__)
+
+# الإعدادات الافتراضية للتتبع
+DEFAULT_TRACING_CONFIG = {
+    "enabled": True,
+    "keep": 200,
+    "log_path": "logs/trace.log"
+}
+
+# التتبع الحالي للطلب؛ ينتقل تلقائياً عبر await والمهام المنشأة منه
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("current_trace", default=None)
+
+_trace_ids = itertools.count(1)
+
+class Span:
+    """مرحلة واحدة داخل التتبع"""
+    __slots__ = ("name", "start", "duration", "attrs")
+
+    def __init__(self, name: str, start: float, attrs: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.start = start
+        self.duration = 0.0
+        self.attrs = attrs
+
+class Trace:
+    """مراحل معالجة أمر واحد مع أزمنتها"""
+
+    def __init__(self, name: str, attrs: Optional[Dict[str, Any]] = None):
+        self.trace_id = next(_trace_ids)
+        self.name = name
+        self.attrs = attrs or {}
+        self.start = time.perf_counter()
+        self.wall_start = time.time()
+        self.duration = 0.0
+        self.spans: List[Span] = []
+
+    def finish(self):
+        # أول استدعاء فقط، حتى تتطابق الأزمنة في النتيجة وفي سجل التتبع
+        if not self.duration:
+            self.duration = time.perf_counter() - self.start
+
+    def timings(self) -> Dict[str, float]:
+        """أزمنة المراحل بالمللي ثانية (المراحل المتكررة تُجمع)"""
+        timings: Dict[str, float] = {}
+        for span in self.spans:
+            timings[span.name] = timings.get(span.name, 0.0) + span.duration
+        result = {name: round(duration * 1000, 3) for name, duration in timings.items()}
+        result["total"] = round(self.duration * 1000, 3)
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.wall_start,
+            "attrs": self.attrs,
+            "timings": self.timings(),
+            "spans": [
+                {
+                    "name": span.name,
+                    "offset_ms": round((span.start - self.start) * 1000, 3),
+                    "duration_ms": round(span.duration * 1000, 3),
+                    **({"attrs": span.attrs} if span.attrs else {})
+                }
+                for span in self.spans
+            ]
+        }
+
+    def chrome_events(self, pid: int = 1) -> List[Dict[str, Any]]:
+        """أحداث Chrome trace من النوع X (مدة كاملة)، كل أمر في مسار مستقل"""
+        events = [{
+            "name": self.name, "cat": "command", "ph": "X", "pid": pid, "tid": self.trace_id,
+            "ts": round(self.start * 1e6, 3), "dur": round(self.duration * 1e6, 3),
+            "args": self.attrs
+        }]
+        for span in self.spans:
+            events.append({
+                "name": span.name, "cat": "stage", "ph": "X", "pid": pid, "tid": self.trace_id,
+                "ts": round(span.start * 1e6, 3), "dur": round(span.duration * 1e6, 3),
+                "args": span.attrs or {}
+            })
+        return events
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Span]:
+    """قياس مرحلة وإضافتها للتتبع الحالي إن وجد (الكلفة قياسان للوقت فقط)"""
+    current = Span(name, time.perf_counter(), attrs or None)
+    try:
+        yield current
+    finally:
+        current.duration = time.perf_counter() - current.start
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.spans.append(current)
+
+def record_span(name: str, start: float, duration: Optional[float] = None, **attrs):
+    """إضافة مرحلة بدأت عند start (من perf_counter) عندما لا تناسبها كتلة with"""
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    recorded = Span(name, start, attrs or None)
+    recorded.duration = time.perf_counter() - start if duration is None else duration
+    trace.spans.append(recorded)
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+class TraceRecorder:
+    """حفظ آخر التتبعات في الذاكرة وكتابتها في سجل التتبع"""
+
+    def __init__(self, enabled: bool = True, keep: int = 200, log_path: Optional[str] = None):
+        self.enabled = enabled
+        self.keep = max(1, int(keep))
+        self.log_path = log_path
+        self._traces: deque = deque(maxlen=self.keep)
+        self._trace_logger: Optional[logging.Logger] = None
+        if self.enabled and self.log_path:
+            self._trace_logger = _open_trace_log(self.log_path)
+
+    @classmethod
+    def from_config(cls, ai_config: Optional[Dict] = None) -> "TraceRecorder":
+        """إنشاء المسجل من قسم tracing في ملف التكوين"""
+        tracing = dict(DEFAULT_TRACING_CONFIG)
+        tracing.update((ai_config or {}).get("tracing", {}))
+        return cls(
+            enabled=tracing.get("enabled", True),
+            keep=tracing.get("keep", 200),
+            log_path=tracing.get("log_path")
+        )
+
+    @contextmanager
+    def trace(self, name: str, **attrs) -> Iterator[Optional[Trace]]:
+        """بدء تتبع جديد وجعله التتبع الحالي حتى نهاية الكتلة"""
+        if not self.enabled:
+            yield None
+            return
+        trace = Trace(name, attrs)
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        finally:
+            _current_trace.reset(token)
+            trace.finish()
+            self._traces.append(trace)
+            if self._trace_logger is not None:
+                self._trace_logger.info(json.dumps(trace.to_dict(), ensure_ascii=False, default=str))
+
+    def recent(self, limit: int = 50) -> List[Trace]:
+        return list(self._traces)[-limit:] if limit > 0 else []
+
+    def chrome_trace(self, limit: int = 50) -> Dict[str, Any]:
+        """ملف بصيغة Chrome trace-event يمكن فتحه في chrome://tracing أو Perfetto"""
+        events: List[Dict[str, Any]] = [{
+            "name": "process_name", "ph": "M", "pid": 1, "args": {"name": "AI Control Server"}
+        }]
+        for trace in self.recent(limit):
+            events.extend(trace.chrome_events())
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "kept": len(self._traces), "keep": self.keep, "log_path": self.log_path}
+
+def _open_trace_log(log_path: str) -> logging.Logger:
+    """مسجل مستقل لسطور التتبع يُكتب عبر طابور خط التسجيل"""
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+    except OSError as e:
+        logger.warning(f"Cannot create trace log directory: {e}")
+    return attach_file_log("ai_control.trace", log_path)
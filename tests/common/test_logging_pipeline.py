@@ -0,0 +1,59 @@
+import json
+import logging
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from common.logging_pipeline import (
+    JsonFormatter, SamplingFilter, SizeAndTimeRotatingFileHandler,
+    setup_logging_pipeline, stop_logging_pipeline
+)
+
+def make_record(name, message, level=logging.INFO):
+    return logging.LogRecord(name, level, __file__, 1, message, None, None)
+
+def test_sampling_keeps_one_in_n_for_matching_logger():
+    sampler = SamplingFilter([{"logger": "client.main", "contains": "Received message", "every": 3}])
+    kept = [sampler.filter(make_record("src.client.main", f"Received message of type: {i}")) for i in range(6)]
+    assert kept == [True, False, False, True, False, False]
+    # Other loggers, other messages and warnings are never sampled
+    assert sampler.filter(make_record("src.server.main", "Received message of type: x"))
+    assert sampler.filter(make_record("src.client.main", "Connected"))
+    assert sampler.filter(make_record("src.client.main", "Received message of type: x", logging.WARNING))
+
+def test_json_formatter_outputs_one_object_per_record():
+    line = JsonFormatter().format(make_record("server", "مرحبا %s", logging.INFO))
+    payload = json.loads(line)
+    assert payload["logger"] == "server"
+    assert payload["level"] == "INFO"
+
+def test_size_rotation_keeps_previous_file(tmp_path):
+    path = str(tmp_path / "server.log")
+    handler = SizeAndTimeRotatingFileHandler(path, max_bytes=200, when="midnight", backupCount=3, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    for i in range(10):
+        handler.emit(make_record("server", "x" * 50))
+    handler.close()
+    rotated = [name for name in os.listdir(tmp_path) if name != "server.log"]
+    assert rotated
+    assert os.path.getsize(path) < 200
+
+def test_pipeline_writes_through_background_listener(tmp_path):
+    path = str(tmp_path / "logs" / "app.log")
+    root = logging.getLogger()
+    previous_handlers, previous_level = list(root.handlers), root.level
+    try:
+        setup_logging_pipeline(path, {"console": False, "format": "json"})
+        logging.getLogger("pipeline.test").info("hello %s", "world")
+        stop_logging_pipeline()
+        with open(path, encoding="utf-8") as f:
+            assert json.loads(f.readline())["message"] == "hello world"
+    finally:
+        stop_logging_pipeline()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in previous_handlers:
+            root.addHandler(handler)
+        root.setLevel(previous_level)
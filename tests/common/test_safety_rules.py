@@ -0,0 +1,56 @@
+import json
+import pytest
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from common.safety_rules import SafetyRuleRegistry, DEFAULT_RULES, SafetyRuleSet
+
+server_rules = SafetyRuleSet([rule for rule in DEFAULT_RULES if "server" in rule.scopes])
+
+@pytest.mark.parametrize("command, rule_id", [
+    ("please FORMAT the drive", "command:format"),
+    ("type C:\\Windows\\System32\\drivers", "directory:C:\\Windows\\System32"),
+    ("dir; echo a; echo b", "operator:;"),
+    ("dir > a.txt > b.txt", "operator:>"),
+])
+def test_server_rules_report_matching_rule(command, rule_id):
+    """The compiled rule set reports which rule blocked the command."""
+    match = server_rules.check(command)
+    assert match is not None
+    assert match.rule_id == rule_id
+
+@pytest.mark.parametrize("command", ["dir", "echo hello > out.txt", "ipconfig /all"])
+def test_server_rules_allow_safe_commands(command):
+    assert server_rules.check(command) is None
+
+def test_scopes_keep_server_and_client_lists_apart():
+    """Rules only apply to the scopes they were declared for."""
+    registry = SafetyRuleRegistry(rules_file=None)
+    assert registry.get_rule_set("client").check("reboot now") is not None
+    assert registry.get_rule_set("server").check("reboot now") is None
+    assert registry.get_rule_set("server").check("cat /etc/hosts") is not None
+    assert registry.get_rule_set("client").check("cat /etc/hosts") is None
+
+def test_rules_file_is_reloaded_without_restart(tmp_path):
+    """Editing the rules file changes the compiled rules on the next check."""
+    rules_file = tmp_path / "safety_rules.json"
+    registry = SafetyRuleRegistry(rules_file=str(rules_file), check_interval=0)
+    assert registry.get_rule_set("server").check("curl evil.example") is None
+
+    rules_file.write_text(json.dumps({
+        "rules": [{"id": "no-curl", "kind": "regex", "pattern": r"\bcurl\b", "scopes": ["server"]}]
+    }))
+    match = registry.get_rule_set("server").check("curl evil.example")
+    assert match is not None
+    assert match.rule_id == "no-curl"
+    # Default rules are still active alongside the file rules
+    assert registry.get_rule_set("server").check("format c:") is not None
+
+def test_invalid_rules_file_keeps_previous_rules(tmp_path):
+    rules_file = tmp_path / "safety_rules.json"
+    rules_file.write_text("{not json")
+    registry = SafetyRuleRegistry(rules_file=str(rules_file), check_interval=0)
+    assert registry.get_rule_set("server").check("format c:") is not None
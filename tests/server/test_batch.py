@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from server.core.batch import BatchProcessor, BatchTooLargeError
+
+def test_results_keep_input_order_and_respect_concurrency_limit():
+    processor = BatchProcessor(max_concurrent=2)
+    running = 0
+    peak = 0
+    arrived = []
+
+    async def process(item):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        # Later items finish first
+        await asyncio.sleep(0.01 * (5 - int(item)))
+        running -= 1
+        return {"value": item}
+
+    async def on_result(index, result):
+        arrived.append(index)
+
+    results = asyncio.run(processor.run(["0", "1", "2", "3", "4"], process, on_result=on_result))
+    assert [result["value"] for result in results] == ["0", "1", "2", "3", "4"]
+    assert peak == 2
+    assert sorted(arrived) == [0, 1, 2, 3, 4]
+    assert arrived != [0, 1, 2, 3, 4]
+
+def test_duplicate_items_are_processed_once():
+    processor = BatchProcessor()
+    calls = []
+
+    async def process(item):
+        calls.append(item)
+        await asyncio.sleep(0.01)
+        return {"command": item}
+
+    results = asyncio.run(processor.run(["a", "b", "a", "A"], process, key=str.lower))
+    assert sorted(calls) == ["a", "b"]
+    assert [result["command"] for result in results] == ["a", "b", "a", "a"]
+    assert "deduplicated" not in results[0]
+    assert results[2]["deduplicated"] and results[3]["deduplicated"]
+    assert processor.get_stats()["deduplicated"] == 2
+
+def test_validate_rejects_empty_oversized_and_invalid_batches():
+    processor = BatchProcessor.from_config({"batch": {"max_commands": 2}})
+    with pytest.raises(BatchTooLargeError):
+        processor.validate(["a", "b", "c"])
+    with pytest.raises(ValueError):
+        processor.validate([])
+    for invalid in (["a", 3], [{"command": 5}], [{"context": {}}], ["  "]):
+        with pytest.raises(ValueError):
+            processor.validate(invalid)
+    processor.validate(["a", {"command": "b"}])
@@ -0,0 +1,132 @@
+import asyncio
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from server.core.broadcaster import Broadcaster
+
+class FakeWebSocket:
+    """WebSocket stand-in that records frames and can be stalled."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.frames = []
+        self.closed_with = None
+
+    async def send_text(self, payload):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.frames.append(payload)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+def test_broadcast_serializes_once_and_slow_client_does_not_delay_others():
+    async def scenario():
+        broadcaster = Broadcaster(queue_size=8)
+        fast, slow = FakeWebSocket(), FakeWebSocket(delay=0.5)
+        broadcaster.register(1, fast)
+        broadcaster.register(2, slow)
+        delivered = await broadcaster.broadcast({"type": "note", "text": "مرحبا"})
+        await asyncio.sleep(0.05)
+        frames = (list(fast.frames), list(slow.frames))
+        await broadcaster.close_all()
+        return delivered, frames
+
+    delivered, (fast_frames, slow_frames) = asyncio.run(scenario())
+    assert delivered == 2
+    assert fast_frames == ['{"type": "note", "text": "مرحبا"}']
+    assert slow_frames == []
+
+def test_drop_oldest_keeps_latest_messages():
+    async def scenario():
+        broadcaster = Broadcaster(queue_size=2, overflow_policy="drop_oldest")
+        stalled = FakeWebSocket(delay=10)
+        channel = broadcaster.register(1, stalled)
+        await asyncio.sleep(0)
+        for i in range(5):
+            await broadcaster.broadcast({"n": i})
+        queued = [payload for _, payload, _ in list(channel.queue)]
+        stats = channel.get_stats()
+        await broadcaster.close_all()
+        return queued, stats
+
+    queued, stats = asyncio.run(scenario())
+    assert queued == ['{"n": 3}', '{"n": 4}']
+    assert stats["dropped"] == 3
+
+def test_drop_oldest_never_drops_direct_replies():
+    async def scenario(queue_size, replies, broadcasts):
+        broadcaster = Broadcaster(queue_size=queue_size, overflow_policy="drop_oldest")
+        channel = broadcaster.register(1, FakeWebSocket(delay=10))
+        # The writer is stuck sending this frame, the rest stay queued
+        await broadcaster.send(1, {"type": "connection_established"})
+        await asyncio.sleep(0.01)
+        for reply in replies:
+            await broadcaster.send(1, {"type": reply})
+        delivered = [await broadcaster.broadcast({"n": i}) for i in range(broadcasts)]
+        queued = [payload for _, payload, _ in list(channel.queue)]
+        dropped = channel.get_stats()["dropped"]
+        await broadcaster.close_all()
+        return delivered, queued, dropped
+
+    delivered, queued, dropped = asyncio.run(scenario(3, ["command_partial", "command_result"], 3))
+    assert delivered == [1, 1, 1]
+    assert queued == ['{"type": "command_partial"}', '{"type": "command_result"}', '{"n": 2}']
+    assert dropped == 2
+
+    # Only direct replies are queued: the new broadcast itself is dropped
+    delivered, queued, dropped = asyncio.run(scenario(2, ["command_result", "busy"], 1))
+    assert delivered == [0]
+    assert queued == ['{"type": "command_result"}', '{"type": "busy"}']
+    assert dropped == 1
+
+def test_direct_reply_waits_for_space_in_order():
+    async def scenario():
+        broadcaster = Broadcaster(queue_size=1, send_timeout=1)
+        websocket = FakeWebSocket(delay=0.05)
+        broadcaster.register(1, websocket)
+        sent = [await broadcaster.send(1, {"n": i}) for i in range(4)]
+        await asyncio.sleep(0.3)
+        await broadcaster.close_all()
+        return sent, websocket.frames
+
+    sent, frames = asyncio.run(scenario())
+    assert sent == [True] * 4
+    assert frames == ['{"n": 0}', '{"n": 1}', '{"n": 2}', '{"n": 3}']
+
+def test_disconnect_policy_removes_lagging_client():
+    disconnected = []
+
+    async def scenario():
+        broadcaster = Broadcaster(queue_size=1, overflow_policy="disconnect", on_disconnect=disconnected.append)
+        stalled = FakeWebSocket(delay=10)
+        broadcaster.register(7, stalled)
+        await asyncio.sleep(0)
+        for i in range(3):
+            await broadcaster.broadcast({"n": i})
+        await asyncio.sleep(0.01)
+        return broadcaster, stalled
+
+    broadcaster, stalled = asyncio.run(scenario())
+    assert disconnected == [7]
+    assert 7 not in broadcaster.channels
+    assert stalled.closed_with == 1013
+    assert broadcaster.get_stats()["disconnects"] == 1
+
+def test_per_client_lag_metrics():
+    async def scenario():
+        broadcaster = Broadcaster()
+        broadcaster.register(1, FakeWebSocket(delay=0.02))
+        await broadcaster.send(1, {"type": "pong"})
+        await asyncio.sleep(0.05)
+        stats = broadcaster.get_stats()
+        await broadcaster.close_all()
+        return stats
+
+    stats = asyncio.run(scenario())
+    client = stats["per_client"]["1"]
+    assert client["sent"] == 1
+    assert client["max_lag_ms"] >= 15
@@ -0,0 +1,96 @@
+import asyncio
+import json
+import os
+import pytest
+import sys
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from server.config import ConfigService, DEFAULT_AI_CONFIG, load_ai_config, get_config_service
+
+def write_config(path, data, mtime=None):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    if mtime is not None:
+        # Make the change visible even on filesystems with coarse mtime resolution
+        os.utime(path, (mtime, mtime))
+
+def test_missing_file_is_created_from_defaults(tmp_path):
+    path = tmp_path / "ai_models_config.json"
+    service = ConfigService(str(path))
+
+    assert json.loads(path.read_text(encoding="utf-8")) == DEFAULT_AI_CONFIG
+    assert service.mutable_copy() == DEFAULT_AI_CONFIG
+    assert not list(tmp_path.glob("*.tmp"))
+
+def test_snapshot_is_parsed_once_and_immutable(tmp_path):
+    path = tmp_path / "ai_models_config.json"
+    write_config(path, {"default_provider": "mock", "providers": {"mock": {"models": ["a"]}}})
+    service = ConfigService(str(path))
+
+    snapshot = service.snapshot
+    assert not service.reload_if_changed()
+    assert service.snapshot is snapshot
+    with pytest.raises(TypeError):
+        snapshot["default_provider"] = "openai"
+    with pytest.raises(TypeError):
+        snapshot["providers"]["mock"]["enabled"] = True
+    assert snapshot["providers"]["mock"]["models"] == ("a",)
+
+    # Mutable copies never leak into the shared snapshot
+    copy = service.mutable_copy()
+    copy["providers"]["mock"]["models"].append("b")
+    assert service.snapshot["providers"]["mock"]["models"] == ("a",)
+
+def test_changed_file_swaps_snapshot_and_notifies(tmp_path):
+    path = tmp_path / "ai_models_config.json"
+    write_config(path, {"default_provider": "mock"}, mtime=1_000_000)
+    service = ConfigService(str(path))
+    changes = []
+
+    async def listener(old, new):
+        changes.append((old["default_provider"], new["default_provider"]))
+
+    async def scenario():
+        service.subscribe(listener)
+        write_config(path, {"default_provider": "ollama"}, mtime=1_000_010)
+        assert await service.check()
+        assert not await service.check()
+
+    asyncio.run(scenario())
+    assert changes == [("mock", "ollama")]
+    assert service.snapshot["default_provider"] == "ollama"
+    assert service.get_stats()["reloads"] == 1
+
+def test_broken_file_keeps_previous_snapshot(tmp_path):
+    path = tmp_path / "ai_models_config.json"
+    write_config(path, {"default_provider": "mock"}, mtime=1_000_000)
+    service = ConfigService(str(path))
+
+    path.write_text('{"default_provider": ', encoding="utf-8")
+    os.utime(path, (1_000_010, 1_000_010))
+    assert not service.reload_if_changed()
+    assert service.snapshot["default_provider"] == "mock"
+    assert service.get_stats()["errors"] == 1
+
+def test_update_writes_atomically_without_notifying(tmp_path):
+    path = tmp_path / "ai_models_config.json"
+    write_config(path, {"default_provider": "mock", "providers": {"mock": {}}})
+    service = ConfigService(str(path))
+    service.subscribe(lambda old, new: pytest.fail("own writes are not reloads"))
+
+    def select(config):
+        config["providers"]["mock"]["default_model"] = "mock-coder"
+    snapshot = service.update(select)
+
+    assert snapshot["providers"]["mock"]["default_model"] == "mock-coder"
+    assert json.loads(path.read_text(encoding="utf-8"))["providers"]["mock"]["default_model"] == "mock-coder"
+    assert not list(tmp_path.glob("*.tmp"))
+    assert not asyncio.run(service.check())
+
+def test_load_ai_config_returns_a_mutable_copy(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = load_ai_config()
+    config["default_provider"] = "changed"
+    assert get_config_service().snapshot["default_provider"] == DEFAULT_AI_CONFIG["default_provider"]
@@ -0,0 +1,251 @@
+import asyncio
+import json
+import pytest
+import sys
+import os
+import threading
+import time
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from server.core.controller import AIController
+from server.services.interpreter_pool import InterpreterPool
+from server.services.interpreter import process_basic_command
+
+class CountingInterpreter:
+    """Interpreter stand-in that records how many times chat was called."""
+    calls = 0
+    lock = threading.Lock()
+
+    def __init__(self, delay=0.1):
+        self.messages = []
+        self.delay = delay
+
+    def chat(self, prompt, display=False, stream=False):
+        with CountingInterpreter.lock:
+            CountingInterpreter.calls += 1
+        if stream:
+            return self._stream()
+        time.sleep(self.delay)
+        return "```cmd\ndir\n```"
+
+    def _stream(self):
+        for piece in ["Here:\n```cmd\ndi", "r\n```\n", "```python\nprint(1)\n```"]:
+            time.sleep(self.delay / 3)
+            yield {"role": "assistant", "type": "message", "content": piece}
+
+@pytest.fixture
+def controller(tmp_path, monkeypatch):
+    # The controller reads and writes ai_models_config.json in the working directory
+    monkeypatch.chdir(tmp_path)
+    CountingInterpreter.calls = 0
+    pool = InterpreterPool(factory=CountingInterpreter, size=4)
+    instance = AIController(interpreter_pool=pool)
+    yield instance
+    asyncio.run(instance.shutdown())
+
+def test_identical_concurrent_commands_share_one_llm_call(controller):
+    """Concurrent identical commands are coalesced into a single interpreter call."""
+    async def scenario():
+        contexts = [{"mode": "auto", "client": i} for i in range(5)]
+        return await asyncio.gather(*(controller.process_command("list my files", ctx) for ctx in contexts))
+
+    results = asyncio.run(scenario())
+    assert CountingInterpreter.calls == 1
+    assert sum(1 for result in results if result.get("coalesced")) == 4
+    # Each caller still receives its own envelope
+    assert [result["client_context"]["client"] for result in results] == list(range(5))
+    assert len({id(result["actions"]) for result in results}) == 5
+
+def test_repeated_command_is_served_from_cache(controller):
+    async def scenario():
+        first = await controller.process_command("list my files")
+        second = await controller.process_command("List my  files")
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert CountingInterpreter.calls == 1
+    assert second.get("cache_hit") is True
+    assert second["actions"] == first["actions"]
+
+def test_dangerous_command_reports_rule(controller):
+    result = asyncio.run(controller.process_command("format c:"))
+    assert result["safety_block"] is True
+    assert result["safety_rule"] == "command:format"
+    assert CountingInterpreter.calls == 0
+
+def test_streaming_sends_actions_before_result(controller):
+    """With on_partial, each action is emitted as soon as its code block closes."""
+    events = []
+
+    async def on_partial(event):
+        events.append(event)
+
+    result = asyncio.run(controller.process_command("stream my files", on_partial=on_partial))
+    streamed = [event["action"] for event in events if "action" in event]
+    assert streamed == result["actions"]
+    assert result["streamed_actions"] == 2
+    assert any("delta" in event for event in events)
+
+def test_result_carries_stage_timings(controller):
+    result = asyncio.run(controller.process_command("list my files"))
+    timings = result["timings"]
+    for stage in ("safety_check", "cache_lookup", "pool_acquire", "prompt_build", "llm", "extraction", "total"):
+        assert stage in timings
+    assert timings["llm"] >= 90
+    assert controller.tracer.recent(1)[0].trace_id == result["trace_id"]
+
+def test_commands_before_interpreter_is_ready_follow_pending_policy(tmp_path, monkeypatch):
+    """Basic policy answers immediately while loading; queue policy waits for the pool."""
+    monkeypatch.chdir(tmp_path)
+    from server.services.interpreter_loader import InterpreterLoader
+
+    async def scenario(policy):
+        loader = InterpreterLoader(
+            {"default_provider": "mock", "providers": {"mock": {"enabled": True, "latency": 0}}, "pool": {"size": 1}},
+            pending_policy=policy
+        )
+        instance = AIController(interpreter_loader=loader)
+        try:
+            # Startup hands the load to a background task and returns right away
+            await instance.startup()
+            assert instance.interpreter_state == "loading"
+            return await instance.process_command("list my files")
+        finally:
+            await instance.shutdown()
+
+    basic = asyncio.run(scenario("basic"))
+    assert basic["fallback_reason"] == "interpreter_loading"
+    queued = asyncio.run(scenario("queue"))
+    assert queued["method"] == "interpreter"
+    assert "interpreter_wait" in queued["timings"]
+
+def test_external_config_change_is_applied_without_restart(controller):
+    """Editing ai_models_config.json reconfigures the controller on the next watcher check."""
+    service = controller.config_service
+
+    async def scenario():
+        await controller.startup()
+        config = service.mutable_copy()
+        provider = config["default_provider"]
+        config["providers"][provider]["default_model"] = "edited-model"
+        config["command_mappings"] = {"open the vault": "vault.exe"}
+        with open(service.path, "w", encoding="utf-8") as f:
+            json.dump(config, f)
+        stat = os.stat(service.path)
+        os.utime(service.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert await service.check()
+
+    asyncio.run(scenario())
+    assert controller.ai_config["providers"][controller.stats["active_provider"]]["default_model"] == "edited-model"
+    assert controller.stats["active_model"] == "edited-model"
+    assert process_basic_command("open the vault")["actions"][0]["code"] == "vault.exe"
+
+def test_router_routes_commands_once_routes_are_built(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from server.services.interpreter_loader import InterpreterLoader
+
+    config = {
+        "default_provider": "mock",
+        "providers": {"mock": {"enabled": True, "default_model": "mock-coder", "latency": 0}},
+        "pool": {"size": 1},
+        "routing": {"enabled": True, "routes": ["mock/mock-coder", "mock/mock-backup"]}
+    }
+    with open("ai_models_config.json", "w", encoding="utf-8") as f:
+        json.dump(config, f)
+
+    async def scenario():
+        instance = AIController(interpreter_loader=InterpreterLoader(config, lazy=False))
+        try:
+            await instance.startup()
+            await instance._router_task
+            return instance.router, await instance.process_command("list my files")
+        finally:
+            await instance.shutdown()
+
+    router, result = asyncio.run(scenario())
+    assert router.active
+    assert result["method"] == "interpreter"
+    assert (result["provider"], result["model"]) in {("mock", "mock-coder"), ("mock", "mock-backup")}
+    # The result names the route that answered
+    answered = [route for route in router.routes if route.stats["requests"]]
+    assert [route.model for route in answered] == [result["model"]]
+
+@pytest.mark.parametrize("policy", ["cancel", "refresh"])
+def test_confident_basic_match_answers_without_waiting_for_llm(tmp_path, monkeypatch, policy):
+    monkeypatch.chdir(tmp_path)
+    with open("ai_models_config.json", "w", encoding="utf-8") as f:
+        json.dump({"speculation": {"enabled": True, "llm_policy": policy}}, f)
+    CountingInterpreter.calls = 0
+    instance = AIController(interpreter_pool=InterpreterPool(factory=lambda: CountingInterpreter(delay=0.3), size=1))
+
+    async def scenario():
+        started = time.perf_counter()
+        fast = await instance.process_command("please open notepad")
+        elapsed = time.perf_counter() - started
+        # A command the matcher only partly covers still goes to the LLM
+        slow = await instance.process_command("open notepad and write a poem about cats")
+        await asyncio.sleep(0.4)
+        again = await instance.process_command("please open notepad")
+        await instance.shutdown()
+        return fast, elapsed, slow, again
+
+    fast, elapsed, slow, again = asyncio.run(scenario())
+    assert fast["speculative"] and fast["actions"][0]["code"] == "notepad"
+    assert elapsed < 0.2
+    assert slow["method"] == "interpreter"
+    if policy == "cancel":
+        assert CountingInterpreter.calls == 1
+        assert again["speculative"]
+    else:
+        # The background LLM answer refreshed the cache for the next identical command
+        assert CountingInterpreter.calls == 2
+        assert again["cache_hit"] and again["method"] == "interpreter"
+
+def test_streamed_speculative_actions_are_not_repeated_in_result(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open("ai_models_config.json", "w", encoding="utf-8") as f:
+        json.dump({"speculation": {"enabled": True, "llm_policy": "cancel"}}, f)
+    instance = AIController(interpreter_pool=InterpreterPool(factory=CountingInterpreter, size=1))
+    events = []
+
+    async def on_partial(event):
+        events.append(event)
+
+    async def scenario():
+        result = await instance.process_command("open notepad", on_partial=on_partial)
+        await instance.shutdown()
+        return result
+
+    result = asyncio.run(scenario())
+    assert result["speculative"]
+    # The client skips the first streamed_actions actions of the final result
+    assert [event["action"] for event in events] == result["actions"]
+    assert result["streamed_actions"] == len(result["actions"]) == 1
+
+def test_submitted_server_commands_run_as_special_priority(controller):
+    async def scenario():
+        special = await controller.submit_command("server:models", client_id="admin")
+        regular = await controller.submit_command("list my files", client_id="script")
+        return special, regular
+
+    special, regular = asyncio.run(scenario())
+    assert special["special_command"] and special["priority"] == "special"
+    assert regular["priority"] == "rest" and regular["queue_time"] == 0.0
+    assert controller.scheduler.get_stats()["by_priority"]["special"] == 1
+
+def test_batch_runs_at_batch_priority_in_order_with_duplicates_shared(controller):
+    commands = ["list my files", {"command": "server:models"}, "list my files"]
+    arrived = []
+
+    async def on_result(index, result):
+        arrived.append(index)
+
+    results = asyncio.run(controller.process_batch(commands, client_id="script", on_result=on_result))
+    assert CountingInterpreter.calls == 1
+    assert results[1]["special_command"] and results[1]["priority"] == "special"
+    assert results[0]["priority"] == "batch" and results[2]["deduplicated"]
+    assert results[2]["actions"] == results[0]["actions"]
+    assert sorted(arrived) == [0, 1, 2]
+    assert controller.scheduler.get_stats()["by_priority"]["batch"] == 1
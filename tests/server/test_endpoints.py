@@ -0,0 +1,43 @@
+import asyncio
+import pytest
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from server.api.endpoints import register_endpoints
+from server.core.controller import AIController
+from server.services.interpreter_pool import InterpreterPool
+
+class FakeInterpreter:
+    def __init__(self):
+        self.messages = []
+
+    def chat(self, prompt, display=False, stream=False):
+        return "```cmd\ndir\n```"
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # The controller reads and writes ai_models_config.json in the working directory
+    monkeypatch.chdir(tmp_path)
+    controller = AIController(interpreter_pool=InterpreterPool(factory=FakeInterpreter, size=2))
+    app = FastAPI()
+    register_endpoints(app, controller)
+    with TestClient(app) as test_client:
+        yield test_client
+    asyncio.run(controller.shutdown())
+
+def test_batch_returns_results_in_order(client):
+    response = client.post("/process/batch", json={"commands": ["list my files", "open notepad", "list my files"]})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["priority"] for result in results] == ["batch", "batch", "batch"]
+    assert results[2]["deduplicated"]
+
+@pytest.mark.parametrize("body", [["open notepad"], "open notepad", {"commands": [{"command": 5}]}])
+def test_batch_rejects_malformed_bodies(client, body):
+    assert client.post("/process/batch", json=body).status_code == 400
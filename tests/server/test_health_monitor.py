@@ -0,0 +1,39 @@
+import asyncio
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from server.services.health_monitor import HealthMonitor
+
+def test_snapshot_before_first_sample_is_empty():
+    monitor = HealthMonitor()
+    snapshot = monitor.snapshot()
+    assert snapshot["status"] == "starting"
+    assert snapshot["sampled_at"] is None
+    assert monitor.provider_status("ollama") == "unknown"
+
+def test_unreachable_provider_is_reported_disconnected():
+    """A refused connection is recorded in the snapshot instead of raising."""
+    config = {"providers": {"ollama": {"enabled": True, "base_url": "http://127.0.0.1:9"}}}
+    monitor = HealthMonitor(config, interval=60, provider_timeout=1)
+
+    async def scenario():
+        await monitor.start()
+        try:
+            return await monitor.sample_once()
+        finally:
+            await monitor.stop()
+
+    snapshot = asyncio.run(scenario())
+    assert snapshot["status"] == "ok"
+    assert snapshot["providers"]["ollama"]["status"] == "disconnected"
+    assert snapshot["system"]["ollama"]["status"] == "not_running"
+    assert "cpu_percent" in snapshot["system"]
+    assert monitor.get_stats()["running"] is False
+
+def test_disabled_providers_are_not_probed():
+    config = {"providers": {"ollama": {"enabled": False}}}
+    snapshot = asyncio.run(HealthMonitor(config).sample_once())
+    assert snapshot["providers"] == {}
@@ -0,0 +1,103 @@
+import pytest
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from server.core.history import CommandHistory
+
+def make_entry(i, success=True):
+    return {
+        "timestamp": f"2024-01-01T00:00:{i:02d}",
+        "input": f"command {i}",
+        "output": {"success": success},
+        "provider": "ollama",
+        "model": "llama3",
+        "success": success,
+        "processing_time": 0.1
+    }
+
+def test_ring_buffer_keeps_capacity_and_ids_never_repeat():
+    history = CommandHistory(capacity=3)
+    for i in range(5):
+        history.append(make_entry(i))
+    assert [entry["id"] for entry in history.recent(10)] == [3, 4, 5]
+    assert len(history) == 5
+    history.clear()
+    assert history.append(make_entry(6))["id"] == 6
+
+def test_recent_filters_errors():
+    history = CommandHistory(capacity=5)
+    history.append(make_entry(0, success=False))
+    history.append(make_entry(1))
+    assert [entry["input"] for entry in history.recent(5, include_errors=False)] == ["command 1"]
+
+def test_journal_pages_past_the_ring_buffer_and_survives_restart(tmp_path):
+    path = str(tmp_path / "history.db")
+    history = CommandHistory(capacity=2, journal_path=path, flush_interval=0.01)
+    for i in range(6):
+        history.append(make_entry(i))
+
+    first = history.page(limit=3)
+    assert [entry["id"] for entry in first] == [6, 5, 4]
+    older = history.page(limit=3, before_id=first[-1]["id"])
+    assert [entry["id"] for entry in older] == [3, 2, 1]
+    history.close()
+
+    restored = CommandHistory(capacity=2, journal_path=path)
+    assert len(restored) == 6
+    assert [entry["id"] for entry in restored.recent(10)] == [5, 6]
+    assert restored.append(make_entry(7))["id"] == 7
+    restored.close()
+
+def test_memory_page_only_serves_pages_without_journal_reads(tmp_path):
+    history = CommandHistory(capacity=2, journal_path=str(tmp_path / "history.db"), flush_interval=0.01)
+    for i in range(3):
+        history.append(make_entry(i))
+    assert [entry["id"] for entry in history.memory_page(limit=2)] == [3, 2]
+    # Older entries live only in the journal
+    assert history.memory_page(limit=3) is None
+    history.close()
+
+    shared = CommandHistory(capacity=5, journal_path=str(tmp_path / "shared.db"), id_allocator=lambda start, count: start)
+    # Other workers' commands are only in the journal
+    assert shared.memory_page(limit=1) is None
+    shared.close()
+
+def test_clear_empties_journal(tmp_path):
+    path = str(tmp_path / "history.db")
+    history = CommandHistory(capacity=2, journal_path=path, flush_interval=0.01)
+    history.append(make_entry(0))
+    history.clear()
+    history.close()
+    restored = CommandHistory(capacity=2, journal_path=path)
+    assert len(restored) == 0
+    restored.close()
+
+def test_indexed_query_filters_and_cursor(tmp_path):
+    history = CommandHistory(capacity=2, journal_path=str(tmp_path / "history.db"), flush_interval=0.01)
+    for i in range(6):
+        entry = make_entry(i, success=i % 2 == 0)
+        entry["client_id"] = "a" if i < 3 else "b"
+        entry["processing_time"] = i
+        history.append(entry)
+
+    assert [entry["id"] for entry in history.query(client_id="a")] == [3, 2, 1]
+    assert [entry["id"] for entry in history.query(success=True, min_processing_time=2)] == [5, 3]
+    assert [entry["id"] for entry in history.query(since="2024-01-01T00:00:01", until="2024-01-01T00:00:03")] == [3, 2]
+    first = history.query(limit=2, provider="ollama")
+    assert [entry["id"] for entry in history.query(limit=2, before_id=first[-1]["id"], provider="ollama")] == [4, 3]
+    with pytest.raises(ValueError):
+        history.query(color="red")
+
+    exported = list(history.iter_export(batch_size=2, client_id="b"))
+    assert [entry["id"] for entry in exported] == [4, 5, 6]
+    history.close()
+
+def test_query_without_journal_filters_buffer():
+    history = CommandHistory(capacity=5)
+    history.append(make_entry(0, success=False))
+    history.append(make_entry(1))
+    assert [entry["id"] for entry in history.query(success=False)] == [1]
+    assert [entry["id"] for entry in history.iter_export(success=True)] == [2]
@@ -5,7 +5,10 @@ import os
 # Add the src directory to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
 
-from server.services.interpreter import process_basic_command
+from server.services.interpreter import (
+    process_basic_command, ConversationWindow, IncrementalCodeBlockExtractor, extract_code_blocks,
+    match_basic_command
+)
 
 # Test cases for the basic command mapping
 # Format: { "input_command": "expected_output_code" }
@@ -62,6 +65,16 @@ def test_dangerous_command_blocking(command):
     assert action['type'] == 'error'
     assert "Potentially dangerous command blocked" in action['code']
 
+def test_longest_phrase_wins():
+    """When several phrases match, the longest one is used regardless of table order."""
+    result = process_basic_command("open file explorer and then shutdown")
+    assert result['actions'][0]['code'] == 'explorer'
+
+def test_arabic_command_with_diacritics_and_alef_variants():
+    """Arabic phrases match after removing diacritics and unifying alef forms."""
+    result = process_basic_command("إفْتَح المتصفح من فضلك")
+    assert result['actions'][0]['code'] == 'start chrome'
+
 def test_unknown_command_is_passed_through():
     """Test that a command not in the map is passed through directly."""
     unknown_command = "this is a test command"
@@ -71,3 +84,66 @@ def test_unknown_command_is_passed_through():
     action = result['actions'][0]
     assert action['type'] == 'command'
     assert action['code'] == unknown_command
+
+class FakeInterpreter:
+    def __init__(self, messages):
+        self.messages = messages
+
+def make_turns(count, size=40):
+    messages = []
+    for i in range(count):
+        messages.append({"role": "user", "type": "message", "content": f"q{i}" + "x" * size})
+        messages.append({"role": "assistant", "type": "message", "content": f"a{i}" + "y" * size})
+    return messages
+
+def test_conversation_reset_policy_clears_history():
+    """The reset policy drops all previous messages before each request."""
+    interpreter = FakeInterpreter(make_turns(3))
+    ConversationWindow(policy="reset").apply(interpreter, "new prompt")
+    assert interpreter.messages == []
+
+def test_conversation_last_n_keeps_recent_turns():
+    """The last_n policy keeps only the most recent complete turns."""
+    interpreter = FakeInterpreter(make_turns(5))
+    window = ConversationWindow(policy="last_n", max_turns=2)
+    window.apply(interpreter, "new prompt")
+    assert len(interpreter.messages) == 4
+    assert interpreter.messages[0]["content"].startswith("q3")
+    assert window.get_stats()["trimmed_messages"] == 6
+
+def test_conversation_token_budget_limits_history():
+    """The token_budget policy keeps whole turns that fit within the budget."""
+    interpreter = FakeInterpreter(make_turns(5, size=396))
+    window = ConversationWindow(policy="token_budget", max_tokens=300)
+    info = window.apply(interpreter, "p" * 100)
+    assert len(interpreter.messages) == 2
+    assert info["prompt_tokens"] <= 300
+
+def test_incremental_extractor_matches_batch_extraction():
+    """Feeding a response in small pieces yields the same actions as extract_code_blocks."""
+    text = "Sure:\n```cmd\ndir\n```\nthen\n```python\nprint(1)\n```\nfinally ```powershell\nGet-Process"
+    extractor = IncrementalCodeBlockExtractor()
+    actions = []
+    for i in range(0, len(text), 3):
+        _, completed = extractor.feed(text[i:i + 3])
+        actions.extend(completed)
+    actions.extend(extractor.finish())
+    assert actions == extract_code_blocks(text)
+
+def test_incremental_extractor_emits_action_when_block_closes():
+    extractor = IncrementalCodeBlockExtractor()
+    assert extractor.feed("```cmd\ndir\n``")[1] == []
+    _, completed = extractor.feed("`\nmore text")
+    assert completed == [{'type': 'command', 'code': 'dir', 'language': 'cmd'}]
+
+@pytest.mark.parametrize("command, confident", [
+    ("open notepad", True),
+    ("can you open notepad for me", True),
+    ("افتح المفكرة من فضلك", True),
+    ("open notepad and write a poem about cats", False),
+    ("commute home", False),
+])
+def test_basic_match_confidence(command, confident):
+    """Only matches that cover the meaningful words of a command are confident."""
+    _, confidence = match_basic_command(command)
+    assert (confidence >= 0.75) == confident
@@ -0,0 +1,39 @@
+import asyncio
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from server.services.interpreter_loader import InterpreterLoader
+
+MOCK_CONFIG = {
+    "default_provider": "mock",
+    "providers": {"mock": {"enabled": True, "latency": 0}},
+    "pool": {"size": 2}
+}
+
+def test_loads_mock_pool_in_background_with_phase_timings():
+    loader = InterpreterLoader(MOCK_CONFIG)
+    attached = []
+
+    async def scenario():
+        loader.start(on_ready=attached.append)
+        assert loader.pending
+        assert await loader.wait_ready(timeout=5)
+
+    asyncio.run(scenario())
+    assert loader.state == "ready"
+    assert attached and attached[0].size == 2
+    assert set(loader.timings) >= {"interpreter_import", "pool_create", "warm_up", "interpreter_ready"}
+
+def test_missing_module_leaves_basic_mode():
+    config = dict(MOCK_CONFIG, default_provider="ollama", providers={"ollama": {"enabled": True}})
+    loader = InterpreterLoader(config, module_name="no_such_interpreter_module")
+
+    asyncio.run(loader.load())
+    assert loader.state == "unavailable"
+    assert not loader.pending
+
+def test_unknown_pending_policy_falls_back_to_basic():
+    assert InterpreterLoader.from_config({"startup": {"pending_policy": "drop"}}).pending_policy == "basic"
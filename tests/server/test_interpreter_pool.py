@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+import sys
+import os
+import threading
+import time
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from server.services.interpreter_pool import InterpreterPool, PoolExhaustedError
+from server.services.interpreter import process_with_interpreter
+from server.services.llm_engine import LLMExecutionEngine
+
+class FakeInterpreter:
+    def __init__(self):
+        self.messages = []
+
+    def chat(self, prompt, display=False):
+        return prompt
+
+def test_checkout_returns_distinct_instances():
+    """Concurrent checkouts get different isolated instances."""
+    pool = InterpreterPool(factory=FakeInterpreter, size=2)
+
+    async def scenario():
+        async with pool.acquire() as first, pool.acquire() as second:
+            return first.interpreter, second.interpreter
+
+    first, second = asyncio.run(scenario())
+    assert first is not second
+    assert pool.get_stats()["checkouts"] == 2
+
+def test_exhausted_pool_times_out():
+    """Acquiring from a fully checked-out pool fails after the timeout."""
+    pool = InterpreterPool(factory=FakeInterpreter, size=1)
+
+    async def scenario():
+        async with pool.acquire():
+            async with pool.acquire(timeout=0.05):
+                pass
+
+    with pytest.raises(PoolExhaustedError):
+        asyncio.run(scenario())
+
+def test_unhealthy_instance_is_replaced():
+    """An instance reaching max_failures is evicted and replaced by the factory."""
+    pool = InterpreterPool(factory=FakeInterpreter, size=1, max_failures=2)
+
+    async def scenario():
+        for _ in range(2):
+            async with pool.acquire() as member:
+                original = member.interpreter
+                member.mark_failed()
+        async with pool.acquire() as member:
+            return original, member.interpreter
+
+    original, replacement = asyncio.run(scenario())
+    assert original is not replacement
+    stats = pool.get_stats()
+    assert stats["evictions"] == 1
+    assert stats["replacements"] == 1
+    assert stats["size"] == 1
+
+def test_shared_instance_limits_pool_size():
+    """A factory that keeps returning the same object yields a pool of one."""
+    shared = FakeInterpreter()
+    pool = InterpreterPool(factory=lambda: shared, size=3)
+    assert pool.size == 1
+
+class SlowInterpreter:
+    """Records how many chat calls run on this instance at the same time."""
+    def __init__(self):
+        self.messages = []
+        self.running = 0
+        self.overlap = 0
+        self.lock = threading.Lock()
+
+    def chat(self, prompt, display=False):
+        with self.lock:
+            self.running += 1
+            self.overlap = max(self.overlap, self.running)
+        time.sleep(0.2)
+        with self.lock:
+            self.running -= 1
+        return "```cmd\ndir\n```"
+
+def test_timed_out_instance_is_held_until_its_call_finishes():
+    """The next command must not share an instance whose abandoned chat call is still running."""
+    pool = InterpreterPool(factory=SlowInterpreter, size=1)
+    engine = LLMExecutionEngine(max_concurrent=2, timeout=0.05)
+
+    async def command():
+        async with pool.acquire() as member:
+            return await process_with_interpreter(
+                member.interpreter, "list files", engine=engine, on_abandoned=member.hold
+            )
+
+    async def scenario():
+        timed_out = await command()
+        assert pool.get_stats()["held_now"] == 1
+        engine.timeout = 1
+        answered = await command()
+        return timed_out, answered
+
+    timed_out, answered = asyncio.run(scenario())
+    engine.shutdown(wait=True)
+    assert timed_out["fallback_reason"] == "timeout"
+    assert answered["method"] == "interpreter"
+    interpreter = pool.instances()[0]
+    assert interpreter.overlap == 1
+    stats = pool.get_stats()
+    assert stats["held"] == 1 and stats["held_now"] == 0
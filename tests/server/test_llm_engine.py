@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+import sys
+import os
+import time
+import threading
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from server.services.llm_engine import LLMExecutionEngine, LLMTimeoutError
+
+def slow_call(delay, value=None):
+    time.sleep(delay)
+    return value
+
+def test_run_does_not_block_event_loop():
+    """A slow blocking call must not stop other coroutines from running."""
+    engine = LLMExecutionEngine(max_concurrent=2, timeout=5)
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.time())
+            await asyncio.sleep(0.02)
+
+    async def scenario():
+        return await asyncio.gather(engine.run(slow_call, 0.2, "done"), ticker())
+
+    result, _ = asyncio.run(scenario())
+    engine.shutdown()
+    assert result == "done"
+    assert len(ticks) == 5
+
+def test_concurrency_is_capped():
+    """No more than max_concurrent calls run at the same time."""
+    engine = LLMExecutionEngine(max_concurrent=2, timeout=5)
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def tracked():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+
+    async def scenario():
+        await asyncio.gather(*(engine.run(tracked) for _ in range(6)))
+
+    asyncio.run(scenario())
+    engine.shutdown()
+    assert peak[0] == 2
+    assert engine.get_stats()["completed"] == 6
+
+def test_timeout_raises():
+    """Calls exceeding the timeout raise LLMTimeoutError."""
+    engine = LLMExecutionEngine(max_concurrent=1, timeout=0.05)
+
+    async def scenario():
+        await engine.run(slow_call, 0.3)
+
+    with pytest.raises(LLMTimeoutError):
+        asyncio.run(scenario())
+    engine.shutdown()
+    assert engine.get_stats()["timeouts"] == 1
+
+def test_cancellation_propagates():
+    """Cancelling the awaiting task cancels the call and is counted."""
+    engine = LLMExecutionEngine(max_concurrent=1, timeout=5)
+
+    async def scenario():
+        task = asyncio.ensure_future(engine.run(slow_call, 0.3))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    engine.shutdown()
+    assert engine.get_stats()["cancelled"] == 1
@@ -0,0 +1,59 @@
+import pytest
+import sys
+import os
+import timeit
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from server.services.metrics import MetricsRegistry, provider_labels, _Metric
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", ("method",), buckets=(0.1, 1.0))
+    child = latency.labels("basic_enhanced")
+    for value in (0.05, 0.1, 0.5, 3.0):
+        child.observe(value)
+    text = registry.render()
+    assert '# TYPE latency_seconds histogram' in text
+    assert 'latency_seconds_bucket{method="basic_enhanced",le="0.1"} 2' in text
+    assert 'latency_seconds_bucket{method="basic_enhanced",le="1"} 3' in text
+    assert 'latency_seconds_bucket{method="basic_enhanced",le="+Inf"} 4' in text
+    assert 'latency_seconds_count{method="basic_enhanced"} 4' in text
+    assert 'latency_seconds_sum{method="basic_enhanced"} 3.65' in text
+
+def test_counters_and_function_gauges():
+    registry = MetricsRegistry()
+    blocked = registry.counter("blocked", "Blocked", ("rule",))
+    blocked.labels("command:format").inc()
+    blocked.labels("command:format").inc()
+    depth = registry.gauge("queue_depth", "Depth", ("queue",))
+    depth.labels("llm").set_function(lambda: 3)
+    text = registry.render()
+    assert 'blocked_total{rule="command:format"} 2' in text
+    assert 'queue_depth{queue="llm"} 3' in text
+
+def test_label_count_is_checked():
+    registry = MetricsRegistry()
+    counter = registry.counter("c", "C", ("a", "b"))
+    with pytest.raises(ValueError):
+        counter.labels("only-one")
+
+def test_metric_without_sample_rendering_fails_on_creation():
+    class Incomplete(_Metric):
+        kind = "gauge"
+
+    with pytest.raises(TypeError):
+        Incomplete("incomplete", "Missing _render_samples")
+
+def test_recording_is_cheap():
+    """Observing a labelled histogram stays around a microsecond or less."""
+    histogram = MetricsRegistry().histogram("h", "H", ("provider", "model", "method"))
+    runs = 100000
+    elapsed = timeit.timeit(lambda: histogram.labels("ollama", "llama3", "interpreter").observe(0.42), number=runs)
+    assert elapsed / runs < 5e-6
+
+def test_provider_labels_from_config():
+    config = {"default_provider": "ollama", "providers": {"ollama": {"default_model": "llama3"}}}
+    assert provider_labels(config) == ("ollama", "llama3")
+    assert provider_labels({"default_provider": "basic"}) == ("basic", "basic_commands")
@@ -0,0 +1,71 @@
+import json
+import pytest
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from server.config import configure_interpreter
+from server.services.interpreter_pool import InterpreterPool
+from server.services.mock_llm import MockInterpreter, MockLLMError
+from server.services.interpreter import extract_commands_from_response
+
+def test_same_prompt_gives_same_response():
+    first, second = MockInterpreter(latency=0), MockInterpreter(latency=0)
+    assert first.chat("open chrome") == second.chat("open chrome")
+    assert extract_commands_from_response(first.chat("list files"))
+
+def test_stream_reassembles_to_full_response():
+    mock = MockInterpreter(latency=0)
+    full = mock.chat("list files")[0]["content"]
+    streamed = "".join(chunk["content"] for chunk in mock.chat("list files", stream=True))
+    assert streamed == full
+    # user + assistant message for each call
+    assert len(mock.messages) == 4
+
+def test_recorded_response_is_replayed(tmp_path):
+    recordings = tmp_path / "recordings.json"
+    recordings.write_text(json.dumps([{"match": "Open Notepad", "response": "```cmd\nnotepad\n```"}]), encoding="utf-8")
+    mock = MockInterpreter.from_config({"latency": 0, "recordings_path": str(recordings)})
+    assert mock.chat("please open notepad now")[0]["content"] == "```cmd\nnotepad\n```"
+    mock.chat("list files")
+    assert mock.get_stats() == {"calls": 2, "replayed": 1, "templated": 1, "failures": 0}
+
+def test_failure_injection_is_deterministic():
+    def outcomes():
+        mock = MockInterpreter(latency=0, failure_rate=0.5, seed=7)
+        results = []
+        for _ in range(20):
+            try:
+                mock.chat("list files")
+                results.append(True)
+            except MockLLMError:
+                results.append(False)
+        return results
+
+    first = outcomes()
+    assert first == outcomes()
+    assert True in first and False in first
+
+def test_stream_failure_happens_mid_response():
+    mock = MockInterpreter(latency=0, failure_rate=1.0, templates=["x" * 64])
+    chunks = []
+    with pytest.raises(MockLLMError):
+        for chunk in mock.chat("anything", stream=True):
+            chunks.append(chunk)
+    assert len(chunks) == 2
+
+def test_configure_interpreter_builds_mock_without_open_interpreter():
+    config = {
+        "default_provider": "mock",
+        "providers": {"mock": {"enabled": True, "latency": 0, "tokens_per_second": 1000}}
+    }
+    mock = configure_interpreter(None, config)
+    assert isinstance(mock, MockInterpreter)
+    assert mock.tokens_per_second == 1000
+    # Reconfiguring an existing mock keeps the same instance
+    assert configure_interpreter(mock, config) is mock
+
+    pool = InterpreterPool.from_config(None, dict(config, pool={"size": 2}))
+    assert pool.size == 2
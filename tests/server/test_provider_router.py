@@ -0,0 +1,107 @@
+import asyncio
+import time
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from server.services.interpreter import ProviderRouter
+from server.services.interpreter_pool import InterpreterPool
+from server.services.mock_llm import MockInterpreter
+
+def mock_pool(size=1, **settings):
+    return InterpreterPool.from_instances([MockInterpreter(**settings) for _ in range(size)])
+
+def run_commands(router, count):
+    async def scenario():
+        return [await router.process(f"list files {i}") for i in range(count)]
+    return asyncio.run(scenario())
+
+def test_requests_move_to_the_faster_route():
+    router = ProviderRouter(enabled=True)
+    router.add_route("mock", "slow", mock_pool(latency=0.1))
+    router.add_route("mock", "fast", mock_pool(latency=0.01))
+
+    results = run_commands(router, 6)
+    # Both routes are tried once, then the lower moving latency wins
+    assert [result["model"] for result in results[2:]] == ["fast"] * 4
+    assert all(result["method"] == "interpreter" for result in results)
+    slow, fast = router.routes
+    assert fast.latency < slow.latency
+
+def test_failing_route_trips_the_circuit_breaker():
+    router = ProviderRouter(enabled=True, breaker_failures=2, breaker_cooldown=60)
+    broken = router.add_route("mock", "broken", mock_pool(latency=0, failure_rate=1.0))
+    router.add_route("mock", "healthy", mock_pool(latency=0.02))
+
+    results = run_commands(router, 6)
+    assert broken.state == "open"
+    assert broken.stats["requests"] == 2
+    assert all(result["model"] == "healthy" for result in results[-3:])
+
+    # After the cooldown a single trial request is allowed through
+    broken.opened_at -= 60
+    assert router.choose() is broken
+    assert broken.state == "half_open"
+
+def test_all_routes_open_falls_back_to_basic():
+    router = ProviderRouter(enabled=True, breaker_failures=1)
+    router.add_route("mock", "a", mock_pool(latency=0, failure_rate=1.0))
+    router.add_route("mock", "b", mock_pool(latency=0, failure_rate=1.0))
+
+    results = run_commands(router, 3)
+    assert results[-1]["fallback_reason"] == "circuit_open"
+    assert router.stats["no_route"] == 1
+
+def test_hedged_request_takes_the_first_answer():
+    router = ProviderRouter(enabled=True, hedge=True, hedge_delay=0.05)
+    slow = router.add_route("mock", "slow", mock_pool(latency=0.5))
+    fast = router.add_route("mock", "fast", mock_pool(latency=0.01))
+    # The slow route looks best from its history, but is stuck right now
+    slow.latency, fast.latency = 0.001, 0.01
+
+    async def scenario():
+        started = time.perf_counter()
+        result = await router.process("list files")
+        return result, time.perf_counter() - started
+
+    result, elapsed = asyncio.run(scenario())
+    assert elapsed < 0.4
+    assert result["hedged"] and result["model"] == "fast"
+    assert router.stats["hedge_wins"] == 1
+
+def test_hedge_deadline_uses_the_latency_percentile():
+    router = ProviderRouter(enabled=True, hedge=True, hedge_delay=2.0, hedge_min_samples=5)
+    route = router.add_route("mock", "a", mock_pool())
+    assert router.hedge_after(route) == 2.0
+    for latency in (0.1, 0.2, 0.3, 0.4, 1.0):
+        route.record(latency, True, breaker_failures=5)
+    assert router.hedge_after(route) == 1.0
+    router.hedge_percentile = 50
+    assert router.hedge_after(route) == 0.3
+
+def test_routes_are_built_from_config():
+    config = {
+        "default_provider": "mock",
+        "providers": {"mock": {"enabled": True, "default_model": "mock-coder", "latency": 0}},
+        "routing": {
+            "enabled": True,
+            "pool_size": 2,
+            "routes": [
+                "mock/mock-coder",
+                {"provider": "mock", "model": "mock-slow", "settings": {"latency": 0.2}},
+                "openai/gpt-4"
+            ]
+        }
+    }
+    router = ProviderRouter.from_config(config)
+    primary = mock_pool(latency=0)
+    router.build(None, config, primary)
+
+    # The default route reuses the existing pool; disabled providers are skipped
+    assert [route.name for route in router.routes] == ["mock/mock-coder", "mock/mock-slow"]
+    assert router.routes[0].pool is primary
+    assert router.routes[1].pool.size == 2
+    assert router.routes[1].pool.instances()[0].latency == 0.2
+    assert router.active
@@ -0,0 +1,59 @@
+import sys
+import os
+import time
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from server.services.response_cache import ResponseCache
+
+context = {"mode": "interactive", "system_info": {"platform": "win32"}}
+
+def test_key_normalizes_command_and_includes_context():
+    """Equivalent commands share a key, while platform, mode and model separate it."""
+    key = ResponseCache.make_key("Open  Chrome", context, "ollama", "llama3")
+    assert key == ResponseCache.make_key("open chrome", context, "ollama", "llama3")
+    assert key != ResponseCache.make_key("open chrome", {"mode": "auto"}, "ollama", "llama3")
+    assert key != ResponseCache.make_key("open chrome", context, "openai", "gpt-4")
+
+def test_hits_return_independent_copies():
+    cache = ResponseCache(max_entries=4)
+    cache.set("k", {"actions": [{"type": "command", "code": "dir"}]})
+    first = cache.get("k")
+    first["actions"].append("mutated")
+    assert cache.get("k") == {"actions": [{"type": "command", "code": "dir"}]}
+    assert cache.get("missing") is None
+    stats = cache.get_stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+
+def test_lru_eviction():
+    """The least recently used entry is evicted once max_entries is exceeded."""
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    cache.get("a")
+    cache.set("c", {"v": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+    assert cache.get_stats()["evictions"] == 1
+
+def test_ttl_expiry():
+    cache = ResponseCache(ttl=0.05)
+    cache.set("a", {"v": 1})
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert cache.get_stats()["expirations"] == 1
+
+def test_persistence_round_trip(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = ResponseCache(persist_path=path)
+    cache.set("a", {"v": 1})
+    assert cache.save()
+    assert ResponseCache(persist_path=path).get("a") == {"v": 1}
+
+def test_invalidate_clears_entries():
+    cache = ResponseCache()
+    cache.set("a", {"v": 1})
+    cache.invalidate()
+    assert len(cache) == 0
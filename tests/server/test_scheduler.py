@@ -0,0 +1,167 @@
+import asyncio
+import pytest
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from server.core.scheduler import CommandScheduler, SchedulerRejected, TokenBucket
+
+def make_scheduler(**kwargs):
+    settings = {"max_concurrent": 1, "rate": 0}
+    settings.update(kwargs)
+    return CommandScheduler(**settings)
+
+async def occupy(scheduler, release: asyncio.Event):
+    """Hold the only processing slot until release is set."""
+    async def process():
+        await release.wait()
+        return {}
+    return await scheduler.run("holder", "rest", process)
+
+def test_higher_priority_and_round_robin_between_clients():
+    scheduler = make_scheduler()
+    order = []
+
+    async def submit(client_id, priority, name):
+        async def process():
+            order.append(name)
+            return {}
+        return await scheduler.run(client_id, priority, process)
+
+    async def scenario():
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(occupy(scheduler, release))
+        await asyncio.sleep(0)
+        tasks = [
+            asyncio.ensure_future(submit(client, priority, name))
+            for client, priority, name in [
+                ("script", "batch", "batch-1"),
+                ("script", "rest", "a1"), ("script", "rest", "a2"), ("script", "rest", "a3"),
+                ("person", "rest", "b1"),
+                ("person", "interactive", "ws"),
+                ("admin", "special", "server:stats"),
+            ]
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.waiting == 7
+        release.set()
+        await asyncio.gather(holder, *tasks)
+
+    asyncio.run(scenario())
+    # Special first, then interactive, then REST alternating between clients, batch last
+    assert order == ["server:stats", "ws", "a1", "b1", "a2", "a3", "batch-1"]
+
+def test_queue_wait_is_reported_separately():
+    scheduler = make_scheduler()
+
+    async def scenario():
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(occupy(scheduler, release))
+        await asyncio.sleep(0)
+
+        async def process():
+            return {"processing_time": 0.0}
+        waiting = asyncio.ensure_future(scheduler.run("client", "interactive", process))
+        await asyncio.sleep(0.1)
+        release.set()
+        first = await holder
+        return first, await waiting
+
+    first, queued = asyncio.run(scenario())
+    assert first["queue_time"] == 0.0
+    assert queued["queue_time"] >= 0.09
+    assert queued["processing_time"] == 0.0
+    assert queued["priority"] == "interactive"
+
+def test_token_bucket_rate_limits_each_client():
+    scheduler = make_scheduler(max_concurrent=4, rate=1, burst=2)
+
+    async def process():
+        return {}
+
+    async def scenario():
+        await scheduler.run("a", "rest", process)
+        await scheduler.run("a", "rest", process)
+        with pytest.raises(SchedulerRejected) as rejected:
+            await scheduler.run("a", "rest", process)
+        # Other clients have their own bucket
+        await scheduler.run("b", "rest", process)
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.reason == "rate_limited"
+    assert 0 < rejected.retry_after <= 1
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(rate=10, capacity=1)
+    bucket.updated = 100.0
+    assert bucket.take(now=100.0) == 0.0
+    assert bucket.take(now=100.0) == pytest.approx(0.1)
+    assert bucket.take(now=100.2) == 0.0
+
+def test_full_queue_sheds_lower_priority_work_first():
+    scheduler = make_scheduler(max_queue=2)
+
+    async def process():
+        return {}
+
+    async def scenario():
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(occupy(scheduler, release))
+        await asyncio.sleep(0)
+        batch = [asyncio.ensure_future(scheduler.run(f"script-{i}", "batch", process)) for i in range(2)]
+        await asyncio.sleep(0)
+
+        # An interactive command takes the place of the newest batch command
+        interactive = asyncio.ensure_future(scheduler.run("person", "interactive", process))
+        await asyncio.sleep(0)
+        # Nothing lower than batch can be shed, so a new batch command is refused
+        with pytest.raises(SchedulerRejected) as refused:
+            await scheduler.run("script-9", "batch", process)
+
+        release.set()
+        results = await asyncio.gather(holder, interactive, *batch, return_exceptions=True)
+        return refused.value, results
+
+    refused, results = asyncio.run(scenario())
+    assert refused.reason == "queue_full"
+    holder, interactive, first_batch, second_batch = results
+    assert interactive["priority"] == "interactive"
+    assert first_batch["priority"] == "batch"
+    assert isinstance(second_batch, SchedulerRejected) and second_batch.reason == "shed"
+    assert interactive["queue_time"] <= first_batch["queue_time"]
+
+def test_per_client_queue_limit_and_timeout():
+    scheduler = make_scheduler(max_queue_per_client=1, queue_timeout=0.05)
+
+    async def process():
+        return {}
+
+    async def scenario():
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(occupy(scheduler, release))
+        await asyncio.sleep(0)
+        waiting = asyncio.ensure_future(scheduler.run("script", "rest", process))
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerRejected) as full:
+            await scheduler.run("script", "rest", process)
+        with pytest.raises(SchedulerRejected) as timed_out:
+            await waiting
+        release.set()
+        await holder
+        return full.value, timed_out.value
+
+    full, timed_out = asyncio.run(scenario())
+    assert full.reason == "client_queue_full"
+    assert timed_out.reason == "queue_timeout"
+    assert scheduler.waiting == 0 and scheduler.active == 0
+
+def test_disabled_scheduler_runs_immediately():
+    scheduler = CommandScheduler.from_config({"scheduler": {"enabled": False}})
+
+    async def process():
+        return {"ok": True}
+
+    assert asyncio.run(scheduler.run(None, "batch", process)) == {"ok": True}
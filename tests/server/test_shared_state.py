@@ -0,0 +1,123 @@
+import asyncio
+import pytest
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from server.core.shared_state import (
+    SQLiteStateBackend, LocalStateBackend, SharedStateBackend, WorkerCoordinator, create_backend
+)
+from server.core.history import CommandHistory, ID_BLOCK_SIZE
+
+def test_auto_backend_depends_on_worker_count(tmp_path):
+    assert isinstance(create_backend({"count": 1}), LocalStateBackend)
+    backend = create_backend({"count": 4, "path": str(tmp_path / "state.db")})
+    assert isinstance(backend, SQLiteStateBackend)
+    backend.close()
+
+def test_incomplete_backend_fails_on_creation():
+    class PartialBackend(SharedStateBackend):
+        def publish_worker(self, worker_id, stats):
+            pass
+
+    with pytest.raises(TypeError):
+        PartialBackend()
+
+def test_sqlite_backend_is_shared_between_connections(tmp_path):
+    path = str(tmp_path / "state.db")
+    first, second = SQLiteStateBackend(path), SQLiteStateBackend(path)
+
+    first.publish_worker("a", {"active_clients": 1})
+    second.publish_worker("b", {"active_clients": 0})
+    first.add_client("a", "1")
+    assert set(second.workers(stale_after=10)) == {"a", "b"}
+    assert second.client_count(stale_after=10) == 1
+
+    event_id = first.publish_event("a", '{"type": "x"}')
+    assert second.events_after(event_id - 1) == [(event_id, "a", '{"type": "x"}')]
+
+    # Id blocks never overlap and respect the journal's existing maximum
+    block = first.allocate_ids("history", 10, minimum=100)
+    assert block == 101
+    assert second.allocate_ids("history", 10) == 111
+
+    # A worker without recent heartbeats is dropped with its clients
+    first.prune(event_retention=60, stale_after=-1)
+    assert second.workers(stale_after=10) == {}
+    assert second.client_count(stale_after=10) == 0
+    first.close()
+    second.close()
+
+def test_broadcast_is_relayed_to_other_workers_only(tmp_path):
+    path = str(tmp_path / "state.db")
+
+    async def scenario():
+        delivered = {"a": [], "b": []}
+        coordinators = {}
+        for name in ("a", "b"):
+            async def deliver(payload, name=name):
+                delivered[name].append(payload)
+                return 1
+            coordinators[name] = WorkerCoordinator(SQLiteStateBackend(path), worker_id=name, poll_interval=0.01)
+            await coordinators[name].start(lambda: {"active_clients": 0, "commands": {"total": 2}}, deliver)
+
+        coordinators["a"].publish('{"type": "command_processed"}')
+        await asyncio.sleep(0.2)
+        cluster = await coordinators["b"].aggregate({"active_clients": 3, "commands": {"total": 5}})
+        for coordinator in coordinators.values():
+            await coordinator.stop()
+        return delivered, cluster
+
+    delivered, cluster = asyncio.run(scenario())
+    assert delivered == {"a": [], "b": ['{"type": "command_processed"}']}
+    assert cluster["workers"] == 2
+    assert cluster["commands"]["total"] == 7
+
+def test_shared_history_ids_are_unique_across_workers(tmp_path):
+    journal = str(tmp_path / "history.db")
+    state = str(tmp_path / "state.db")
+    histories = [
+        CommandHistory(journal_path=journal, flush_interval=0.01,
+                       id_allocator=WorkerCoordinator(SQLiteStateBackend(state)).allocate_ids)
+        for _ in range(2)
+    ]
+    for i in range(3):
+        for number, history in enumerate(histories):
+            history.append({
+                "timestamp": f"2024-01-01T00:00:{i:02d}", "input": f"w{number} {i}", "output": {},
+                "provider": "mock", "model": "mock-coder", "success": True, "processing_time": 0.1
+            })
+    for history in histories:
+        history.flush()
+
+    # Every worker pages through the commands of all workers
+    page = histories[0].page(limit=10)
+    assert len(page) == 6
+    assert len({entry["id"] for entry in page}) == 6
+    for history in histories:
+        history.close()
+
+def test_shared_history_appends_only_use_ids_reserved_ahead(tmp_path):
+    calls = []
+
+    def allocate(count, minimum):
+        calls.append(minimum)
+        return minimum + 1
+
+    history = CommandHistory(journal_path=str(tmp_path / "history.db"), id_allocator=allocate)
+    entry = {"timestamp": "2024-01-01T00:00:00", "input": "dir", "output": {}, "provider": "mock",
+             "model": "mock-coder", "success": True, "processing_time": 0.1}
+    assert calls == [0]
+    ids = [history.append(dict(entry))["id"] for _ in range(ID_BLOCK_SIZE // 2 + 1)]
+    # Half the block is used: the next block is reserved (off the event loop in the server)
+    assert history.needs_ids and len(calls) == 1
+    history.reserve_ids()
+    assert calls == [0, ID_BLOCK_SIZE]
+    while history.ids_available:
+        ids.append(history.append(dict(entry))["id"])
+    assert ids == list(range(1, 2 * ID_BLOCK_SIZE + 1))
+    with pytest.raises(RuntimeError):
+        history.append(dict(entry))
+    history.close()
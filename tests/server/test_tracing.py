@@ -0,0 +1,67 @@
+import asyncio
+import json
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from server.services.tracing import TraceRecorder, span, record_span, current_trace
+
+def test_spans_outside_a_trace_are_ignored():
+    with span("orphan") as orphan:
+        pass
+    assert orphan.duration >= 0
+    assert current_trace() is None
+
+def test_timings_sum_repeated_stages_and_include_total():
+    recorder = TraceRecorder(log_path=None)
+    with recorder.trace("process_command", command="dir") as trace:
+        with span("extraction"):
+            pass
+        with span("extraction"):
+            pass
+        record_span("llm", trace.start, 0.25)
+    timings = trace.timings()
+    assert set(timings) == {"extraction", "llm", "total"}
+    assert timings["llm"] == 250.0
+    assert recorder.recent() == [trace]
+
+def test_trace_follows_awaits_and_child_tasks():
+    recorder = TraceRecorder(log_path=None)
+
+    async def stage():
+        with span("child"):
+            await asyncio.sleep(0)
+
+    async def scenario():
+        with recorder.trace("request") as trace:
+            await asyncio.ensure_future(stage())
+            return trace
+
+    trace = asyncio.run(scenario())
+    assert [recorded.name for recorded in trace.spans] == ["child"]
+
+def test_chrome_export_and_trace_log(tmp_path):
+    path = str(tmp_path / "trace.log")
+    recorder = TraceRecorder(log_path=path)
+    with recorder.trace("process_command"):
+        with span("safety_check"):
+            pass
+    exported = recorder.chrome_trace()
+    complete = [event for event in exported["traceEvents"] if event["ph"] == "X"]
+    assert [event["name"] for event in complete] == ["process_command", "safety_check"]
+    assert all(event["dur"] >= 0 and "ts" in event for event in complete)
+    json.dumps(exported)
+
+    from common.logging_pipeline import stop_logging_pipeline
+    stop_logging_pipeline()
+    with open(path, encoding="utf-8") as f:
+        logged = json.loads(f.readline())
+    assert logged["spans"][0]["name"] == "safety_check"
+
+def test_disabled_recorder_yields_none():
+    recorder = TraceRecorder(enabled=False)
+    with recorder.trace("process_command") as trace:
+        assert trace is None
+    assert recorder.recent() == []